@@ -0,0 +1,240 @@
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from price_history import PRICE_WINDOWS, DEFAULT_WINDOW
+
+logger = logging.getLogger("notification_service.alert_index")
+
+# Поле с порогом для каждого типа уведомления
+THRESHOLD_FIELDS = {"price": "price", "percentage": "percentage"}
+CONDITIONS = ("above", "below")
+
+
+def alert_bucket(alert: dict) -> Optional[tuple]:
+    """
+    Корзина индекса для уведомления: (тип, условие) для ценовых
+    и (тип, условие, окно) для процентных уведомлений.
+    """
+    alert_type = alert.get("type")
+    condition = alert.get("condition")
+    if alert_type not in THRESHOLD_FIELDS or condition not in CONDITIONS:
+        return None
+    if alert_type == "percentage":
+        window = alert.get("window") or DEFAULT_WINDOW
+        if window not in PRICE_WINDOWS:
+            return None
+        return (alert_type, condition, window)
+    return (alert_type, condition)
+
+
+class SortedThresholds:
+    """Отсортированный массив порогов с параллельным массивом ID уведомлений."""
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self):
+        self.keys: List[float] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def insert(self, key: float, alert_id: str) -> None:
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, alert_id)
+
+    def remove(self, key: float, alert_id: str) -> bool:
+        pos = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key)
+        for i in range(pos, end):
+            if self.ids[i] == alert_id:
+                del self.keys[i]
+                del self.ids[i]
+                return True
+        return False
+
+    def at_most(self, value: float) -> List[str]:
+        """ID уведомлений с порогом <= value."""
+        return self.ids[:bisect_right(self.keys, value)]
+
+    def at_least(self, value: float) -> List[str]:
+        """ID уведомлений с порогом >= value."""
+        return self.ids[bisect_left(self.keys, value):]
+
+
+class AlertEntry:
+    """Уведомление в индексе вместе с данными о владельце."""
+
+    __slots__ = ("user_id", "email", "alert", "bucket", "key")
+
+    def __init__(self, user_id: Any, email: str, alert: dict, bucket: tuple, key: float):
+        self.user_id = user_id
+        self.email = email
+        self.alert = alert
+        self.bucket = bucket
+        self.key = key
+
+    @property
+    def alert_id(self) -> str:
+        return self.alert["id"]
+
+    @property
+    def coin_id(self) -> str:
+        return self.alert["coin_id"]
+
+
+class AlertIndex:
+    """
+    Инвертированный индекс уведомлений по coin_id.
+
+    Для каждой монеты пороги "above" и "below" хранятся в отсортированных
+    массивах, поэтому сработавшие уведомления находятся бинарным поиском,
+    а стоимость проверки зависит от числа сработавших, а не всех уведомлений.
+    """
+
+    def __init__(self, on_coin_added: Optional[Callable[[str], None]] = None):
+        self.on_coin_added = on_coin_added
+        self._coins: Dict[str, Dict[tuple, SortedThresholds]] = {}
+        self._alerts: Dict[str, AlertEntry] = {}
+        self._by_user: Dict[Any, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._alerts
+
+    def coins(self) -> List[str]:
+        """Список монет, по которым есть уведомления."""
+        return list(self._coins.keys())
+
+    def has_coin(self, coin_id: str) -> bool:
+        return coin_id in self._coins
+
+    def get(self, alert_id: str) -> Optional[AlertEntry]:
+        return self._alerts.get(alert_id)
+
+    def user_alert_ids(self, user_id: Any) -> Set[str]:
+        return set(self._by_user.get(user_id, ()))
+
+    def alerts(self) -> Iterator[dict]:
+        """Перебирает документы уведомлений индекса."""
+        for entry in self._alerts.values():
+            yield entry.alert
+
+    def add(self, user_id: Any, email: str, alert: dict) -> bool:
+        """
+        Добавляет уведомление в индекс (или заменяет существующее с тем же ID).
+
+        Args:
+            user_id: ID владельца (email)
+            email: Email владельца
+            alert: Документ уведомления
+
+        Returns:
+            bool: False, если уведомление не может быть проиндексировано
+        """
+        alert_id = alert.get("id")
+        bucket = alert_bucket(alert)
+        field = THRESHOLD_FIELDS.get(alert.get("type"))
+        if not alert_id or not alert.get("coin_id") or bucket is None or alert.get(field) is None:
+            logger.warning(f"Skipping malformed alert for user {user_id}: {alert}")
+            return False
+
+        if alert_id in self._alerts:
+            self.remove(alert_id)
+
+        key = float(alert[field])
+        entry = AlertEntry(user_id, email, alert, bucket, key)
+        if alert["coin_id"] not in self._coins and self.on_coin_added is not None:
+            self.on_coin_added(alert["coin_id"])
+        thresholds = self._coins.setdefault(alert["coin_id"], {}).setdefault(bucket, SortedThresholds())
+        thresholds.insert(key, alert_id)
+        self._alerts[alert_id] = entry
+        self._by_user.setdefault(user_id, set()).add(alert_id)
+        return True
+
+    def remove(self, alert_id: str) -> Optional[AlertEntry]:
+        """Удаляет уведомление из индекса и возвращает его запись."""
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return None
+
+        buckets = self._coins.get(entry.coin_id, {})
+        thresholds = buckets.get(entry.bucket)
+        if thresholds is not None:
+            thresholds.remove(entry.key, alert_id)
+            if not thresholds:
+                del buckets[entry.bucket]
+        if not buckets:
+            self._coins.pop(entry.coin_id, None)
+
+        user_alerts = self._by_user.get(entry.user_id)
+        if user_alerts is not None:
+            user_alerts.discard(alert_id)
+            if not user_alerts:
+                del self._by_user[entry.user_id]
+        return entry
+
+    def replace_with(self, other: "AlertIndex") -> None:
+        """Заменяет содержимое индекса содержимым other (other больше не используется)."""
+        if self.on_coin_added is not None:
+            for coin_id in other._coins:
+                if coin_id not in self._coins:
+                    self.on_coin_added(coin_id)
+        self._coins = other._coins
+        self._alerts = other._alerts
+        self._by_user = other._by_user
+
+    def retain_alerts(self, alert_ids: Set[str]) -> None:
+        """Удаляет из индекса уведомления, которых нет в alert_ids."""
+        for alert_id in list(self._alerts.keys()):
+            if alert_id not in alert_ids:
+                self.remove(alert_id)
+
+    def triggered(
+        self,
+        coin_id: str,
+        price: float,
+        percent_changes: Optional[Dict[str, Tuple[float, float]]] = None,
+        low: Optional[float] = None,
+        high: Optional[float] = None
+    ) -> List[AlertEntry]:
+        """
+        Возвращает уведомления монеты, сработавшие при указанной цене.
+
+        Ценовые пороги проверяются по максимуму и минимуму цены с предыдущей
+        проверки, поэтому срабатывают и кратковременные пересечения.
+
+        Args:
+            coin_id: ID криптовалюты
+            price: Текущая цена
+            percent_changes: окно -> (рост, падение) от первой цены окна в процентах
+            low: Минимальная цена с предыдущей проверки (по умолчанию текущая)
+            high: Максимальная цена с предыдущей проверки (по умолчанию текущая)
+
+        Returns:
+            List[AlertEntry]: Сработавшие уведомления
+        """
+        buckets = self._coins.get(coin_id)
+        if not buckets or price is None:
+            return []
+
+        high = price if high is None else max(high, price)
+        low = price if low is None else min(low, price)
+
+        ids: List[str] = []
+        if ("price", "above") in buckets:
+            ids.extend(buckets[("price", "above")].at_most(high))
+        if ("price", "below") in buckets:
+            ids.extend(buckets[("price", "below")].at_least(low))
+
+        for window, (rise, drop) in (percent_changes or {}).items():
+            if ("percentage", "above", window) in buckets:
+                ids.extend(buckets[("percentage", "above", window)].at_most(rise))
+            if ("percentage", "below", window) in buckets:
+                ids.extend(buckets[("percentage", "below", window)].at_most(drop))
+
+        return [self._alerts[alert_id] for alert_id in ids]
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from bson import json_util
+from pymongo.errors import OperationFailure
+
+from alert_index import AlertIndex
+
+logger = logging.getLogger("notification_service.alert_sync")
+
+# Коды ошибок MongoDB: change streams недоступны на standalone-сервере
+CHANGE_STREAMS_UNSUPPORTED = {40573}
+# Токен возобновления устарел (oplog уже перезаписан)
+RESUME_TOKEN_LOST = {260, 280, 286}
+
+# Поля уведомления, нужные индексу
+ALERT_FIELDS = ("id", "user_email", "coin_id", "condition", "type", "price", "percentage", "window", "created_at")
+ALERT_PROJECTION = {"_id": 0, **{field: 1 for field in ALERT_FIELDS}}
+
+CHANGE_STREAM_PIPELINE = [
+    {"$project": {
+        "operationType": 1,
+        "documentKey": 1,
+        **{f"fullDocument.{field}": 1 for field in ALERT_FIELDS}
+    }}
+]
+
+
+class ChangeStreamsUnsupported(Exception):
+    """MongoDB не поддерживает change streams (standalone-сервер)."""
+
+
+class AlertChangeFollower:
+    """
+    Инкрементальная синхронизация индекса уведомлений через change stream
+    коллекции alerts.
+
+    Индекс загружается один раз, после чего изменения применяются по мере
+    поступления событий. Снимок индекса сохраняется на диск вместе с токеном
+    возобновления, поэтому после перезапуска полная перезагрузка не нужна.
+    """
+
+    def __init__(
+        self,
+        collection,
+        index: AlertIndex,
+        lock: asyncio.Lock,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 30,
+        scan_batch_size: int = 500,
+        is_fired: Optional[Callable[[str], bool]] = None,
+    ):
+        self.collection = collection
+        self.index = index
+        self.lock = lock
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.scan_batch_size = scan_batch_size
+        self.is_fired = is_fired or (lambda alert_id: False)
+        self.resume_token: Optional[dict] = None
+        self._dirty = False
+        self._last_snapshot = 0.0
+
+    async def full_reload(self) -> None:
+        """
+        Полностью перечитывает коллекцию уведомлений.
+
+        Новый индекс строится без блокировки, чтобы проверки цен не ждали
+        чтения всей коллекции; под блокировкой он только подменяет текущий.
+        """
+        cursor = self.collection.find(
+            {},
+            projection=ALERT_PROJECTION,
+            batch_size=self.scan_batch_size
+        )
+        index = AlertIndex()
+        async for alert in cursor:
+            self._apply_alert(alert, index)
+        async with self.lock:
+            # Уведомления, сработавшие во время чтения, не должны вернуться в индекс
+            for alert_id in [alert["id"] for alert in index.alerts() if self.is_fired(alert["id"])]:
+                index.remove(alert_id)
+            self.index.replace_with(index)
+        self._dirty = True
+        logger.info(f"Alert index reloaded: {len(self.index)} alerts")
+
+    def _apply_alert(self, alert: dict, index: Optional[AlertIndex] = None) -> None:
+        if index is None:
+            index = self.index
+        alert_id = alert.get("id")
+        # Уже сработавшее уведомление может прийти в устаревшем событии
+        if not alert.get("user_email") or self.is_fired(alert_id):
+            index.remove(alert_id)
+            return
+        existing = index.get(alert_id)
+        if existing is None or existing.alert != alert:
+            index.add(alert["user_email"], alert["user_email"], alert)
+
+    def apply_change(self, change: dict) -> None:
+        """Применяет событие change stream к индексу."""
+        operation = change.get("operationType")
+        # _id документа уведомления совпадает с его ID
+        alert_id = change.get("documentKey", {}).get("_id")
+        if operation == "delete":
+            self.index.remove(alert_id)
+        elif operation in ("insert", "replace", "update"):
+            document = change.get("fullDocument")
+            if document is None:
+                # Документ удален до того, как событие было прочитано
+                self.index.remove(alert_id)
+            else:
+                self._apply_alert(document)
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.index.retain_alerts(set())
+        self._dirty = True
+
+    def load_snapshot(self) -> bool:
+        """
+        Загружает снимок индекса и токен возобновления с диска.
+
+        Returns:
+            bool: True, если снимок загружен
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json_util.loads(f.read())
+            for alert in snapshot["alerts"]:
+                self._apply_alert(alert)
+            self.resume_token = snapshot["resume_token"]
+            logger.info(f"Alert index restored from snapshot: {len(self.index)} alerts")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load alert index snapshot: {str(e)}")
+            self.index.retain_alerts(set())
+            self.resume_token = None
+            return False
+
+    async def save_snapshot(self, force: bool = False) -> None:
+        """
+        Сохраняет снимок индекса вместе с токеном возобновления.
+
+        Сериализация и запись выполняются в отдельном потоке, чтобы не
+        блокировать цикл событий на больших индексах.
+        """
+        if not self.snapshot_path or self.resume_token is None:
+            return
+        if not force and (not self._dirty or time.time() - self._last_snapshot < self.snapshot_interval):
+            return
+        snapshot = self._snapshot()
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+            self._last_snapshot = time.time()
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to save alert index snapshot: {str(e)}")
+
+    def _snapshot(self) -> dict:
+        # Копия списка документов: индекс может меняться, пока снимок пишется
+        return {
+            "resume_token": self.resume_token,
+            "alerts": list(self.index.alerts()),
+        }
+
+    def _write_snapshot(self, snapshot: dict) -> None:
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(snapshot))
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _open_stream(self):
+        return self.collection.watch(
+            CHANGE_STREAM_PIPELINE,
+            full_document="updateLookup",
+            resume_after=self.resume_token
+        )
+
+    async def _follow(self, reload_first: bool) -> None:
+        async with self._open_stream() as stream:
+            self.resume_token = stream.resume_token
+            if reload_first:
+                # Поток открыт до перезагрузки: изменения во время чтения не потеряются
+                await self.full_reload()
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    async with self.lock:
+                        self.apply_change(change)
+                self.resume_token = stream.resume_token or self.resume_token
+                await self.save_snapshot()
+
+    async def run(self) -> None:
+        """
+        Загружает индекс и следует за изменениями до отмены задачи.
+
+        Raises:
+            ChangeStreamsUnsupported: если сервер не поддерживает change streams
+        """
+        reload_first = not self.load_snapshot()
+        while True:
+            try:
+                await self._follow(reload_first)
+                reload_first = False
+            except asyncio.CancelledError:
+                # При остановке пишем снимок синхронно: задача уже отменяется
+                if self.snapshot_path and self.resume_token is not None:
+                    try:
+                        self._write_snapshot(self._snapshot())
+                    except Exception as e:
+                        logger.error(f"Failed to save alert index snapshot: {str(e)}")
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    raise ChangeStreamsUnsupported(str(e))
+                if e.code in RESUME_TOKEN_LOST:
+                    logger.warning(f"Alert change stream resume token lost, reloading: {str(e)}")
+                    self.resume_token = None
+                    reload_first = True
+                else:
+                    logger.error(f"Alert change stream failed: {str(e)}")
+                    await asyncio.sleep(5)
+            except Exception as e:
+                logger.error(f"Alert change stream failed: {str(e)}")
+                await asyncio.sleep(5)
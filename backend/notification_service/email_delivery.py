@@ -0,0 +1,259 @@
+import asyncio
+import logging
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+import aiosmtplib
+
+logger = logging.getLogger("notification_service.email_delivery")
+
+
+class SMTPConnectionPool:
+    """
+    Пул постоянных авторизованных SMTP-соединений.
+
+    Соединения открываются лениво (не больше size одновременно) и
+    переиспользуются между письмами; разорванные соединения пересоздаются.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 2,
+        start_tls: Optional[bool] = None,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        logger.info(f"Opened SMTP connection to {self.host}:{self.port}")
+        return smtp
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        await self._slots.acquire()
+        try:
+            while not self._idle.empty():
+                smtp = self._idle.get_nowait()
+                if smtp.is_connected:
+                    return smtp
+            return await self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, smtp: aiosmtplib.SMTP, broken: bool = False) -> None:
+        if broken or not smtp.is_connected:
+            smtp.close()
+        else:
+            self._idle.put_nowait(smtp)
+        self._slots.release()
+
+    async def send(self, message: MIMEMultipart) -> None:
+        smtp = await self.acquire()
+        try:
+            await smtp.send_message(message)
+        except Exception:
+            self.release(smtp, broken=True)
+            raise
+        self.release(smtp)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+class PendingEmail:
+    """Письмо в очереди: число неудачных попыток и время, раньше которого его не отправлять."""
+
+    __slots__ = ("subject", "html", "attempts", "not_before")
+
+    def __init__(self, subject: str, html: str, not_before: float, attempts: int = 0):
+        self.subject = subject
+        self.html = html
+        self.not_before = not_before
+        self.attempts = attempts
+
+
+class EmailDeliveryQueue:
+    """
+    Ограниченная очередь исходящих писем с пулом воркеров.
+
+    Постановка письма в очередь никогда не ждет отправки. Письма одному
+    получателю, накопившиеся за batch_window секунд, объединяются в одно,
+    а неудачные отправки повторяются с экспоненциальной задержкой. Задержка
+    хранится у каждого письма, поэтому повтор, попавший в пачку новых писем
+    того же получателя, не отправляется раньше своего срока.
+    """
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        sender: str,
+        workers: int = 4,
+        maxsize: int = 10000,
+        batch_window: float = 2.0,
+        max_retries: int = 3,
+        retry_backoff: float = 5.0,
+    ):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.maxsize = maxsize
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._pending: Dict[str, List[PendingEmail]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._pending_count = 0
+        self._stopping = False
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    def enqueue(self, recipient: str, subject: str, html: str) -> bool:
+        """
+        Ставит письмо в очередь без ожидания.
+
+        Returns:
+            bool: False, если очередь переполнена и письмо отброшено
+        """
+        if self._pending_count >= self.maxsize:
+            logger.error(f"Email queue is full, dropping notification to {recipient}")
+            return False
+        not_before = asyncio.get_running_loop().time() + self.batch_window
+        self._add(recipient, [PendingEmail(subject, html, not_before)])
+        return True
+
+    def _add(self, recipient: str, messages: List[PendingEmail]) -> None:
+        self._pending.setdefault(recipient, []).extend(messages)
+        self._pending_count += len(messages)
+        self._schedule(recipient, min(message.not_before for message in messages))
+
+    def _schedule(self, recipient: str, deadline: float) -> None:
+        """Планирует пачку получателя к самому раннему сроку его писем."""
+        if self._stopping:
+            self._ready.put_nowait(recipient)
+            return
+        timer = self._timers.get(recipient)
+        if timer is not None:
+            if timer.when() <= deadline:
+                return
+            timer.cancel()
+        self._timers[recipient] = asyncio.get_running_loop().call_at(deadline, self._fire, recipient)
+
+    def _fire(self, recipient: str) -> None:
+        self._timers.pop(recipient, None)
+        self._ready.put_nowait(recipient)
+
+    def _build_message(self, recipient: str, messages: List[PendingEmail]) -> MIMEMultipart:
+        if len(messages) == 1:
+            subject, html = messages[0].subject, messages[0].html
+        else:
+            subject = f"Уведомления о ценах ({len(messages)})"
+            html = "<hr>".join(message.html for message in messages)
+
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html'))
+        return msg
+
+    def _take_due(self, recipient: str) -> List[PendingEmail]:
+        """Забирает письма получателя, срок которых наступил; остальные ждут своего."""
+        pending = self._pending.pop(recipient, [])
+        now = asyncio.get_running_loop().time()
+        due = [message for message in pending if self._stopping or message.not_before <= now]
+        waiting = [message for message in pending if not (self._stopping or message.not_before <= now)]
+        self._pending_count -= len(due)
+        if waiting:
+            self._pending[recipient] = waiting
+            self._schedule(recipient, min(message.not_before for message in waiting))
+        return due
+
+    async def _deliver(self, recipient: str) -> None:
+        messages = self._take_due(recipient)
+        if not messages:
+            return
+
+        try:
+            await self.pool.send(self._build_message(recipient, messages))
+            logger.info(f"Email notification sent to {recipient} ({len(messages)} message(s))")
+        except Exception as e:
+            now = asyncio.get_running_loop().time()
+            retries = []
+            for message in messages:
+                message.attempts += 1
+                if message.attempts < self.max_retries and not self._stopping:
+                    message.not_before = now + self.retry_backoff * (2 ** (message.attempts - 1))
+                    retries.append(message)
+            dropped = len(messages) - len(retries)
+            if dropped:
+                logger.error(f"Failed to send {dropped} email(s) to {recipient}, giving up: {str(e)}")
+            if retries:
+                delay = min(message.not_before for message in retries) - now
+                logger.warning(f"Failed to send email to {recipient}, retrying in {delay:.0f}s: {str(e)}")
+                self._add(recipient, retries)
+
+    async def _worker(self) -> None:
+        while True:
+            recipient = await self._ready.get()
+            try:
+                await self._deliver(recipient)
+            except Exception as e:
+                logger.error(f"Email worker error for {recipient}: {str(e)}")
+            finally:
+                self._ready.task_done()
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Отправляет все накопленные письма, не дожидаясь окон объединения и
+        задержек повторов (не дольше timeout), и останавливает воркеров.
+        """
+        self._stopping = True
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for recipient in list(self._pending):
+            self._ready.put_nowait(recipient)
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._pending_count:
+            logger.warning(f"Email queue stopped with {self._pending_count} undelivered message(s)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.pool.close()
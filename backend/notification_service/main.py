@@ -1,4 +1,4 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, WebSocket, WebSocketDisconnect
 import motor.motor_asyncio
 import os
 import asyncio
@@ -7,12 +7,19 @@ from dotenv import load_dotenv
 import aiohttp
 import json
 import time
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
 import uvicorn
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from pydantic import BaseModel
+from jose import JWTError, jwt
+from alert_index import AlertIndex, AlertEntry
+from alert_sync import AlertChangeFollower, ChangeStreamsUnsupported
+from sharding import LocalMembership, create_membership
+from price_ticks import create_tick_bus
+from price_history import PriceHistory, DEFAULT_WINDOW
+from email_delivery import SMTPConnectionPool, EmailDeliveryQueue
+from push import ConnectionRegistry, create_fanout
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -37,179 +44,532 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
 EMAIL_USER = os.getenv("EMAIL_USER", "")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
 EMAIL_FROM = os.getenv("EMAIL_FROM", "noreply@cryptoapp.com")
+# Для локального SMTP без авторизации (например, тестового) EMAIL_REQUIRE_AUTH=false
+EMAIL_REQUIRE_AUTH = os.getenv("EMAIL_REQUIRE_AUTH", "true").lower() == "true"
+# true/false принудительно включает/выключает STARTTLS, пусто - автоопределение
+EMAIL_STARTTLS = {"true": True, "false": False}.get(os.getenv("EMAIL_STARTTLS", "").lower())
+
+# Очередь доставки писем
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "10000"))
+EMAIL_BATCH_WINDOW = float(os.getenv("EMAIL_BATCH_WINDOW", "2"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+
+# Размеры пачек при чтении и групповом удалении уведомлений
+ALERT_SCAN_BATCH_SIZE = int(os.getenv("ALERT_SCAN_BATCH_SIZE", "500"))
+ALERT_WRITE_BATCH_SIZE = int(os.getenv("ALERT_WRITE_BATCH_SIZE", "500"))
+
+# Синхронизация индекса уведомлений: change stream или опрос (для standalone MongoDB)
+ALERT_SYNC_INTERVAL = int(os.getenv("ALERT_SYNC_INTERVAL", "60"))
+ALERT_INDEX_SNAPSHOT_PATH = os.getenv("ALERT_INDEX_SNAPSHOT_PATH", "data/alert_index_snapshot.json")
+FIRED_ALERTS_MEMORY = 10000
 
 # Настройки для API цен
 PRICE_API_URL = os.getenv("PRICE_API_URL", "http://localhost:8001/api/price")
+PRICE_FETCH_CONCURRENCY = int(os.getenv("PRICE_FETCH_CONCURRENCY", "10"))
+PRICE_FETCH_TIMEOUT = float(os.getenv("PRICE_FETCH_TIMEOUT", "10"))
+# Минутные свечи prediction_service для максимума/минимума между проверками
+OHLC_API_URL = os.getenv("OHLC_API_URL", "http://localhost:8001/api/ohlc")
+
+# Поток тиков цен и страховочная периодическая проверка
+REDIS_URL = os.getenv("REDIS_URL", "")
+PRICE_TICKS_CHANNEL = os.getenv("PRICE_TICKS_CHANNEL", "price_ticks")
+ALERT_SWEEP_INTERVAL = int(os.getenv("ALERT_SWEEP_INTERVAL", "300"))
+
+# Мгновенная доставка сработавших уведомлений в открытые вкладки пользователей
+ALERT_PUSH_CHANNEL = os.getenv("ALERT_PUSH_CHANNEL", "alert_push")
+ALERT_PUSH_QUEUE_SIZE = int(os.getenv("ALERT_PUSH_QUEUE_SIZE", "100"))
+# Токены выпускает user_service, ключ должен совпадать
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
+ALGORITHM = "HS256"
+# Поля пользователя для проверки токена канала уведомлений
+PUSH_AUTH_PROJECTION = {"_id": 0, "is_active": 1, "password_version": 1}
+
+# Распределение монет между воркерами уведомлений
+WORKER_ID = os.getenv("WORKER_ID") or None
+WORKER_LEASE_TTL = float(os.getenv("WORKER_LEASE_TTL", "15"))
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "5"))
 
 # Глобальный кэш цен
 price_cache: Dict[str, float] = {}
 last_price_check: Dict[str, float] = {}
 
+# Минимум и максимум цены каждой монеты с момента предыдущей проверки и время
+# начала наблюдения: [low, high, since]. Отслеживаются только монеты с уведомлениями,
+# которые проверяет этот воркер
+price_extremes: Dict[str, List[float]] = {}
+last_sweep_time: Optional[float] = None
+
+# Общая HTTP-сессия для запросов к сервису цен
+http_session: Optional[aiohttp.ClientSession] = None
+
+# История цен монет за окна процентных уведомлений
+price_history = PriceHistory()
+
+# Индекс уведомлений по монетам; у монеты с первым уведомлением экстремумы
+# начинают отслеживаться заново
+alert_index = AlertIndex(on_coin_added=lambda coin_id: price_extremes.pop(coin_id, None))
+
+# Недавно сработавшие уведомления
+fired_alert_ids: "OrderedDict[str, None]" = OrderedDict()
+
+# Проверки по тикам и периодическая проверка не должны пересекаться,
+# иначе одно уведомление может сработать дважды
+evaluation_lock = asyncio.Lock()
+
+# Загрузка индекса и слежение за изменениями уведомлений
+alert_follower = AlertChangeFollower(
+    db.alerts,
+    alert_index,
+    evaluation_lock,
+    snapshot_path=ALERT_INDEX_SNAPSHOT_PATH or None,
+    scan_batch_size=ALERT_SCAN_BATCH_SIZE,
+    is_fired=lambda alert_id: alert_id in fired_alert_ids
+)
+alert_sync_mode = "starting"
+alert_sync_task: Optional[asyncio.Task] = None
+
+# Шина тиков цен (Redis pub/sub или внутри процесса)
+tick_bus = None
+
+# Членство в группе воркеров: определяет, какие монеты проверяет этот воркер
+membership = LocalMembership()
+
+# Очередь доставки писем
+email_queue: Optional[EmailDeliveryQueue] = None
+
+# Подключения к каналу уведомлений и шина рассылки между репликами
+push_connections = ConnectionRegistry(ALERT_PUSH_QUEUE_SIZE)
+push_fanout = None
+push_fanout_task: Optional[asyncio.Task] = None
+
+class PriceTick(BaseModel):
+    coin_id: str
+    price: float
+    ts: Optional[float] = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию с пулом соединений к сервису цен"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=PRICE_FETCH_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(total=PRICE_FETCH_TIMEOUT)
+        )
+    return http_session
+
+async def fetch_price(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, coin: str) -> Optional[float]:
+    """Получает текущую цену одной монеты"""
+    async with semaphore:
+        try:
+            async with session.get(f"{PRICE_API_URL}/{coin}") as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("price")
+                logger.warning(f"Price API returned {response.status} for {coin}")
+        except Exception as e:
+            logger.error(f"Error fetching price for {coin}: {str(e)}")
+    return None
+
+def update_extremes(coin_id: str, low: float, high: float, since: float):
+    """Расширяет минимум и максимум цены монеты с момента предыдущей проверки"""
+    if not alert_index.has_coin(coin_id) or not membership.owns(coin_id):
+        price_extremes.pop(coin_id, None)
+        return
+    extremes = price_extremes.get(coin_id)
+    if extremes is None:
+        price_extremes[coin_id] = [low, high, since]
+    else:
+        extremes[0] = min(extremes[0], low)
+        extremes[1] = max(extremes[1], high)
+        # Экстремумы свечей начиная с since расширяют окно назад: иначе уведомление,
+        # созданное внутри окна, сработало бы по цене до своего создания
+        extremes[2] = min(extremes[2], since)
+
+def record_price(coin_id: str, price: float, ts: float):
+    """Запоминает наблюдаемую цену монеты в кэше и истории цен"""
+    price_cache[coin_id] = price
+    last_price_check[coin_id] = ts
+    price_history.add(coin_id, price, ts)
+    update_extremes(coin_id, price, price, ts)
+
+async def fetch_candle_extremes(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, coin: str, since: float):
+    """Получает минимум и максимум цены монеты по минутным свечам начиная с since"""
+    limit = int((time.time() - since) // 60) + 1
+    async with semaphore:
+        try:
+            async with session.get(f"{OHLC_API_URL}/{coin}/1m", params={"limit": limit}) as response:
+                if response.status != 200:
+                    return
+                data = await response.json()
+        except Exception as e:
+            logger.error(f"Error fetching candles for {coin}: {str(e)}")
+            return
+    
+    # Свечи: [timestamp_ms, open, high, low, close]
+    since_ms = (int(since) // 60) * 60 * 1000
+    candles = [candle for candle in data.get("candles", []) if candle[0] >= since_ms]
+    if candles:
+        update_extremes(coin, min(c[3] for c in candles), max(c[2] for c in candles), since)
+
+def alert_created_ts(alert: dict) -> Optional[float]:
+    """Время создания уведомления в секундах (created_at из MongoDB - naive UTC)"""
+    created_at = alert.get("created_at")
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+def triggered_by_stale_extreme(entry: AlertEntry, price: float, since: Optional[float]) -> bool:
+    """
+    Ценовое уведомление сработало только по экстремуму, наблюдавшемуся
+    до его создания: такое пересечение порога не должно его вызывать
+    """
+    if entry.bucket[0] != "price" or since is None:
+        return False
+    created = alert_created_ts(entry.alert)
+    if created is None or created <= since:
+        return False
+    if entry.bucket[1] == "above":
+        return entry.key > price
+    return entry.key < price
+
 async def fetch_current_prices(coin_ids: List[str]) -> Dict[str, float]:
-    """Получает текущие цены для списка монет"""
-    results = {}
+    """Получает текущие цены для списка монет одним снимком"""
     current_time = time.time()
     
     # Проверяем, какие монеты нужно обновить (кэш истек через 60 секунд)
     coins_to_fetch = [
-        coin for coin in coin_ids 
+        coin for coin in set(coin_ids)
         if coin not in last_price_check or current_time - last_price_check.get(coin, 0) > 60
     ]
     
-    if not coins_to_fetch:
-        return {coin: price_cache.get(coin) for coin in coin_ids if coin in price_cache}
-    
-    try:
-        async with aiohttp.ClientSession() as session:
-            for coin in coins_to_fetch:
-                try:
-                    async with session.get(f"{PRICE_API_URL}/{coin}") as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            price = data.get("price")
-                            if price is not None:
-                                price_cache[coin] = price
-                                last_price_check[coin] = current_time
-                except Exception as e:
-                    logger.error(f"Error fetching price for {coin}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error in fetch_current_prices: {str(e)}")
+    if coins_to_fetch:
+        try:
+            # Запрашиваем цены параллельно, ограничивая число одновременных запросов
+            session = await get_http_session()
+            semaphore = asyncio.Semaphore(PRICE_FETCH_CONCURRENCY)
+            prices = await asyncio.gather(
+                *(fetch_price(session, semaphore, coin) for coin in coins_to_fetch)
+            )
+            # Монеты, по которым с прошлой проверки не было тиков
+            quiet_coins = [coin for coin in coins_to_fetch if coin not in price_extremes]
+            for coin, price in zip(coins_to_fetch, prices):
+                if price is not None:
+                    record_price(coin, price, current_time)
+            
+            # Для монет без тиков берем максимум и минимум между проверками из свечей
+            if last_sweep_time is not None:
+                await asyncio.gather(
+                    *(fetch_candle_extremes(session, semaphore, coin, last_sweep_time) for coin in quiet_coins)
+                )
+        except Exception as e:
+            logger.error(f"Error in fetch_current_prices: {str(e)}")
     
-    return {coin: price_cache.get(coin) for coin in coin_ids if coin in price_cache}
+    return {coin: price_cache[coin] for coin in coin_ids if coin in price_cache}
 
 async def send_email_notification(user_email: str, subject: str, message: str):
-    """Отправляет email уведомление пользователю"""
-    if not EMAIL_USER or not EMAIL_PASSWORD:
+    """Ставит email уведомление пользователю в очередь доставки без ожидания отправки"""
+    if EMAIL_REQUIRE_AUTH and (not EMAIL_USER or not EMAIL_PASSWORD):
         logger.warning("Email credentials not configured, skipping notification")
         return
     
+    if email_queue is None:
+        logger.warning(f"Email queue is not running, skipping notification to {user_email}")
+        return
+    
+    email_queue.enqueue(user_email, subject, message)
+
+def build_alert_email(
+    alert: dict,
+    current_price: float,
+    percent_changes: Dict[str, Tuple[float, float]],
+    low: Optional[float] = None,
+    high: Optional[float] = None
+):
+    """Формирует тему и текст письма о сработавшем уведомлении"""
+    coin_id = alert["coin_id"]
+    subject = f"Уведомление о цене {coin_id.upper()}"
+    
+    if alert["type"] == "price":
+        # Цена, при которой пересечен порог: максимум/минимум с предыдущей проверки
+        if alert["condition"] == "above":
+            trigger_price = high if high is not None else current_price
+        else:
+            trigger_price = low if low is not None else current_price
+        message = f"""
+        <h2>Уведомление о цене {coin_id.upper()}</h2>
+        <p>Цена {coin_id.upper()} {alert["condition"] == "above" and "достигла" or "упала до"} ${trigger_price:.2f}</p>
+        <p>Ваше условие: {alert["condition"] == "above" and "выше" or "ниже"} ${alert["price"]:.2f}</p>
+        <p>Текущая цена: ${current_price:.2f}</p>
+        <p><a href="http://localhost:3000/crypto/{coin_id}">Посмотреть детали</a></p>
+        """
+    else:
+        window = alert.get("window") or DEFAULT_WINDOW
+        rise, drop = percent_changes.get(window, (0.0, 0.0))
+        percent_change = rise if alert["condition"] == "above" else -drop
+        
+        message = f"""
+        <h2>Уведомление об изменении цены {coin_id.upper()}</h2>
+        <p>Цена {coin_id.upper()} изменилась на {percent_change:.2f}% за {window}</p>
+        <p>Ваше условие: изменение {alert["condition"] == "above" and "выше" or "ниже"} {alert["percentage"]}% за {window}</p>
+        <p>Текущая цена: ${current_price:.2f}</p>
+        <p><a href="http://localhost:3000/crypto/{coin_id}">Посмотреть детали</a></p>
+        """
+    
+    return subject, message
+
+def build_alert_push(alert: dict, current_price: float) -> Dict[str, Any]:
+    """Формирует сообщение о сработавшем уведомлении для канала push"""
+    return {
+        "type": "alert",
+        "alert": {
+            key: alert.get(key)
+            for key in ("id", "coin_id", "condition", "type", "price", "percentage", "window")
+        },
+        "price": current_price,
+        "triggered_at": datetime.now().isoformat()
+    }
+
+async def push_alert_notification(user_email: str, payload: Dict[str, Any]):
+    """Рассылает уведомление подключениям пользователя на всех репликах"""
+    if push_fanout is None:
+        return
+    try:
+        await push_fanout.publish(user_email, payload)
+    except Exception as e:
+        logger.error(f"Failed to push alert to {user_email}: {str(e)}")
+
+def mark_alert_fired(alert_id: str):
+    """Запоминает сработавшее уведомление, чтобы устаревшие события не вернули его в индекс"""
+    fired_alert_ids[alert_id] = None
+    while len(fired_alert_ids) > FIRED_ALERTS_MEMORY:
+        fired_alert_ids.popitem(last=False)
+
+async def alert_sync_loop():
+    """Фоновая задача: поддерживает индекс уведомлений в актуальном состоянии"""
+    global alert_sync_mode
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = user_email
-        msg['Subject'] = subject
+        alert_sync_mode = "change_stream"
+        await alert_follower.run()
+    except ChangeStreamsUnsupported as e:
+        # Standalone MongoDB: сравниваем уведомления с индексом периодическим опросом
+        logger.warning(f"Change streams unsupported, falling back to polling: {str(e)}")
+        alert_sync_mode = "polling"
+        while True:
+            try:
+                await alert_follower.full_reload()
+            except Exception as e:
+                logger.error(f"Error syncing alert index: {str(e)}")
+            await asyncio.sleep(ALERT_SYNC_INTERVAL)
+
+async def remove_triggered_alerts(triggered_by_user: Dict[Any, List[AlertEntry]]):
+    """Удаляет сработавшие уведомления из коллекции alerts пачками по ID"""
+    triggered_ids = [entry.alert_id for entries in triggered_by_user.values() for entry in entries]
+    for start in range(0, len(triggered_ids), ALERT_WRITE_BATCH_SIZE):
+        # _id документа уведомления совпадает с его ID
+        await db.alerts.delete_many({"_id": {"$in": triggered_ids[start:start + ALERT_WRITE_BATCH_SIZE]}})
+
+async def evaluate_alerts(current_prices: Dict[str, float]):
+    """Проверяет уведомления монет из снимка цен и отправляет нотификации"""
+    async with evaluation_lock:
+        # Находим сработавшие уведомления бинарным поиском по порогам каждой монеты:
+        # ценовые пороги проверяются по максимуму и минимуму с предыдущей проверки,
+        # процентные изменения берутся из истории цен за окна уведомлений
+        triggered_by_user: Dict[Any, List[AlertEntry]] = {}
+        percent_changes: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        extremes: Dict[str, List[float]] = {}
+        for coin_id, current_price in current_prices.items():
+            if current_price is None or not membership.owns(coin_id):
+                continue
+            low, high, since = price_extremes.pop(coin_id, [current_price, current_price, None])
+            extremes[coin_id] = [low, high]
+            percent_changes[coin_id] = price_history.changes(coin_id, current_price)
+            for entry in alert_index.triggered(coin_id, current_price, percent_changes[coin_id], low, high):
+                if triggered_by_stale_extreme(entry, current_price, since):
+                    continue
+                triggered_by_user.setdefault(entry.user_id, []).append(entry)
+        
+        if not triggered_by_user:
+            return
+        
+        # Отправляет только воркер, закрепивший уведомление: при перераспределении
+        # монет два воркера могут кратковременно проверять одну монету
+        try:
+            claimed = await membership.claim_alerts(
+                [entry.alert_id for entries in triggered_by_user.values() for entry in entries]
+            )
+        except Exception as e:
+            # Уведомления остаются в индексе и будут проверены снова
+            logger.error(f"Failed to claim triggered alerts: {str(e)}")
+            return
         
-        msg.attach(MIMEText(message, 'html'))
+        # Удаляем сработавшие уведомления из индекса
+        for entries in triggered_by_user.values():
+            for entry in entries:
+                alert_index.remove(entry.alert_id)
+                mark_alert_fired(entry.alert_id)
         
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
+        triggered_by_user = {
+            user_id: [entry for entry in entries if entry.alert_id in claimed]
+            for user_id, entries in triggered_by_user.items()
+        }
+        triggered_by_user = {user_id: entries for user_id, entries in triggered_by_user.items() if entries}
+        
+        claimed_ids = [entry.alert_id for entries in triggered_by_user.values() for entry in entries]
+        
+        # Групповое удаление по ID в базе
+        try:
+            await remove_triggered_alerts(triggered_by_user)
+        except Exception as e:
+            # Возвращаем уведомления в индекс и снимаем закрепления: иначе они
+            # остались бы закрепленными и ни один воркер их не отправил бы
+            logger.error(f"Failed to remove triggered alerts, will retry: {str(e)}")
+            for entries in triggered_by_user.values():
+                for entry in entries:
+                    fired_alert_ids.pop(entry.alert_id, None)
+                    alert_index.add(entry.user_id, entry.email, entry.alert)
+            await release_claims(claimed_ids)
+            return
+    
+    # Отправляем уведомления: сначала в открытые вкладки, затем письмом
+    for entries in triggered_by_user.values():
+        for entry in entries:
+            coin_id = entry.coin_id
+            await push_alert_notification(entry.email, build_alert_push(entry.alert, current_prices[coin_id]))
             
-        logger.info(f"Email notification sent to {user_email}")
+            low, high = extremes[coin_id]
+            subject, message = build_alert_email(
+                entry.alert, current_prices[coin_id], percent_changes[coin_id], low, high
+            )
+            await send_email_notification(entry.email, subject, message)
+    
+    # Уведомления удалены и поставлены в очередь: закрепляем их надолго
+    try:
+        await membership.confirm_claims(claimed_ids)
+    except Exception as e:
+        logger.warning(f"Failed to extend alert claims: {str(e)}")
+
+async def release_claims(alert_ids: List[str]):
+    """Снимает закрепления уведомлений, не дожидаясь истечения их короткого TTL"""
+    try:
+        await membership.release_claims(alert_ids)
     except Exception as e:
-        logger.error(f"Failed to send email to {user_email}: {str(e)}")
+        logger.warning(f"Failed to release alert claims, they expire on their own: {str(e)}")
 
 async def check_price_alerts():
     """Проверяет все уведомления о ценах и отправляет нотификации"""
     logger.info("Checking price alerts")
     
     try:
-        # Получаем всех пользователей с уведомлениями
-        users = await db.users.find({"alerts": {"$exists": True, "$ne": []}}).to_list(None)
+        # Получаем снимок текущих цен: каждая монета запрашивается один раз за цикл
+        owned_coins = [coin_id for coin_id in alert_index.coins() if membership.owns(coin_id)]
+        # Экстремумы монет, которые больше не проверяет этот воркер, устарели
+        for coin_id in set(price_extremes) - set(owned_coins):
+            del price_extremes[coin_id]
+        current_prices = await fetch_current_prices(owned_coins)
         
-        for user in users:
-            if not user.get("alerts"):
-                continue
-                
-            # Получаем список монет для проверки
-            coin_ids = list(set(alert["coin_id"] for alert in user["alerts"]))
-            
-            # Получаем текущие цены
-            current_prices = await fetch_current_prices(coin_ids)
-            
-            # Проверяем каждое уведомление
-            triggered_alerts = []
-            remaining_alerts = []
-            
-            for alert in user["alerts"]:
-                coin_id = alert["coin_id"]
-                current_price = current_prices.get(coin_id)
-                
-                if current_price is None:
-                    remaining_alerts.append(alert)
-                    continue
-                
-                is_triggered = False
-                
-                if alert["type"] == "price":
-                    # Проверка по абсолютной цене
-                    if alert["condition"] == "above" and current_price >= alert["price"]:
-                        is_triggered = True
-                    elif alert["condition"] == "below" and current_price <= alert["price"]:
-                        is_triggered = True
-                
-                elif alert["type"] == "percentage":
-                    # Проверка по процентному изменению
-                    # Для этого нам нужны исторические данные
-                    # Пока реализуем простую проверку на основе последних известных цен
-                    if coin_id in price_cache:
-                        last_known_price = price_cache[coin_id]
-                        if last_known_price > 0:
-                            percent_change = ((current_price - last_known_price) / last_known_price) * 100
-                            
-                            if alert["condition"] == "above" and percent_change >= alert["percentage"]:
-                                is_triggered = True
-                            elif alert["condition"] == "below" and percent_change <= -alert["percentage"]:
-                                is_triggered = True
-                
-                if is_triggered:
-                    triggered_alerts.append(alert)
-                else:
-                    remaining_alerts.append(alert)
-            
-            # Если есть сработавшие уведомления
-            if triggered_alerts:
-                # Обновляем список уведомлений пользователя (удаляем сработавшие)
-                await db.users.update_one(
-                    {"_id": user["_id"]},
-                    {"$set": {"alerts": remaining_alerts}}
-                )
-                
-                # Отправляем уведомления
-                for alert in triggered_alerts:
-                    coin_id = alert["coin_id"]
-                    current_price = current_prices.get(coin_id)
-                    
-                    subject = f"Уведомление о цене {coin_id.upper()}"
-                    
-                    if alert["type"] == "price":
-                        message = f"""
-                        <h2>Уведомление о цене {coin_id.upper()}</h2>
-                        <p>Цена {coin_id.upper()} {alert["condition"] == "above" and "достигла" or "упала до"} ${current_price:.2f}</p>
-                        <p>Ваше условие: {alert["condition"] == "above" and "выше" or "ниже"} ${alert["price"]:.2f}</p>
-                        <p>Текущая цена: ${current_price:.2f}</p>
-                        <p><a href="http://localhost:3000/crypto/{coin_id}">Посмотреть детали</a></p>
-                        """
-                    else:
-                        last_known_price = price_cache.get(coin_id, 0)
-                        percent_change = ((current_price - last_known_price) / last_known_price) * 100 if last_known_price > 0 else 0
-                        
-                        message = f"""
-                        <h2>Уведомление об изменении цены {coin_id.upper()}</h2>
-                        <p>Цена {coin_id.upper()} изменилась на {percent_change:.2f}%</p>
-                        <p>Ваше условие: изменение {alert["condition"] == "above" and "выше" or "ниже"} {alert["percentage"]}%</p>
-                        <p>Текущая цена: ${current_price:.2f}</p>
-                        <p><a href="http://localhost:3000/crypto/{coin_id}">Посмотреть детали</a></p>
-                        """
-                    
-                    await send_email_notification(user["email"], subject, message)
-                    
-                    # Также можно отправить уведомление через WebSocket, если он реализован
+        await evaluate_alerts(current_prices)
     
     except Exception as e:
         logger.error(f"Error in check_price_alerts: {str(e)}")
+    finally:
+        global last_sweep_time
+        last_sweep_time = time.time()
+
+async def handle_price_tick(tick: Dict[str, Any]):
+    """Проверяет уведомления монеты, цена которой изменилась"""
+    coin_id = tick["coin_id"]
+    price = tick["price"]
+    previous_price = price_cache.get(coin_id)
+    
+    record_price(coin_id, price, tick.get("ts") or time.time())
+    
+    if price == previous_price or not alert_index.has_coin(coin_id) or not membership.owns(coin_id):
+        return
+    
+    await evaluate_alerts({coin_id: price})
+
+async def price_tick_consumer():
+    """Фоновая задача: проверяет уведомления по мере поступления тиков цен"""
+    while True:
+        try:
+            async for tick in tick_bus.subscribe():
+                try:
+                    await handle_price_tick(tick)
+                except Exception as e:
+                    logger.error(f"Error handling price tick {tick}: {str(e)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Price tick subscription failed: {str(e)}")
+            await asyncio.sleep(5)
 
 async def background_alert_checker():
-    """Фоновая задача для периодической проверки уведомлений"""
+    """Фоновая задача для периодической страховочной проверки всех уведомлений"""
     while True:
         await check_price_alerts()
-        await asyncio.sleep(60)  # Проверяем каждую минуту
+        await asyncio.sleep(ALERT_SWEEP_INTERVAL)
 
 @app.on_event("startup")
 async def startup_event():
     """Запускает фоновые задачи при старте сервиса"""
+    global tick_bus, email_queue, alert_sync_task, membership, push_fanout, push_fanout_task
+    alert_sync_task = asyncio.create_task(alert_sync_loop())
+    
+    membership = await create_membership(
+        REDIS_URL,
+        worker_id=WORKER_ID,
+        lease_ttl=WORKER_LEASE_TTL,
+        heartbeat_interval=WORKER_HEARTBEAT_INTERVAL
+    )
+    membership.start()
+    tick_bus = await create_tick_bus(REDIS_URL, PRICE_TICKS_CHANNEL)
+    push_fanout = await create_fanout(REDIS_URL, ALERT_PUSH_CHANNEL, push_connections)
+    push_fanout_task = asyncio.create_task(push_fanout.run())
+    
+    smtp_pool = SMTPConnectionPool(
+        EMAIL_HOST,
+        EMAIL_PORT,
+        username=EMAIL_USER,
+        password=EMAIL_PASSWORD,
+        size=EMAIL_POOL_SIZE,
+        start_tls=EMAIL_STARTTLS
+    )
+    email_queue = EmailDeliveryQueue(
+        smtp_pool,
+        EMAIL_FROM,
+        workers=EMAIL_WORKERS,
+        maxsize=EMAIL_QUEUE_SIZE,
+        batch_window=EMAIL_BATCH_WINDOW,
+        max_retries=EMAIL_MAX_RETRIES
+    )
+    email_queue.start()
+    
     asyncio.create_task(background_alert_checker())
+    asyncio.create_task(price_tick_consumer())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Закрывает соединения при остановке сервиса"""
+    if alert_sync_task is not None:
+        # При отмене сохраняется снимок индекса с токеном возобновления
+        alert_sync_task.cancel()
+        await asyncio.gather(alert_sync_task, return_exceptions=True)
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    if tick_bus is not None:
+        await tick_bus.close()
+    if push_fanout_task is not None:
+        push_fanout_task.cancel()
+        await asyncio.gather(push_fanout_task, return_exceptions=True)
+    if push_fanout is not None:
+        await push_fanout.close()
+    await membership.stop()
+    if email_queue is not None:
+        await email_queue.stop()
 
 @app.get("/")
 async def root():
@@ -221,7 +581,13 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "price_cache_size": len(price_cache)
+        "price_cache_size": len(price_cache),
+        "indexed_alerts": len(alert_index),
+        "alert_sync_mode": alert_sync_mode,
+        "worker_id": membership.worker_id,
+        "workers": membership.members(),
+        "queued_emails": len(email_queue) if email_queue is not None else 0,
+        "push_connections": len(push_connections)
     }
 
 @app.post("/trigger-check")
@@ -230,5 +596,72 @@ async def trigger_check(background_tasks: BackgroundTasks):
     background_tasks.add_task(check_price_alerts)
     return {"message": "Alert check triggered"}
 
+@app.post("/price-tick")
+async def publish_price_tick(tick: PriceTick):
+    """Публикует тик цены в шину (для источников без доступа к Redis)"""
+    if tick_bus is None:
+        raise HTTPException(status_code=503, detail="Price tick bus is not ready")
+    await tick_bus.publish(tick.coin_id, tick.price, tick.ts)
+    return {"message": "Price tick published"}
+
+async def authenticate_push_token(token: str) -> Optional[str]:
+    """
+    Email владельца токена user_service или None. Проверки те же, что в
+    user_service: пользователь существует и активен, а токен выпущен после
+    последней смены пароля.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    user_email = payload.get("sub")
+    if not user_email:
+        return None
+    try:
+        user = await db.users.find_one({"email": user_email}, PUSH_AUTH_PROJECTION)
+    except Exception as e:
+        logger.error(f"Failed to load user {user_email} for alert push: {str(e)}")
+        return None
+    if user is None or not user.get("is_active", True):
+        return None
+    token_password_version = payload.get("pwv")
+    if token_password_version is not None and token_password_version != str(user.get("password_version", 0)):
+        return None
+    return user_email
+
+@app.websocket("/ws/alerts")
+async def alerts_websocket(websocket: WebSocket, token: str = ""):
+    """Канал мгновенных уведомлений пользователя (аутентификация токеном user_service)"""
+    user_email = await authenticate_push_token(token)
+    if not user_email:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    connection = push_connections.connect(user_email)
+    # Клиент ничего не присылает: чтение нужно только чтобы заметить отключение
+    receiver = asyncio.create_task(websocket.receive_text())
+    try:
+        while True:
+            sender = asyncio.create_task(connection.queue.get())
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                await websocket.send_json(sender.result())
+            else:
+                sender.cancel()
+            if receiver in done:
+                # Исключение WebSocketDisconnect завершает цикл
+                receiver.result()
+                receiver = asyncio.create_task(websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Alert push connection for {user_email} failed: {str(e)}")
+    finally:
+        receiver.cancel()
+        push_connections.disconnect(connection)
+        if connection.dropped:
+            logger.warning(f"Dropped {connection.dropped} alert push message(s) for slow client {user_email}")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8003, reload=True) 
\ No newline at end of file
@@ -0,0 +1,145 @@
+import time
+from array import array
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+# Окно процентного уведомления -> (длина окна в секундах, разрешение в секундах)
+PRICE_WINDOWS = {
+    "5m": (300, 5),
+    "1h": (3600, 30),
+    "24h": (86400, 300),
+}
+DEFAULT_WINDOW = "24h"
+
+
+class WindowBuffer:
+    """
+    Кольцевой буфер цен за скользящее окно.
+
+    Цены агрегируются в корзины фиксированного разрешения (first/min/max),
+    которые хранятся в массивах фиксированного размера. Монотонные очереди
+    дают минимум и максимум окна за амортизированное O(1).
+    """
+
+    def __init__(self, window: int, resolution: int):
+        self.window = window
+        self.resolution = resolution
+        self.capacity = window // resolution + 1
+        self._bucket = array("q", [0] * self.capacity)
+        self._first = array("d", [0.0] * self.capacity)
+        self._min = array("d", [0.0] * self.capacity)
+        self._max = array("d", [0.0] * self.capacity)
+        self._head = -1   # порядковый номер последней корзины
+        self._tail = 0    # порядковый номер самой старой корзины в окне
+        self._min_queue: deque = deque()
+        self._max_queue: deque = deque()
+
+    def _slot(self, seq: int) -> int:
+        return seq % self.capacity
+
+    def _expire(self, bucket: int) -> None:
+        oldest = bucket - self.capacity + 1
+        while self._tail <= self._head and self._bucket[self._slot(self._tail)] < oldest:
+            self._tail += 1
+        while self._min_queue and self._min_queue[0] < self._tail:
+            self._min_queue.popleft()
+        while self._max_queue and self._max_queue[0] < self._tail:
+            self._max_queue.popleft()
+
+    def add(self, ts: float, price: float) -> None:
+        bucket = int(ts) // self.resolution
+
+        if self._head >= 0 and bucket < self._bucket[self._slot(self._head)]:
+            return  # устаревший тик
+
+        if self._head < 0 or bucket > self._bucket[self._slot(self._head)]:
+            self._head += 1
+            slot = self._slot(self._head)
+            self._bucket[slot] = bucket
+            self._first[slot] = price
+            self._min[slot] = price
+            self._max[slot] = price
+            if self._head - self._tail >= self.capacity:
+                self._tail = self._head - self.capacity + 1
+        else:
+            slot = self._slot(self._head)
+            self._min[slot] = min(self._min[slot], price)
+            self._max[slot] = max(self._max[slot], price)
+
+        self._expire(bucket)
+
+        # Последняя корзина всегда в конце монотонных очередей
+        low = self._min[slot]
+        while self._min_queue and self._min[self._slot(self._min_queue[-1])] >= low:
+            self._min_queue.pop()
+        self._min_queue.append(self._head)
+
+        high = self._max[slot]
+        while self._max_queue and self._max[self._slot(self._max_queue[-1])] <= high:
+            self._max_queue.pop()
+        self._max_queue.append(self._head)
+
+    def stats(self, now: Optional[float] = None) -> Optional[Tuple[float, float, float]]:
+        """
+        Возвращает (first, min, max) цены за окно или None, если данных нет.
+        """
+        if now is not None:
+            self._expire(int(now) // self.resolution)
+        if self._tail > self._head or not self._min_queue:
+            return None
+        return (
+            self._first[self._slot(self._tail)],
+            self._min[self._slot(self._min_queue[0])],
+            self._max[self._slot(self._max_queue[0])],
+        )
+
+
+class PriceHistory:
+    """История цен монет за окна 5m/1h/24h для процентных уведомлений."""
+
+    def __init__(self, windows: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.windows = windows or PRICE_WINDOWS
+        self._coins: Dict[str, Dict[str, WindowBuffer]] = {}
+
+    def add(self, coin_id: str, price: float, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        buffers = self._coins.get(coin_id)
+        if buffers is None:
+            buffers = {
+                name: WindowBuffer(window, resolution)
+                for name, (window, resolution) in self.windows.items()
+            }
+            self._coins[coin_id] = buffers
+        for buffer in buffers.values():
+            buffer.add(ts, float(price))
+
+    def stats(self, coin_id: str, window: str, now: Optional[float] = None) -> Optional[Tuple[float, float, float]]:
+        buffers = self._coins.get(coin_id)
+        if buffers is None or window not in buffers:
+            return None
+        return buffers[window].stats(now)
+
+    def changes(self, coin_id: str, price: float, now: Optional[float] = None) -> Dict[str, Tuple[float, float]]:
+        """
+        Процентные изменения цены за каждое окно.
+
+        Args:
+            coin_id: ID криптовалюты
+            price: Текущая цена
+            now: Текущее время (unix-время в секундах)
+
+        Изменение считается от первой цены окна ("N% за 24h" - относительно
+        цены 24 часа назад), а не от минимума или максимума внутри окна.
+
+        Returns:
+            Dict[str, Tuple[float, float]]: окно -> (рост, падение) от первой цены окна в процентах
+        """
+        result = {}
+        for window in self.windows:
+            stats = self.stats(coin_id, window, now)
+            if stats is None:
+                continue
+            first = stats[0]
+            change = ((price - first) / first) * 100 if first > 0 else 0.0
+            result[window] = (change, -change)
+        return result
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger("notification_service.price_ticks")
+
+
+def make_tick(coin_id: str, price: float, ts: Optional[float] = None) -> Dict:
+    """Формирует тик цены в формате, который публикует prediction_service"""
+    return {"coin_id": coin_id, "price": float(price), "ts": time.time() if ts is None else ts}
+
+
+class InProcessTickBus:
+    """
+    Шина тиков цен внутри процесса.
+
+    Используется, когда Redis недоступен: тики публикуются через
+    POST /price-tick или напрямую из кода сервиса.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def publish(self, coin_id: str, price: float, ts: Optional[float] = None) -> None:
+        tick = make_tick(coin_id, price, ts)
+        try:
+            self._queue.put_nowait(tick)
+        except asyncio.QueueFull:
+            # При переполнении отбрасываем самый старый тик: важна последняя цена
+            self._queue.get_nowait()
+            self._queue.put_nowait(tick)
+
+    async def subscribe(self) -> AsyncIterator[Dict]:
+        while True:
+            yield await self._queue.get()
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisTickBus:
+    """Шина тиков цен поверх Redis pub/sub."""
+
+    def __init__(self, redis_client, channel: str):
+        self.redis = redis_client
+        self.channel = channel
+
+    async def publish(self, coin_id: str, price: float, ts: Optional[float] = None) -> None:
+        await self.redis.publish(self.channel, json.dumps(make_tick(coin_id, price, ts)))
+
+    async def subscribe(self) -> AsyncIterator[Dict]:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    tick = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    logger.warning(f"Malformed price tick: {message.get('data')!r}")
+                    continue
+                if tick.get("coin_id") and tick.get("price") is not None:
+                    yield tick
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+async def create_tick_bus(redis_url: Optional[str], channel: str):
+    """
+    Создает шину тиков: Redis pub/sub, если Redis доступен,
+    иначе шину внутри процесса.
+    """
+    if redis_url:
+        try:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url)
+            await client.ping()
+            logger.info(f"Subscribed to price ticks via Redis channel '{channel}'")
+            return RedisTickBus(client, channel)
+        except Exception as e:
+            logger.warning(f"Redis unavailable for price ticks, using in-process bus: {str(e)}")
+    return InProcessTickBus()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger("notification_service.push")
+
+
+class PushConnection:
+    """Подключение пользователя с ограниченной очередью исходящих сообщений."""
+
+    def __init__(self, email: str, maxsize: int):
+        self.email = email
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент: отбрасываем самое старое сообщение, а не блокируем рассылку
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.dropped += 1
+
+
+class ConnectionRegistry:
+    """Подключения пользователей к каналу уведомлений на этой реплике."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._connections: Dict[str, Set[PushConnection]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def connect(self, email: str) -> PushConnection:
+        connection = PushConnection(email, self.queue_size)
+        self._connections.setdefault(email, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: PushConnection) -> None:
+        connections = self._connections.get(connection.email)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[connection.email]
+
+    def deliver(self, email: str, message: Dict[str, Any]) -> int:
+        """Раздает сообщение всем подключениям пользователя на этой реплике."""
+        connections = self._connections.get(email, ())
+        for connection in connections:
+            connection.offer(message)
+        return len(connections)
+
+
+class InProcessFanout:
+    """Рассылка внутри процесса (единственная реплика)."""
+
+    def __init__(self, registry: ConnectionRegistry):
+        self.registry = registry
+
+    async def publish(self, email: str, message: Dict[str, Any]) -> None:
+        self.registry.deliver(email, message)
+
+    async def run(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisFanout:
+    """
+    Рассылка через Redis pub/sub: сообщение получает каждая реплика
+    и доставляет его своим подключениям пользователя.
+    """
+
+    def __init__(self, redis_client, channel: str, registry: ConnectionRegistry):
+        self.redis = redis_client
+        self.channel = channel
+        self.registry = registry
+
+    async def publish(self, email: str, message: Dict[str, Any]) -> None:
+        await self.redis.publish(self.channel, json.dumps({"email": email, "message": message}))
+
+    async def run(self) -> None:
+        """Принимает сообщения из канала и доставляет локальным подключениям."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    try:
+                        envelope = json.loads(item["data"])
+                        self.registry.deliver(envelope["email"], envelope["message"])
+                    except (TypeError, ValueError, KeyError):
+                        logger.warning(f"Malformed alert push message: {item.get('data')!r}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Alert push subscription failed: {str(e)}")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.close()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+async def create_fanout(redis_url: Optional[str], channel: str, registry: ConnectionRegistry):
+    """
+    Создает шину рассылки: Redis pub/sub, если Redis доступен,
+    иначе рассылку внутри процесса.
+    """
+    if redis_url:
+        try:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url)
+            await client.ping()
+            return RedisFanout(client, channel, registry)
+        except Exception as e:
+            logger.warning(f"Redis unavailable for alert push, using in-process fanout: {str(e)}")
+    return InProcessFanout(registry)
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Set
+
+logger = logging.getLogger("notification_service.sharding")
+
+# Продлевает (ARGV[2] > 0) или снимает (ARGV[2] = 0) закрепления уведомлений,
+# которые все еще принадлежат воркеру ARGV[1]
+SETTLE_CLAIMS_SCRIPT = """
+local settled = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[1] then
+        if ARGV[2] == '0' then
+            redis.call('del', key)
+        else
+            redis.call('expire', key, ARGV[2])
+        end
+        settled = settled + 1
+    end
+end
+return settled
+"""
+
+
+def _hash(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Кольцо консистентного хеширования с виртуальными узлами."""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self.nodes: Set[str] = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.rebuild(nodes)
+
+    def rebuild(self, nodes: Iterable[str]) -> None:
+        self.nodes = set(nodes)
+        ring = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(self.replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        pos = bisect_right(self._points, _hash(key)) % len(self._points)
+        return self._owners[pos]
+
+
+class LocalMembership:
+    """Единственный воркер: владеет всеми монетами."""
+
+    worker_id = "local"
+
+    def owns(self, coin_id: str) -> bool:
+        return True
+
+    async def claim_alerts(self, alert_ids: List[str]) -> Set[str]:
+        return set(alert_ids)
+
+    async def confirm_claims(self, alert_ids: List[str]) -> None:
+        pass
+
+    async def release_claims(self, alert_ids: List[str]) -> None:
+        pass
+
+    def members(self) -> List[str]:
+        return [self.worker_id]
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisMembership:
+    """
+    Членство воркеров уведомлений через аренды в Redis.
+
+    Каждый воркер периодически продлевает свою аренду в sorted set
+    (score - время последнего heartbeat). Живые воркеры образуют кольцо
+    консистентного хеширования, по которому распределяются монеты;
+    при входе или падении воркера монеты перераспределяются.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        worker_id: str,
+        key_prefix: str = "notification",
+        lease_ttl: float = 15,
+        heartbeat_interval: float = 5,
+        claim_ttl: int = 86400,
+        pending_claim_ttl: int = 60,
+    ):
+        self.redis = redis_client
+        self.worker_id = worker_id
+        self.members_key = f"{key_prefix}:workers"
+        self.claim_prefix = f"{key_prefix}:alert_fired"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.claim_ttl = claim_ttl
+        self.pending_claim_ttl = pending_claim_ttl
+        self._settle_claims = redis_client.register_script(SETTLE_CLAIMS_SCRIPT)
+        self.ring = HashRing()
+        self._lease_expires = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def has_lease(self) -> bool:
+        return time.time() < self._lease_expires
+
+    def owns(self, coin_id: str) -> bool:
+        # Без действующей аренды монеты уже могли перейти другим воркерам
+        return self.has_lease and self.ring.owner(coin_id) == self.worker_id
+
+    def members(self) -> List[str]:
+        return sorted(self.ring.nodes)
+
+    async def heartbeat(self) -> None:
+        """Продлевает аренду и обновляет состав воркеров."""
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.members_key, {self.worker_id: now})
+        pipe.zremrangebyscore(self.members_key, "-inf", now - self.lease_ttl)
+        pipe.zrangebyscore(self.members_key, now - self.lease_ttl, "+inf")
+        _, _, members = await pipe.execute()
+        self._lease_expires = now + self.lease_ttl
+
+        members = {m.decode() if isinstance(m, bytes) else m for m in members}
+        if members != self.ring.nodes:
+            logger.info(f"Notification workers changed, rebalancing: {sorted(members)}")
+            self.ring.rebuild(members)
+
+    async def claim_alerts(self, alert_ids: List[str]) -> Set[str]:
+        """
+        Атомарно закрепляет сработавшие уведомления за воркером, чтобы
+        при перераспределении монет уведомление не было отправлено дважды.
+
+        Закрепление сначала короткое (pending_claim_ttl): если воркер упадет
+        до отправки, уведомление освободится для других. После удаления из
+        базы и постановки в очередь его продлевает confirm_claims.
+
+        Returns:
+            Set[str]: ID уведомлений, которые должен отправить этот воркер
+        """
+        if not alert_ids:
+            return set()
+        pipe = self.redis.pipeline()
+        for alert_id in alert_ids:
+            pipe.set(f"{self.claim_prefix}:{alert_id}", self.worker_id, nx=True, ex=self.pending_claim_ttl)
+        results = await pipe.execute()
+        return {alert_id for alert_id, claimed in zip(alert_ids, results) if claimed}
+
+    async def _settle(self, alert_ids: List[str], ttl: int) -> None:
+        if alert_ids:
+            keys = [f"{self.claim_prefix}:{alert_id}" for alert_id in alert_ids]
+            await self._settle_claims(keys=keys, args=[self.worker_id, ttl])
+
+    async def confirm_claims(self, alert_ids: List[str]) -> None:
+        """Продлевает закрепления отправленных уведомлений на claim_ttl."""
+        await self._settle(alert_ids, self.claim_ttl)
+
+    async def release_claims(self, alert_ids: List[str]) -> None:
+        """Снимает закрепления уведомлений, которые не удалось отправить."""
+        await self._settle(alert_ids, 0)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        """Останавливает heartbeat и освобождает аренду, чтобы монеты сразу перешли другим."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._lease_expires = 0.0
+        try:
+            await self.redis.zrem(self.members_key, self.worker_id)
+        except Exception as e:
+            logger.warning(f"Failed to release worker lease: {str(e)}")
+        await self.redis.close()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def create_membership(redis_url: Optional[str], worker_id: Optional[str] = None, **kwargs):
+    """
+    Создает членство воркера: через Redis, если он доступен, иначе
+    единственный локальный воркер, владеющий всеми монетами.
+    """
+    if redis_url:
+        try:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url)
+            membership = RedisMembership(client, worker_id or default_worker_id(), **kwargs)
+            await membership.heartbeat()
+            logger.info(f"Joined notification workers as {membership.worker_id}")
+            return membership
+        except Exception as e:
+            logger.warning(f"Redis unavailable for worker membership, running as single worker: {str(e)}")
+    return LocalMembership()
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def price_alert(alert_id, price, created):
+    return {
+        "id": alert_id,
+        "user_email": "user@example.com",
+        "coin_id": "bitcoin",
+        "condition": "above",
+        "type": "price",
+        "price": price,
+        "created_at": datetime.fromtimestamp(created, tz=timezone.utc).replace(tzinfo=None),
+    }
+
+
+def test_alert_created_after_candle_spike_does_not_fire(monkeypatch):
+    removed = []
+
+    async def remove_triggered_alerts(triggered_by_user):
+        removed.extend(entry.alert_id for entries in triggered_by_user.values() for entry in entries)
+
+    async def noop(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(main, "remove_triggered_alerts", remove_triggered_alerts)
+    monkeypatch.setattr(main, "push_alert_notification", noop)
+    monkeypatch.setattr(main, "send_email_notification", noop)
+    monkeypatch.setattr(main, "price_extremes", {})
+    monkeypatch.setattr(main, "fired_alert_ids", main.OrderedDict())
+
+    previous_sweep = 1_000_000.0
+    now = previous_sweep + 60
+    # Всплеск до 120 был в начале окна, уведомление "выше 110" создано позже
+    main.alert_index.add("user@example.com", "user@example.com", price_alert("late", 110, previous_sweep + 30))
+    main.alert_index.add("user@example.com", "user@example.com", price_alert("early", 115, previous_sweep - 30))
+    try:
+        # Как в fetch_current_prices: сначала цена проверки, затем свечи с прошлой проверки
+        main.record_price("bitcoin", 100, now)
+        main.update_extremes("bitcoin", 95, 120, previous_sweep)
+        assert main.price_extremes["bitcoin"][2] == previous_sweep
+
+        asyncio.run(main.evaluate_alerts({"bitcoin": 100}))
+    finally:
+        main.alert_index.retain_alerts(set())
+
+    assert removed == ["early"]
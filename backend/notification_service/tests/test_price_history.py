@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_history import PriceHistory  # noqa: E402
+
+
+def test_changes_measured_from_first_price_of_window():
+    history = PriceHistory({"5m": (300, 5)})
+    for ts, price in ((0, 100.0), (60, 80.0), (120, 90.0)):
+        history.add("bitcoin", price, ts)
+
+    assert history.stats("bitcoin", "5m", now=120) == (100.0, 80.0, 100.0)
+    # Рост от минимума окна был бы 12.5%, но за окно цена упала на 10%
+    rise, drop = history.changes("bitcoin", 90.0, now=120)["5m"]
+    assert rise == pytest.approx(-10.0)
+    assert drop == pytest.approx(10.0)
+
+
+def test_first_price_moves_with_window():
+    history = PriceHistory({"5m": (300, 5)})
+    for ts, price in ((0, 100.0), (200, 50.0), (400, 60.0)):
+        history.add("bitcoin", price, ts)
+
+    # Цена в момент 0 вышла из окна: отсчет от 50
+    rise, _ = history.changes("bitcoin", 60.0, now=400)["5m"]
+    assert rise == pytest.approx(20.0)
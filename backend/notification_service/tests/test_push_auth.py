@@ -0,0 +1,40 @@
+import asyncio
+import os
+import sys
+
+from jose import jwt
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def token(email, pwv=None):
+    claims = {"sub": email}
+    if pwv is not None:
+        claims["pwv"] = pwv
+    return jwt.encode(claims, main.SECRET_KEY, algorithm=main.ALGORITHM)
+
+
+def test_push_token_checked_against_user_record(monkeypatch):
+    db = AsyncMongoMockClient().crypto_tracker
+    monkeypatch.setattr(main, "db", db)
+
+    async def scenario():
+        await db.users.insert_many([
+            {"email": "active@example.com", "is_active": True, "password_version": 2},
+            {"email": "blocked@example.com", "is_active": False},
+        ])
+        return [
+            await main.authenticate_push_token(token("active@example.com", "2")),
+            # Токен без pwv выпущен до появления версий пароля
+            await main.authenticate_push_token(token("active@example.com")),
+            # Пароль сменили после выпуска токена
+            await main.authenticate_push_token(token("active@example.com", "1")),
+            await main.authenticate_push_token(token("blocked@example.com", "0")),
+            await main.authenticate_push_token(token("deleted@example.com", "0")),
+            await main.authenticate_push_token("not-a-token"),
+        ]
+
+    assert asyncio.run(scenario()) == ["active@example.com", "active@example.com", None, None, None, None]
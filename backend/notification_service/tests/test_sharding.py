@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import fakeredis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from sharding import RedisMembership  # noqa: E402
+
+
+def two_members():
+    """Два воркера с общим Redis, каждый считает монеты своими (перераспределение еще не дошло)"""
+    server = fakeredis.FakeServer()
+    members = []
+    for worker_id in ("worker-a", "worker-b"):
+        membership = RedisMembership(fakeredis.FakeAsyncRedis(server=server), worker_id)
+        membership._lease_expires = float("inf")
+        membership.ring.rebuild([worker_id])
+        members.append(membership)
+    return members
+
+
+def test_claims_are_exclusive_and_settled_only_by_owner():
+    async def run():
+        a, b = two_members()
+        ids = ["a1", "a2", "a3"]
+        claimed_a, claimed_b = await asyncio.gather(a.claim_alerts(ids), b.claim_alerts(ids))
+        assert claimed_a | claimed_b == set(ids)
+        assert not claimed_a & claimed_b
+
+        # Чужие закрепления не снимаются и не продлеваются
+        await b.release_claims(sorted(claimed_a))
+        assert await b.claim_alerts(sorted(claimed_a)) == set()
+        await a.release_claims(sorted(claimed_a))
+        assert await b.claim_alerts(sorted(claimed_a)) == claimed_a
+
+    asyncio.run(run())
+
+
+def test_alert_fires_once_when_two_members_evaluate_same_coin(monkeypatch):
+    removed, emails = [], []
+
+    async def remove_triggered_alerts(triggered_by_user):
+        removed.extend(entry.alert_id for entries in triggered_by_user.values() for entry in entries)
+
+    async def send_email_notification(email, subject, message):
+        emails.append(email)
+
+    async def noop(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(main, "remove_triggered_alerts", remove_triggered_alerts)
+    monkeypatch.setattr(main, "push_alert_notification", noop)
+    monkeypatch.setattr(main, "send_email_notification", send_email_notification)
+    monkeypatch.setattr(main, "price_extremes", {})
+    monkeypatch.setattr(main, "fired_alert_ids", main.OrderedDict())
+
+    alert = {
+        "id": "a1",
+        "user_email": "user@example.com",
+        "coin_id": "bitcoin",
+        "condition": "above",
+        "type": "price",
+        "price": 110,
+        "created_at": datetime(2024, 1, 1),
+    }
+    try:
+        for membership in two_members():
+            # У каждого воркера свой индекс: уведомление есть у обоих
+            main.alert_index.add("user@example.com", "user@example.com", alert)
+            monkeypatch.setattr(main, "membership", membership)
+            asyncio.run(main.evaluate_alerts({"bitcoin": 120}))
+    finally:
+        main.alert_index.retain_alerts(set())
+
+    assert removed == ["a1"]
+    assert emails == ["user@example.com"]
@@ -1,25 +1,62 @@
 import redis
 import json
 import logging
+import os
+import time
 from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Канал Redis pub/sub, в который публикуются наблюдаемые тики цен
+PRICE_TICKS_CHANNEL = os.getenv("PRICE_TICKS_CHANNEL", "price_ticks")
+
+# Таймаут операций с Redis и пауза перед повторным подключением после ошибки
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "1"))
+REDIS_RETRY_INTERVAL = float(os.getenv("REDIS_RETRY_INTERVAL", "30"))
+
 class RedisCache:
     def __init__(self, redis_url: str):
         """
-        Инициализация подключения к Redis.
+        Инициализация кэша. Подключение к Redis создается при первом
+        обращении, поэтому импорт модулей не ждет недоступный Redis.
         
         Args:
             redis_url: URL для подключения к Redis
         """
-        try:
-            self.redis = redis.from_url(redis_url)
-            self.redis.ping()  # Проверяем подключение
-            logger.info("Успешное подключение к Redis")
-        except Exception as e:
-            logger.warning(f"Не удалось подключиться к Redis: {str(e)}")
-            self.redis = None
+        self.redis_url = redis_url
+        self._redis = None
+        self._retry_at = 0.0
+
+    @property
+    def redis(self):
+        """
+        Клиент Redis или None, если Redis недоступен. После неудачной
+        проверки подключения или обрыва связи следующая попытка делается
+        не раньше, чем через REDIS_RETRY_INTERVAL секунд.
+        """
+        if self._redis is None and time.monotonic() >= self._retry_at:
+            try:
+                client = redis.from_url(
+                    self.redis_url,
+                    socket_connect_timeout=REDIS_TIMEOUT,
+                    socket_timeout=REDIS_TIMEOUT
+                )
+                client.ping()  # Проверяем подключение
+                self._redis = client
+                logger.info("Успешное подключение к Redis")
+            except Exception as e:
+                logger.warning(f"Не удалось подключиться к Redis: {str(e)}")
+                self._retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        return self._redis
+
+    def _connection_lost(self, e: Exception) -> None:
+        """
+        Сбрасывает клиент после обрыва связи: до повторного подключения
+        операции сразу возвращают пустой результат, а не ждут REDIS_TIMEOUT.
+        """
+        logger.warning(f"Потеряно подключение к Redis: {str(e)}")
+        self._redis = None
+        self._retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -39,6 +76,9 @@ class RedisCache:
             if data:
                 return json.loads(data)
             return None
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._connection_lost(e)
+            return None
         except Exception as e:
             logger.error(f"Ошибка при получении данных из кэша: {str(e)}")
             return None
@@ -62,6 +102,9 @@ class RedisCache:
             serialized_value = json.dumps(value)
             self.redis.setex(key, ttl, serialized_value)
             return True
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._connection_lost(e)
+            return False
         except Exception as e:
             logger.error(f"Ошибка при сохранении данных в кэш: {str(e)}")
             return False
@@ -82,10 +125,41 @@ class RedisCache:
                 
             self.redis.delete(key)
             return True
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._connection_lost(e)
+            return False
         except Exception as e:
             logger.error(f"Ошибка при удалении данных из кэша: {str(e)}")
             return False
 
+    def publish(self, channel: str, value: Any) -> bool:
+        """
+        Публикация сообщения в канал Redis pub/sub.
+        
+        Args:
+            channel: Имя канала
+            value: Данные для публикации
+            
+        Returns:
+            bool: True если сообщение опубликовано, False в случае ошибки
+        """
+        try:
+            if self.redis is None:
+                return False
+                
+            self.redis.publish(channel, json.dumps(value))
+            return True
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._connection_lost(e)
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при публикации в канал {channel}: {str(e)}")
+            return False
+
+    def publish_price_tick(self, currency, price, ts=None):
+        tick = {"coin_id": currency, "price": price, "ts": ts or time.time()}
+        self.publish(PRICE_TICKS_CHANNEL, tick)
+
     def get_current_price(self, currency):
         key = f"current_price:{currency}"
         data = self.get(key)
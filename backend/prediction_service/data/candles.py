@@ -0,0 +1,183 @@
+import time
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Интервал -> (ширина свечи в секундах, количество хранимых свечей)
+CANDLE_INTERVALS = {
+    "1m": (60, 1440),     # сутки минутных свечей
+    "5m": (300, 2016),    # неделя пятиминутных свечей
+    "1h": (3600, 720),    # 30 дней часовых свечей
+    "1d": (86400, 365),   # год дневных свечей
+}
+
+# Индексы колонок в массиве OHLC
+OPEN, HIGH, LOW, CLOSE = 0, 1, 2, 3
+
+
+class CandleRingBuffer:
+    """
+    Кольцевой буфер OHLC-свечей фиксированного размера для одного интервала.
+
+    Все данные хранятся в заранее выделенных numpy-массивах, поэтому
+    потребление памяти не зависит от времени работы сервиса.
+    """
+
+    def __init__(self, width: int, capacity: int):
+        """
+        Args:
+            width: Ширина свечи в секундах
+            capacity: Максимальное количество хранимых свечей
+        """
+        self.width = width
+        self.capacity = capacity
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._ohlc = np.zeros((capacity, 4), dtype=np.float64)
+        self._ticks = np.zeros(capacity, dtype=np.int32)
+        self._head = -1  # индекс текущей (последней) свечи
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_tick(self, ts: float, price: float) -> bool:
+        """
+        Учитывает тик цены в соответствующей свече.
+
+        Args:
+            ts: Время тика (unix-время в секундах)
+            price: Цена
+
+        Returns:
+            bool: False, если тик старше текущей свечи и был отброшен
+        """
+        bucket = int(ts) - int(ts) % self.width
+
+        if self._size and bucket == self._ts[self._head]:
+            row = self._ohlc[self._head]
+            if price > row[HIGH]:
+                row[HIGH] = price
+            if price < row[LOW]:
+                row[LOW] = price
+            row[CLOSE] = price
+            self._ticks[self._head] += 1
+            return True
+
+        if self._size and bucket < self._ts[self._head]:
+            return False
+
+        # Открываем новую свечу, перезаписывая самую старую при заполнении буфера
+        self._head = (self._head + 1) % self.capacity
+        self._ts[self._head] = bucket
+        self._ohlc[self._head] = price
+        self._ticks[self._head] = 1
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def _ordered_indices(self, limit: Optional[int] = None) -> np.ndarray:
+        count = self._size if limit is None else max(0, min(limit, self._size))
+        return np.arange(self._head - count + 1, self._head + 1) % self.capacity
+
+    def timestamps(self, limit: Optional[int] = None) -> np.ndarray:
+        """Начала свечей (в секундах) от старой к новой."""
+        return self._ts[self._ordered_indices(limit)]
+
+    def ohlc(self, limit: Optional[int] = None) -> np.ndarray:
+        """Матрица свечей формы (n, 4) с колонками open/high/low/close от старой к новой."""
+        return self._ohlc[self._ordered_indices(limit)]
+
+    def ticks(self, limit: Optional[int] = None) -> np.ndarray:
+        """Количество тиков в каждой свече от старой к новой."""
+        return self._ticks[self._ordered_indices(limit)]
+
+
+class CandleAggregator:
+    """
+    Агрегатор тиков цен в OHLC-свечи 1m/5m/1h/1d для каждой монеты.
+    """
+
+    def __init__(self, intervals: Optional[Dict[str, tuple]] = None):
+        self.intervals = intervals or CANDLE_INTERVALS
+        self._buffers: Dict[str, Dict[str, CandleRingBuffer]] = {}
+
+    def _coin_buffers(self, coin_id: str) -> Dict[str, CandleRingBuffer]:
+        buffers = self._buffers.get(coin_id)
+        if buffers is None:
+            buffers = {
+                name: CandleRingBuffer(width, capacity)
+                for name, (width, capacity) in self.intervals.items()
+            }
+            self._buffers[coin_id] = buffers
+        return buffers
+
+    def add_tick(self, coin_id: str, price: float, ts: Optional[float] = None) -> None:
+        """
+        Учитывает наблюдаемую цену во всех интервалах монеты.
+
+        Args:
+            coin_id: ID криптовалюты
+            price: Цена в USD
+            ts: Время наблюдения (unix-время в секундах), по умолчанию текущее
+        """
+        if price is None:
+            return
+        ts = time.time() if ts is None else ts
+        for buffer in self._coin_buffers(coin_id).values():
+            buffer.add_tick(ts, float(price))
+
+    def coins(self) -> list:
+        return list(self._buffers.keys())
+
+    def get_buffer(self, coin_id: str, interval: str) -> Optional[CandleRingBuffer]:
+        if interval not in self.intervals:
+            raise ValueError(f"Неподдерживаемый интервал: {interval}")
+        buffers = self._buffers.get(coin_id)
+        if buffers is None:
+            return None
+        return buffers[interval]
+
+    def get_candles(self, coin_id: str, interval: str, limit: Optional[int] = None) -> list:
+        """
+        Возвращает свечи в формате [timestamp_ms, open, high, low, close].
+
+        Args:
+            coin_id: ID криптовалюты
+            interval: Интервал свечей (1m, 5m, 1h, 1d)
+            limit: Максимальное количество последних свечей
+
+        Returns:
+            list: Свечи от старой к новой
+        """
+        buffer = self.get_buffer(coin_id, interval)
+        if buffer is None:
+            return []
+        timestamps = buffer.timestamps(limit) * 1000
+        ohlc = buffer.ohlc(limit)
+        return [
+            [int(ts), *row]
+            for ts, row in zip(timestamps.tolist(), ohlc.tolist())
+        ]
+
+    def get_features(self, coin_id: str, interval: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Возвращает матрицу признаков для моделей.
+
+        Args:
+            coin_id: ID криптовалюты
+            interval: Интервал свечей
+            limit: Максимальное количество последних свечей
+
+        Returns:
+            np.ndarray: Массив формы (n, 4) с колонками open/high/low/close
+        """
+        buffer = self.get_buffer(coin_id, interval)
+        if buffer is None:
+            return np.empty((0, 4), dtype=np.float64)
+        return buffer.ohlc(limit)
+
+
+# Общий агрегатор процесса: наполняется поллером цен и роутерами
+candle_aggregator = CandleAggregator()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import os
+from typing import List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://localhost:8000")
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+
+# Используются, пока каталог user_service недоступен
+DEFAULT_CURRENCIES = ["bitcoin", "ethereum"]
+
+
+class CatalogClient:
+    """
+    Список активных криптовалют из каталога user_service.
+
+    Периодически запрашивает только версию каталога и перечитывает
+    сам каталог, когда версия меняется; чтение списка обращений к сети не делает.
+    """
+
+    def __init__(self, base_url: str = USER_SERVICE_URL, refresh_interval: float = CATALOG_REFRESH_INTERVAL):
+        self.base_url = base_url.rstrip("/")
+        self.refresh_interval = refresh_interval
+        self.version: Optional[int] = None
+        self._active_ids: List[str] = list(DEFAULT_CURRENCIES)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def active_ids(self) -> List[str]:
+        """
+        Возвращает ID активных криптовалют.
+
+        Returns:
+            List[str]: ID криптовалют из последней загруженной версии каталога
+        """
+        return self._active_ids
+
+    async def refresh(self) -> bool:
+        """
+        Перечитывает каталог, если его версия изменилась.
+
+        Returns:
+            bool: True, если каталог был перечитан
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+        async with self._session.get(f"{self.base_url}/catalog/version") as response:
+            response.raise_for_status()
+            version = (await response.json())["version"]
+        if version == self.version:
+            return False
+
+        active_ids = []
+        async with self._session.get(f"{self.base_url}/cryptocurrencies", params={"format": "ndjson"}) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.strip():
+                    active_ids.append(json.loads(line)["id"])
+
+        self._active_ids = active_ids
+        self.version = version
+        logger.info(f"Каталог криптовалют обновлен до версии {version}: {len(active_ids)} активных")
+        return True
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Не удалось обновить каталог криптовалют: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+catalog_client = CatalogClient()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from data.candles import candle_aggregator
+from data.catalog_client import catalog_client
+
+logger = logging.getLogger(__name__)
+
+PRICE_TICK_INTERVAL = float(os.getenv("PRICE_TICK_INTERVAL", "5"))
+
+
+class PriceTicker:
+    """
+    Единственный на сервис опрос текущих цен активных криптовалют.
+
+    Каждая полученная цена попадает в свечи и публикуется тиком в Redis
+    (по тикам notification_service проверяет уведомления) независимо от того,
+    открыты ли вкладки; вебсокеты клиентов только получают последний снимок.
+    """
+
+    def __init__(self, coingecko, redis_cache, interval: float = PRICE_TICK_INTERVAL):
+        self.coingecko = coingecko
+        self.redis_cache = redis_cache
+        self.interval = interval
+        self.prices: Dict[str, float] = {}
+        self._updated: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll(self) -> Dict[str, float]:
+        """
+        Один опрос цен: обновляет свечи, публикует тики и снимок для клиентов.
+
+        Returns:
+            Dict[str, float]: ID криптовалюты -> текущая цена
+        """
+        prices = {}
+        for currency in catalog_client.active_ids():
+            price = await self.coingecko.get_current_price(currency)
+            if price:
+                ts = time.time()
+                prices[currency] = price
+                candle_aggregator.add_tick(currency, price, ts)
+                # Клиент Redis синхронный: публикация не должна задерживать цикл событий
+                await asyncio.to_thread(self.redis_cache.publish_price_tick, currency, price, ts)
+
+        self.prices = prices
+        if self._updated is not None:
+            updated, self._updated = self._updated, asyncio.Event()
+            updated.set()
+        return prices
+
+    async def wait_for_update(self) -> Dict[str, float]:
+        """Ждет следующего опроса и возвращает новый снимок цен."""
+        if self._updated is None:
+            self._updated = asyncio.Event()
+        await self._updated.wait()
+        return self.prices
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при опросе текущих цен: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._updated = asyncio.Event()
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -1,13 +1,17 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import predict, current_price, historical
+from routers import predict, current_price, historical, ohlc
 import asyncio
 import json
 import logging
 from data.fetch_prices import CoinGeckoAPI
 from data.cache_utils import RedisCache
+from data.catalog_client import catalog_client
+from data.price_ticker import PriceTicker
+from models.registry import model_registry
 import redis
 
 # Загрузка переменных окружения
@@ -33,53 +37,80 @@ app.add_middleware(
 app.include_router(predict.router, prefix="/api/predict", tags=["predictions"])
 app.include_router(current_price.router, prefix="/api/price", tags=["prices"])
 app.include_router(historical.router, prefix="/api/historical", tags=["historical"])
+app.include_router(ohlc.router, prefix="/api/ohlc", tags=["ohlc"])
 
 # Инициализация сервисов
 coingecko = CoinGeckoAPI()
 redis_cache = RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379"))
+# Тики цен публикуются одним фоновым опросом, а не каждым вебсокетом клиента
+price_ticker = PriceTicker(coingecko, redis_cache)
+
+# Модели, которые прогреваются в фоне после старта; сервис готов (/ready) после прогрева
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "arima,lstm").split(",") if name.strip()]
+# Модели, библиотеки которых импортируются при загрузке приложения
+# (с gunicorn --preload - один раз до форка воркеров)
+MODEL_PRELOAD = [name.strip() for name in os.getenv("MODEL_PRELOAD", "").split(",") if name.strip()]
+model_registry.preload(MODEL_PRELOAD)
 
 @app.on_event("startup")
 async def startup_event():
+    catalog_client.start()
+    price_ticker.start()
+    model_registry.start_warmup(WARMUP_MODELS)
     logger.info("Сервис прогнозирования запущен")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     # Закрываем соединения при остановке сервиса
+    await price_ticker.close()
     await coingecko.close()
+    await catalog_client.close()
+    await model_registry.close()
     logger.info("Сервис прогнозирования остановлен")
 
 @app.websocket("/ws/updates")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    # Клиент ничего не присылает: чтение нужно только чтобы заметить отключение
+    receiver = asyncio.create_task(websocket.receive_text())
     try:
+        # Последний снимок сразу, затем каждое обновление общего опроса цен
+        prices = price_ticker.prices
         while True:
-            # Получаем список отслеживаемых криптовалют
-            tracked_currencies = ["bitcoin", "ethereum"]  # В реальном приложении получаем из MongoDB
-            
-            # Получаем актуальные цены
-            prices = {}
-            for currency in tracked_currencies:
-                price = await coingecko.get_current_price(currency)
-                if price:
-                    prices[currency] = price
-            
-            # Отправляем обновления
-            await websocket.send_json({
-                "type": "price",
-                "payload": prices
-            })
-            
-            await asyncio.sleep(5)  # Обновляем каждые 5 секунд
-            
+            if prices:
+                await websocket.send_json({
+                    "type": "price",
+                    "payload": prices
+                })
+            update = asyncio.create_task(price_ticker.wait_for_update())
+            done, _ = await asyncio.wait({update, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            prices = update.result() if update in done else None
+            if receiver in done:
+                update.cancel()
+                # Исключение WebSocketDisconnect завершает цикл
+                receiver.result()
+                receiver = asyncio.create_task(websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        await websocket.close()
+        receiver.cancel()
 
 @app.get("/health")
 async def health_check():
+    """Проверка жизнеспособности: процесс запущен и отвечает"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Проверка готовности: 503, пока модели прогреваются"""
+    ready = model_registry.warmup_done
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "warming_up", "models": model_registry.status()}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Чекпоинты весов моделей на локальном диске с ограничением общего размера.
+
+    Каждый чекпоинт - один файл .npz с массивами весов и метаданными в JSON.
+    При превышении max_bytes удаляются давно не использованные чекпоинты
+    (по времени последнего чтения или записи файла). Запись атомарна, поэтому
+    несколько воркеров могут использовать один каталог.
+
+    С max_bytes=None хранилище ничего не удаляет и не меняет при чтении:
+    так хранятся веса, которые нельзя восстановить в сервисе (обученные офлайн),
+    в том числе на смонтированном только для чтения томе.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int]):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".npz")
+
+    def load(self, key: str) -> Optional[Tuple[List[np.ndarray], Dict[str, Any]]]:
+        """
+        Загружает чекпоинт и отмечает его как недавно использованный.
+
+        Returns:
+            Optional[Tuple[List[np.ndarray], Dict[str, Any]]]: (веса, метаданные) или None
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as checkpoint:
+                meta = json.loads(str(checkpoint["meta"]))
+                weights = [checkpoint[f"w{i}"] for i in range(meta["weight_count"])]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            if self.max_bytes is None:
+                logger.error(f"Не удалось прочитать чекпоинт {path}: {str(e)}")
+            else:
+                logger.warning(f"Поврежденный чекпоинт {path} удален: {str(e)}")
+                self._remove(path)
+            return None
+        if self.max_bytes is not None:
+            try:
+                os.utime(path)
+            except OSError as e:
+                logger.warning(f"Не удалось отметить использование чекпоинта {path}: {str(e)}")
+        return weights, meta
+
+    def save(self, key: str, weights: List[np.ndarray], meta: Dict[str, Any]) -> None:
+        """Сохраняет чекпоинт и удаляет старые, если превышен лимит размера"""
+        os.makedirs(self.directory, exist_ok=True)
+        meta = dict(meta, weight_count=len(weights))
+        arrays = {f"w{i}": weight for i, weight in enumerate(weights)}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Удаляет давно не использованные чекпоинты сверх лимита размера.
+
+        Returns:
+            int: Количество удаленных чекпоинтов
+        """
+        if self.max_bytes is None:
+            return 0
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Удалено {removed} старых чекпоинтов из {self.directory}")
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from models.checkpoints import CheckpointStore
+from models.lstm_inference import NumpyLSTM
+from models.registry import ModelUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Общая модель LSTM для всех монет каталога. Обучается офлайн скриптом
+# train_global_lstm.py; сервис только загружает веса и выполняет прямой проход
+GLOBAL_LSTM_DIR = os.getenv("GLOBAL_LSTM_DIR", "checkpoints/global")
+GLOBAL_LSTM_KEY = "global_lstm"
+GLOBAL_LSTM_SEQUENCE_LENGTH = int(os.getenv("GLOBAL_LSTM_SEQUENCE_LENGTH", "30"))
+GLOBAL_LSTM_HORIZON = int(os.getenv("GLOBAL_LSTM_HORIZON", "7"))
+# Как часто сервис проверяет, не обучена ли модель заново
+GLOBAL_LSTM_RELOAD_INTERVAL = float(os.getenv("GLOBAL_LSTM_RELOAD_INTERVAL", "300"))
+
+# Отдельный каталог без вытеснения и удаления файлов: общая модель одна, и
+# ошибка чтения не должна удалять веса до следующего обучения
+global_store = CheckpointStore(GLOBAL_LSTM_DIR, max_bytes=None)
+
+
+def window_features(log_prices: np.ndarray, sequence_length: int, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Окна для общей модели из логарифмов цен одного ряда.
+
+    Каждое окно нормализуется по своей последней известной цене (логарифм
+    отношения к ней), поэтому окна разных монет в одном масштабе, а модель
+    применима и к монетам, которых не было при обучении.
+
+    Args:
+        log_prices: Логарифмы цен ряда
+        sequence_length: Длина входного окна
+        horizon: Количество прогнозируемых шагов
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Входы формы (окна, sequence_length) и цели формы (окна, horizon)
+    """
+    windows = sliding_window_view(log_prices, sequence_length + horizon)
+    anchor = windows[:, sequence_length - 1:sequence_length]
+    return windows[:, :sequence_length] - anchor, windows[:, sequence_length:] - anchor
+
+
+class GlobalWeights:
+    """Загруженные веса общей модели, перечитываются после нового обучения"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded: Optional[Tuple[NumpyLSTM, Dict]] = None
+        self._checked_at: Optional[float] = None
+
+    def get(self) -> Tuple[NumpyLSTM, Dict]:
+        """
+        Возвращает прямой проход и метаданные обучения.
+
+        Каталог весов читается не чаще раза в GLOBAL_LSTM_RELOAD_INTERVAL, в том
+        числе пока модель не обучена. Чтение с диска блокирующее: из асинхронного
+        кода метод вызывается в отдельном потоке.
+
+        Raises:
+            ModelUnavailable: Если общая модель еще не обучена
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= GLOBAL_LSTM_RELOAD_INTERVAL:
+                self._checked_at = now
+                checkpoint = global_store.load(GLOBAL_LSTM_KEY)
+                if checkpoint is not None:
+                    weights, meta = checkpoint
+                    if self._loaded is None or meta["trained_at"] != self._loaded[1]["trained_at"]:
+                        inference = NumpyLSTM.from_weights(weights, activation=meta["activation"])
+                        self._loaded = (inference, meta)
+                        logger.info(
+                            f"Загружена общая модель LSTM от {meta['trained_at']}: "
+                            f"{len(meta['coins'])} монет, {meta['windows']} окон"
+                        )
+            if self._loaded is None:
+                raise ModelUnavailable("Общая модель LSTM не обучена: запустите train_global_lstm.py")
+            return self._loaded
+
+
+global_weights = GlobalWeights()
+
+
+class GlobalLSTMModel:
+    """
+    Прогноз общей моделью LSTM: только прямой проход на numpy без обучения
+    и без TensorFlow в процессе сервиса.
+    """
+
+    def __init__(self):
+        self.inference, self.meta = global_weights.get()
+
+    def forecast(self, data, steps=7):
+        """
+        Прогноз на steps шагов вперед (тот же интерфейс, что у ArimaModel).
+
+        Модель прогнозирует сразу horizon шагов; более длинный горизонт
+        строится блоками, каждый следующий - от последней спрогнозированной цены.
+        """
+        sequence_length = self.meta["sequence_length"]
+        scale = self.meta["scale"]
+        prices = np.asarray(data, dtype=np.float64)
+        if len(prices) < sequence_length:
+            raise ValueError(f"Недостаточно данных для общей модели LSTM: {len(prices)} точек")
+        if np.any(prices <= 0):
+            raise ValueError("Цены должны быть положительными")
+
+        series = np.empty(sequence_length + steps)
+        series[:sequence_length] = np.log(prices[-sequence_length:])
+        buffers = self.inference._buffers(sequence_length)
+        done = 0
+        while done < steps:
+            window = series[done:done + sequence_length]
+            anchor = window[-1]
+            outputs = self.inference.forward((window - anchor) / scale, buffers) * scale + anchor
+            count = min(len(outputs), steps - done)
+            series[sequence_length + done:sequence_length + done + count] = outputs[:count]
+            done += count
+        return np.exp(series[sequence_length:]).tolist()
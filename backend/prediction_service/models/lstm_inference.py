@@ -0,0 +1,152 @@
+import numpy as np
+from typing import List, Tuple
+
+# Функции активации слоев Keras, поддерживаемые прямым проходом на numpy
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0.0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "linear": lambda x: x,
+}
+
+
+class LSTMLayerWeights:
+    """Веса одного слоя LSTM в раскладке Keras: гейты i, f, c, o"""
+
+    def __init__(self, kernel: np.ndarray, recurrent_kernel: np.ndarray, bias: np.ndarray,
+                 activation: str = "tanh", recurrent_activation: str = "sigmoid"):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float64)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.units = self.recurrent_kernel.shape[0]
+        self.activation = ACTIVATIONS[activation]
+        self.recurrent_activation = ACTIVATIONS[recurrent_activation]
+
+
+class NumpyLSTM:
+    """
+    Прямой проход обученной модели Keras (слои LSTM и выходной Dense) на numpy.
+
+    После обучения веса копируются из модели один раз; прогноз на много
+    шагов выполняется одним вызовом без обращений к TensorFlow и с заранее
+    выделенными буферами.
+    """
+
+    def __init__(self, layers: List[LSTMLayerWeights], dense_kernel: np.ndarray, dense_bias: np.ndarray):
+        self.layers = layers
+        self.dense_kernel = np.asarray(dense_kernel, dtype=np.float64)
+        self.dense_bias = np.asarray(dense_bias, dtype=np.float64)
+        self.outputs = self.dense_kernel.shape[1]
+
+    @classmethod
+    def from_keras(cls, model) -> "NumpyLSTM":
+        """
+        Копирует веса из обученной модели Sequential(LSTM..., Dense).
+
+        Args:
+            model: Модель Keras
+
+        Returns:
+            NumpyLSTM: Прямой проход с теми же весами
+        """
+        layers = []
+        dense_kernel = dense_bias = None
+        for layer in model.layers:
+            config = layer.get_config()
+            weights = layer.get_weights()
+            if layer.__class__.__name__ == "LSTM":
+                kernel, recurrent_kernel, bias = weights
+                layers.append(LSTMLayerWeights(
+                    kernel, recurrent_kernel, bias,
+                    activation=config.get("activation", "tanh"),
+                    recurrent_activation=config.get("recurrent_activation", "sigmoid")
+                ))
+            elif layer.__class__.__name__ == "Dense":
+                dense_kernel, dense_bias = weights
+            else:
+                raise ValueError(f"Неподдерживаемый слой: {layer.__class__.__name__}")
+        if not layers or dense_kernel is None:
+            raise ValueError("Ожидается модель из слоев LSTM и выходного Dense")
+        return cls(layers, dense_kernel, dense_bias)
+
+    @classmethod
+    def from_weights(cls, weights: List[np.ndarray], activation: str = "tanh") -> "NumpyLSTM":
+        """
+        Собирает прямой проход из списка весов в порядке model.get_weights():
+        тройки (kernel, recurrent_kernel, bias) слоев LSTM, затем kernel и bias Dense.
+
+        Args:
+            weights: Веса модели
+            activation: Активация слоев LSTM
+
+        Returns:
+            NumpyLSTM: Прямой проход с этими весами
+        """
+        *lstm_weights, dense_kernel, dense_bias = weights
+        layers = [
+            LSTMLayerWeights(*lstm_weights[i:i + 3], activation=activation)
+            for i in range(0, len(lstm_weights), 3)
+        ]
+        return cls(layers, dense_kernel, dense_bias)
+
+    def _buffers(self, length: int) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Буферы слоев: выходы по шагам, состояние ячейки и предактивации гейтов"""
+        return [
+            (np.empty((length, layer.units)), np.empty(layer.units), np.empty(4 * layer.units))
+            for layer in self.layers
+        ]
+
+    def forward(self, window: np.ndarray, buffers=None) -> np.ndarray:
+        """
+        Прямой проход по одному окну.
+
+        Args:
+            window: Окно значений формы (sequence_length,) или (sequence_length, features)
+            buffers: Буферы из _buffers для повторного использования
+
+        Returns:
+            np.ndarray: Выход Dense формы (outputs,)
+        """
+        sequence = window.reshape(len(window), -1)
+        if buffers is None:
+            buffers = self._buffers(len(sequence))
+        for layer, (hidden, cell, gates) in zip(self.layers, buffers):
+            units = layer.units
+            # Проекция входа считается сразу для всех шагов окна
+            projected = sequence @ layer.kernel + layer.bias
+            h_prev = np.zeros(units)
+            cell.fill(0.0)
+            for t in range(len(sequence)):
+                np.dot(h_prev, layer.recurrent_kernel, out=gates)
+                gates += projected[t]
+                # Функция гейтов применяется ко всем четырем блокам сразу, кандидат берется до нее
+                candidate = layer.activation(gates[2 * units:3 * units])
+                activated = layer.recurrent_activation(gates)
+                cell *= activated[units:2 * units]
+                cell += activated[:units] * candidate
+                hidden[t] = activated[3 * units:] * layer.activation(cell)
+                h_prev = hidden[t]
+            sequence = hidden
+        return sequence[-1] @ self.dense_kernel + self.dense_bias
+
+    def rollout(self, window: np.ndarray, steps: int) -> np.ndarray:
+        """
+        Рекурсивный прогноз на steps шагов: каждый прогноз добавляется в
+        конец окна для следующего шага.
+
+        Args:
+            window: Последние sequence_length значений (в масштабе обучения)
+            steps: Количество шагов прогноза
+
+        Returns:
+            np.ndarray: Прогнозы формы (steps,)
+        """
+        window = np.asarray(window, dtype=np.float64).ravel()
+        length = len(window)
+        # Окно и прогнозы в одном буфере: окно следующего шага - срез со сдвигом на 1
+        series = np.empty(length + steps)
+        series[:length] = window
+        buffers = self._buffers(length)
+        for step in range(steps):
+            series[length + step] = self.forward(series[step:step + length], buffers)[0]
+        return series[length:].copy()
@@ -1,37 +1,153 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
+from tensorflow.keras.callbacks import Callback, EarlyStopping
+from models.lstm_inference import NumpyLSTM
+from models.checkpoints import CheckpointStore
+import gc
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Выходной слой: recursive - прогноз на один шаг, повторяемый для каждого дня;
+# direct - сразу все дни горизонта одним выходом Dense
+LSTM_HEADS = ["recursive", "direct"]
+LSTM_HEAD = os.getenv("LSTM_HEAD", "recursive")
+
+# Чекпоинты весов по рядам (монета и интервал): новые запросы дообучают
+# сохраненную модель только на появившихся точках
+LSTM_CHECKPOINT_DIR = os.getenv("LSTM_CHECKPOINT_DIR", "checkpoints/lstm")
+LSTM_CHECKPOINT_MAX_MB = float(os.getenv("LSTM_CHECKPOINT_MAX_MB", "200"))
+LSTM_FINETUNE_EPOCHS = int(os.getenv("LSTM_FINETUNE_EPOCHS", "5"))
+# Допустимый выход новых данных за диапазон чекпоинта (доля его ширины);
+# при большем выходе модель обучается заново
+LSTM_RANGE_TOLERANCE = float(os.getenv("LSTM_RANGE_TOLERANCE", "0.1"))
+LSTM_ACTIVATION = 'relu'
+
+# Параметры обучения: верхняя граница эпох (обучение останавливается раньше,
+# когда ошибка на валидации перестает снижаться), доля последних окон для
+# валидации и терпение ранней остановки. Длина окна и размер батча по умолчанию
+# подбираются по длине ряда (0 - автоматически)
+LSTM_EPOCHS = int(os.getenv("LSTM_EPOCHS", "50"))
+LSTM_VALIDATION_SPLIT = float(os.getenv("LSTM_VALIDATION_SPLIT", "0.1"))
+LSTM_PATIENCE = int(os.getenv("LSTM_PATIENCE", "5"))
+# Эпох до начала отслеживания ранней остановки: ошибка первых эпох шумная,
+# и слишком ранняя остановка оставляет модель недообученной
+LSTM_MIN_EPOCHS = int(os.getenv("LSTM_MIN_EPOCHS", "20"))
+LSTM_SEQUENCE_LENGTH = int(os.getenv("LSTM_SEQUENCE_LENGTH", "0"))
+LSTM_BATCH_SIZE = int(os.getenv("LSTM_BATCH_SIZE", "0"))
+# Минимум окон для валидации: на более коротких рядах ранняя остановка идет по ошибке обучения
+LSTM_MIN_VALIDATION_WINDOWS = 4
+# Короткие ряды обучаются с прежними параметрами: окно 10, батч 32, все
+# epochs эпох без валидации и ранней остановки. Отложенных окон на них слишком
+# мало, и подбор по длине ряда ухудшает прогноз
+LSTM_SHORT_SERIES_POINTS = int(os.getenv("LSTM_SHORT_SERIES_POINTS", "100"))
+LSTM_SHORT_SERIES_BATCH_SIZE = 32
+
+checkpoint_store = CheckpointStore(LSTM_CHECKPOINT_DIR, int(LSTM_CHECKPOINT_MAX_MB * 1024 * 1024))
+
+# Скомпилированные модели Keras по форме (длина окна, число выходов) переиспользуются
+# между обучениями: новая модель на каждый запрос заново строит граф обучения
+# (секунды) и не освобождает память полностью даже после clear_session
+LSTM_MAX_CACHED_MODELS = 8
+keras_models = {}
+
+# Обучение сериализуется: модели Keras из кэша разделяются между потоками
+# (запросы и прогрев)
+keras_lock = threading.Lock()
+
+
+# Длина окна по длине ряда: (минимальная длина ряда, длина окна)
+LSTM_SEQUENCE_LENGTHS = [(0, 10), (LSTM_SHORT_SERIES_POINTS, 14), (240, 20)]
+# Горизонт прогноза по умолчанию: для выходного слоя direct от него зависит форма модели
+LSTM_DEFAULT_HORIZON = 7
+
+
+def sequence_length_for(length):
+    """Длина окна по длине ряда: длинным рядам - более длинный контекст"""
+    if LSTM_SEQUENCE_LENGTH > 0:
+        return LSTM_SEQUENCE_LENGTH
+    sequence_length = LSTM_SEQUENCE_LENGTHS[0][1]
+    for min_length, window in LSTM_SEQUENCE_LENGTHS:
+        if length >= min_length:
+            sequence_length = window
+    return sequence_length
+
+
+def batch_size_for(samples):
+    """Размер батча по числу окон: на коротких рядах - больше шагов оптимизатора за эпоху"""
+    if LSTM_BATCH_SIZE > 0:
+        return LSTM_BATCH_SIZE
+    return int(min(64, max(8, samples // 8)))
+
+
+class ValidationLoss(Callback):
+    """
+    val_loss на отложенных окнах одним прямым проходом в конце эпохи.
+    Встроенная валидация Keras создает итератор данных на каждой эпохе,
+    что на коротких рядах дольше самого обучения. predict_on_batch
+    использует скомпилированную функцию, в отличие от вызова model(X).
+    """
+
+    def __init__(self, X, y):
+        super().__init__()
+        self.X = np.asarray(X, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+
+    def on_epoch_end(self, epoch, logs=None):
+        predictions = self.model.predict_on_batch(self.X).reshape(self.y.shape)
+        logs["val_loss"] = float(np.mean((predictions - self.y) ** 2))
+
+
+def training_dataset(X, y, batch_size):
+    """
+    Бесконечный перемешиваемый поток батчей: с steps_per_epoch Keras
+    создает итератор один раз на обучение, а не на каждую эпоху.
+    """
+    return (
+        tf.data.Dataset.from_tensor_slices((X.astype(np.float32), y.astype(np.float32)))
+        .shuffle(len(X), reshuffle_each_iteration=True)
+        .batch(batch_size)
+        .repeat()
+    )
+
+
 class LSTMModel:
-    def __init__(self):
-        self.model = None
+    def __init__(self, head: str = LSTM_HEAD):
+        if head not in LSTM_HEADS:
+            raise ValueError(f"Неизвестный выходной слой LSTM: {head}")
+        self.inference = None
+        self.head = head
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         self.sequence_length = 10
         
-    def prepare_data(self, data):
-        """Подготовка данных для LSTM"""
+    def prepare_data(self, data, horizon=1, fit_scaler=True):
+        """Подготовка данных для LSTM: окна длины sequence_length и следующие horizon значений"""
         try:
             # Преобразуем данные в numpy массив и изменяем форму для скейлера
             data_array = np.array(data).reshape(-1, 1)
             
             # Нормализуем данные
-            scaled_data = self.scaler.fit_transform(data_array)
+            if fit_scaler:
+                self.scaler.fit(data_array)
+            scaled_data = self.scaler.transform(data_array)
             
-            X, y = [], []
-            for i in range(len(scaled_data) - self.sequence_length):
-                X.append(scaled_data[i:(i + self.sequence_length), 0])
-                y.append(scaled_data[i + self.sequence_length, 0])
-                
-            X = np.array(X)
-            y = np.array(y)
+            # Окна длины sequence_length + horizon без копирования данных:
+            # первые sequence_length значений - вход, остальные - цели
+            window = self.sequence_length + horizon
+            if len(scaled_data) < window:
+                raise ValueError(f"Недостаточно данных для LSTM: {len(scaled_data)} точек")
+            windows = sliding_window_view(scaled_data[:, 0], window)
             
-            # Изменяем форму для LSTM [samples, time steps, features]
-            X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+            # Форма для LSTM [samples, time steps, features]
+            X = windows[:, :self.sequence_length, np.newaxis]
+            y = windows[:, self.sequence_length] if horizon == 1 else windows[:, self.sequence_length:]
             
             return X, y
             
@@ -39,13 +155,13 @@ class LSTMModel:
             logger.error(f"Ошибка при подготовке данных для LSTM: {str(e)}")
             raise
     
-    def create_model(self, sequence_length):
+    def create_model(self, sequence_length, outputs=1):
         """Создание модели LSTM"""
         try:
             model = Sequential([
-                LSTM(50, activation='relu', input_shape=(sequence_length, 1), return_sequences=True),
-                LSTM(50, activation='relu'),
-                Dense(1)
+                LSTM(50, activation=LSTM_ACTIVATION, input_shape=(sequence_length, 1), return_sequences=True),
+                LSTM(50, activation=LSTM_ACTIVATION),
+                Dense(outputs)
             ])
             
             model.compile(optimizer='adam', loss='mse')
@@ -55,38 +171,207 @@ class LSTMModel:
             logger.error(f"Ошибка при создании модели LSTM: {str(e)}")
             raise
     
-    def predict(self, data, days_forward):
-        """Прогнозирование цен"""
+    def _keras_model(self, outputs):
+        """
+        Модель Keras нужной формы из кэша с начальными весами и сброшенным
+        состоянием оптимизатора. Вызывается под keras_lock.
+        """
+        shape = (self.sequence_length, outputs)
+        if shape not in keras_models:
+            if len(keras_models) >= LSTM_MAX_CACHED_MODELS:
+                keras_models.clear()
+                tf.keras.backend.clear_session()
+                gc.collect()
+            model = self.create_model(*shape)
+            keras_models[shape] = (model, model.get_weights())
+        model, initial_weights = keras_models[shape]
+        model.set_weights(initial_weights)
+        # Сбрасываются счетчик шагов и моменты Adam; скорость обучения в Keras 3
+        # тоже хранится среди переменных оптимизатора и должна сохраниться
+        learning_rate = model.optimizer.learning_rate
+        for variable in model.optimizer.variables:
+            if variable is not learning_rate:
+                variable.assign(tf.zeros_like(variable))
+        return model
+    
+    def _train(self, data, horizon, epochs, initial_weights=None):
+        """
+        Обучает модель (или дообучает с initial_weights) и возвращает ее веса.
+        Последние окна ряда отводятся под валидацию; обучение останавливается,
+        когда ошибка на них перестает снижаться, и веса откатываются к лучшей эпохе.
+        Ряды короче LSTM_SHORT_SERIES_POINTS обучаются все epochs эпох без валидации.
+        """
+        X, y = self.prepare_data(data, horizon, fit_scaler=False)
+        early_stopping = len(data) >= LSTM_SHORT_SERIES_POINTS
+        validation_windows = int(len(X) * LSTM_VALIDATION_SPLIT) if early_stopping else 0
+        if validation_windows < LSTM_MIN_VALIDATION_WINDOWS:
+            validation_windows = 0
+        train_windows = len(X) - validation_windows
+        if early_stopping or LSTM_BATCH_SIZE > 0:
+            batch_size = batch_size_for(train_windows)
+        else:
+            batch_size = LSTM_SHORT_SERIES_BATCH_SIZE
+        batch_size = min(batch_size, train_windows)
+        callbacks = []
+        if validation_windows:
+            callbacks.append(ValidationLoss(X[train_windows:], y[train_windows:]))
+        monitor = "val_loss" if validation_windows else "loss"
+        if early_stopping:
+            callbacks.append(EarlyStopping(
+                monitor=monitor,
+                patience=LSTM_PATIENCE,
+                restore_best_weights=True,
+                start_from_epoch=LSTM_MIN_EPOCHS
+            ))
+        
+        with keras_lock:
+            started = time.perf_counter()
+            model = self._keras_model(horizon)
+            if initial_weights is not None:
+                model.set_weights(initial_weights)
+            history = model.fit(
+                training_dataset(X[:train_windows], y[:train_windows], batch_size),
+                epochs=epochs,
+                steps_per_epoch=-(-train_windows // batch_size),
+                # Батчи перемешивает сам поток training_dataset
+                shuffle=False,
+                callbacks=callbacks,
+                verbose=0
+            )
+            weights = model.get_weights()
+        
+        # При epochs=0 (например, LSTM_FINETUNE_EPOCHS=0) история пуста
+        losses = history.history.get(monitor, [])
+        best_loss = f"{min(losses):.5f}" if losses else "-"
+        logger.info(
+            f"LSTM обучен за {time.perf_counter() - started:.2f} с: {len(X)} окон по "
+            f"{self.sequence_length}, батч {batch_size}, эпох {len(losses)}/{epochs}, "
+            f"{monitor} {best_loss}"
+        )
+        return weights
+    
+    def _fit_scaler(self, low, high):
+        self.scaler.fit(np.array([[low], [high]], dtype=np.float64))
+    
+    def _fit_weights(self, data, horizon, checkpoint_key, timestamps):
+        """
+        Веса для прогноза: из чекпоинта ряда, дообученные на новых точках,
+        или обученные заново, если чекпоинта нет.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        self.sequence_length = sequence_length_for(len(data))
+        key = None
+        if checkpoint_key is not None and timestamps is not None:
+            key = f"{checkpoint_key}_{self.head}_{horizon}_{self.sequence_length}"
+            checkpoint = checkpoint_store.load(key)
+            if checkpoint is not None and self._range_exceeded(checkpoint[1], data):
+                # Веса обучены на другом масштабе: входы сжались бы в незнакомую
+                # модели часть [0, 1], дообучения на последних окнах для этого мало
+                logger.info(f"Данные вышли за диапазон чекпоинта {key}, обучаем заново")
+                checkpoint = None
+            if checkpoint is not None:
+                weights, meta = checkpoint
+                # Небольшой выход за диапазон: масштаб расширяется, модель дообучается
+                low = min(meta["data_min"], float(data.min()))
+                high = max(meta["data_max"], float(data.max()))
+                self._fit_scaler(low, high)
+                new_points = sum(1 for ts in timestamps if ts > meta["last_timestamp"])
+                if new_points == 0 and (low, high) == (meta["data_min"], meta["data_max"]):
+                    return weights
+                # Дообучение только на окнах, цели которых попадают на новые точки
+                tail = min(len(data), max(new_points, 1) + self.sequence_length + horizon - 1)
+                try:
+                    weights = self._train(data[-tail:], horizon, LSTM_FINETUNE_EPOCHS, initial_weights=weights)
+                    self._save_checkpoint(key, weights, low, high, timestamps[-1])
+                    return weights
+                except ValueError as e:
+                    # Чекпоинт другой архитектуры: обучаем модель заново
+                    logger.warning(f"Чекпоинт {key} не подходит, обучаем заново: {str(e)}")
+        
+        self._fit_scaler(float(data.min()), float(data.max()))
+        weights = self._train(data, horizon, LSTM_EPOCHS)
+        if key is not None:
+            self._save_checkpoint(key, weights, float(data.min()), float(data.max()), timestamps[-1])
+        return weights
+    
+    @staticmethod
+    def _range_exceeded(meta, data):
+        """Новые данные выходят за диапазон чекпоинта больше чем на LSTM_RANGE_TOLERANCE его ширины"""
+        margin = LSTM_RANGE_TOLERANCE * (meta["data_max"] - meta["data_min"])
+        return float(data.min()) < meta["data_min"] - margin or float(data.max()) > meta["data_max"] + margin
+    
+    def _save_checkpoint(self, key, weights, low, high, last_timestamp):
+        try:
+            checkpoint_store.save(key, weights, {
+                "data_min": low,
+                "data_max": high,
+                "last_timestamp": last_timestamp,
+                "activation": LSTM_ACTIVATION
+            })
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить чекпоинт {key}: {str(e)}")
+    
+    def predict(self, data, days_forward, checkpoint_key=None, timestamps=None):
+        """
+        Прогнозирование цен.
+        
+        Args:
+            data: Исторические цены
+            days_forward: Количество шагов прогноза
+            checkpoint_key: Ключ ряда (монета и интервал) для чекпоинта весов
+            timestamps: Метки времени цен; по ним определяются новые точки для дообучения
+        """
         try:
-            # Подготовка данных
-            X, y = self.prepare_data(data)
+            horizon = days_forward if self.head == "direct" else 1
+            weights = self._fit_weights(data, horizon, checkpoint_key, timestamps)
             
-            # Создание и обучение модели
-            self.model = self.create_model(self.sequence_length)
-            self.model.fit(X, y, epochs=50, batch_size=32, verbose=0)
+            # Прямой проход на numpy: прогноз на все дни выполняется одним вызовом без Keras
+            self.inference = NumpyLSTM.from_weights(weights, activation=LSTM_ACTIVATION)
             
             # Подготовка последней известной последовательности
             last_sequence = np.array(data[-self.sequence_length:]).reshape(-1, 1)
-            last_sequence_scaled = self.scaler.transform(last_sequence)
+            last_sequence_scaled = self.scaler.transform(last_sequence).ravel()
             
             # Прогнозирование
-            predictions = []
-            current_sequence = last_sequence_scaled.reshape(1, self.sequence_length, 1)
-            
-            for _ in range(days_forward):
-                predicted_value = self.model.predict(current_sequence, verbose=0)
-                predictions.append(predicted_value[0, 0])
-                
-                # Обновляем последовательность для следующего прогноза
-                current_sequence = np.roll(current_sequence, -1)
-                current_sequence[0, -1, 0] = predicted_value
+            if self.head == "direct":
+                predictions = self.inference.forward(last_sequence_scaled)
+            else:
+                predictions = self.inference.rollout(last_sequence_scaled, days_forward)
             
             # Преобразуем предсказания обратно в исходный масштаб
-            predictions_array = np.array(predictions).reshape(-1, 1)
+            predictions_array = predictions.reshape(-1, 1)
             predictions_rescaled = self.scaler.inverse_transform(predictions_array)
             
             return predictions_rescaled.flatten()
             
         except Exception as e:
             logger.error(f"Ошибка при прогнозировании LSTM: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def forecast(self, data, steps=7, checkpoint_key=None, timestamps=None):
+        """Прогноз на steps шагов вперед (тот же интерфейс, что у ArimaModel)"""
+        return self.predict(data, steps, checkpoint_key, timestamps).tolist()
+
+    def warmup(self):
+        """
+        Прогрев TensorFlow: инициализирует рантайм и строит модели Keras всех
+        форм, которые используют запросы (каждая длина окна, число выходов
+        слоя self.head), коротким обучением и прогнозом, чтобы первый запрос
+        не платил за инициализацию.
+        """
+        horizon = LSTM_DEFAULT_HORIZON if self.head == "direct" else 1
+        if LSTM_SEQUENCE_LENGTH > 0:
+            sequence_lengths = [LSTM_SEQUENCE_LENGTH]
+        else:
+            sequence_lengths = sorted({window for _, window in LSTM_SEQUENCE_LENGTHS})
+        for sequence_length in sequence_lengths:
+            self.sequence_length = sequence_length
+            data = 100 + np.sin(np.arange(3 * sequence_length + horizon) / 3)
+            self._fit_scaler(float(data.min()), float(data.max()))
+            weights = self._train(data, horizon, epochs=1)
+            window = self.scaler.transform(data[-sequence_length:].reshape(-1, 1)).ravel()
+            inference = NumpyLSTM.from_weights(weights, activation=LSTM_ACTIVATION)
+            if self.head == "direct":
+                inference.forward(window)
+            else:
+                inference.rollout(window, 2)
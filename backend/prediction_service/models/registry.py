@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Движок -> (модуль, класс). Модули импортируются только при первом использовании:
+# они тянут за собой TensorFlow, statsmodels и scikit-learn
+ENGINES = {
+    "arima": ("models.arima_model", "ArimaModel"),
+    "lstm": ("models.lstm_model", "LSTMModel"),
+    "global_lstm": ("models.global_lstm", "GlobalLSTMModel"),
+}
+
+
+class ModelUnavailable(Exception):
+    """Библиотеки движка прогнозирования не установлены или не импортируются"""
+
+
+def warmup_series(length: int = 60) -> list:
+    """Синтетический ряд цен для прогрева моделей"""
+    x = np.arange(length, dtype=np.float64)
+    return (100 + 0.5 * x + 5 * np.sin(x / 3)).tolist()
+
+
+class ModelRegistry:
+    """
+    Реестр движков прогнозирования с ленивым импортом.
+
+    Классы моделей загружаются при первом запросе к движку, а не при
+    импорте приложения; фоновый прогрев заранее импортирует библиотеки и
+    выполняет пробный прогноз, чтобы первый настоящий запрос не платил
+    за инициализацию. Время импорта и прогрева сохраняется для диагностики.
+    """
+
+    def __init__(self, engines: Dict[str, tuple] = ENGINES):
+        self.engines = engines
+        self._classes: Dict[str, type] = {}
+        self._errors: Dict[str, str] = {}
+        self._warm: Dict[str, bool] = {}
+        self._warmup_errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Dict[str, float]] = {name: {} for name in engines}
+        self.warmup_done = False
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def model_class(self, name: str) -> type:
+        """
+        Возвращает класс модели, импортируя его модуль при первом обращении.
+
+        Args:
+            name: Имя движка (arima, lstm)
+
+        Returns:
+            type: Класс модели
+
+        Raises:
+            ModelUnavailable: Если библиотеки движка не удалось импортировать
+        """
+        if name not in self.engines:
+            raise ValueError(f"Неизвестная модель: {name}")
+        model_class = self._classes.get(name)
+        if model_class is not None:
+            return model_class
+
+        with self._lock:
+            if name in self._classes:
+                return self._classes[name]
+            if name in self._errors:
+                raise ModelUnavailable(self._errors[name])
+            module_name, class_name = self.engines[name]
+            started = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                self._errors[name] = f"Модель {name} недоступна: {str(e)}"
+                logger.error(self._errors[name])
+                raise ModelUnavailable(self._errors[name])
+            self.timings[name]["import"] = time.perf_counter() - started
+            logger.info(f"Модель {name} загружена за {self.timings[name]['import']:.2f} с")
+            self._classes[name] = getattr(module, class_name)
+            return self._classes[name]
+
+    def create(self, name: str):
+        """Создает новый экземпляр модели: экземпляры хранят состояние обучения и не разделяются между запросами"""
+        return self.model_class(name)()
+
+    def preload(self, names: Iterable[str]) -> None:
+        """
+        Импортирует библиотеки движков без прогрева. Вызывается при импорте
+        приложения, чтобы с gunicorn --preload модули загружались один раз
+        до форка воркеров.
+        """
+        for name in names:
+            try:
+                self.model_class(name)
+            except ModelUnavailable:
+                pass
+
+    def warmup_engine(self, name: str) -> None:
+        """Импортирует движок и выполняет пробный прогноз на синтетическом ряде"""
+        model = self.create(name)
+        started = time.perf_counter()
+        if hasattr(model, "warmup"):
+            model.warmup()
+        else:
+            model.forecast(warmup_series(), steps=2)
+        self.timings[name]["warmup"] = time.perf_counter() - started
+        self._warm[name] = True
+        logger.info(f"Модель {name} прогрета за {self.timings[name]['warmup']:.2f} с")
+
+    async def warmup(self, names: Iterable[str]) -> None:
+        """Прогревает движки по очереди в отдельном потоке, не блокируя цикл событий"""
+        try:
+            for name in names:
+                try:
+                    await asyncio.to_thread(self.warmup_engine, name)
+                except ModelUnavailable:
+                    pass
+                except Exception as e:
+                    # Модель остается доступной: она инициализируется при первом запросе
+                    self._warmup_errors[name] = f"Ошибка прогрева модели {name}: {str(e)}"
+                    logger.error(self._warmup_errors[name])
+        finally:
+            self.warmup_done = True
+
+    def start_warmup(self, names: Iterable[str]) -> None:
+        names = [name for name in names if name in self.engines]
+        self._warmup_task = asyncio.create_task(self.warmup(names))
+
+    async def close(self) -> None:
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+
+    def status(self) -> Dict[str, dict]:
+        """Состояние каждого движка: not_loaded, loaded, warm или unavailable"""
+        result = {}
+        for name in self.engines:
+            if name in self._errors:
+                state = "unavailable"
+            elif self._warm.get(name):
+                state = "warm"
+            elif name in self._classes:
+                state = "loaded"
+            else:
+                state = "not_loaded"
+            entry = {"state": state, "timings": self.timings[name]}
+            error = self._errors.get(name) or self._warmup_errors.get(name)
+            if error:
+                entry["error"] = error
+            result[name] = entry
+        return result
+
+
+model_registry = ModelRegistry()
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, HTTPException
 from services.coingecko_service import CoinGeckoService
 from data.cache_utils import RedisCache
+from data.candles import candle_aggregator
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Подключение к Redis создается один раз при первом запросе, а не на каждый запрос
+redis_cache = RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379"))
+
 @router.get("/{currency}")
 async def get_current_price(currency: str):
     try:
         # Инициализация сервисов
         coin_gecko = CoinGeckoService()
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        redis_cache = RedisCache(redis_url)
         
         # Проверяем кэш
         cached_price = redis_cache.get_current_price(currency)
@@ -27,7 +29,9 @@ async def get_current_price(currency: str):
             logger.error(f"Не удалось получить цену для {currency}")
             raise HTTPException(status_code=404, detail="Price not found")
         
-        # Кэшируем результат
+        # Учитываем свежую цену в свечах, публикуем тик и кэшируем результат
+        candle_aggregator.add_tick(currency, price_data)
+        redis_cache.publish_price_tick(currency, price_data)
         redis_cache.set_current_price(currency, price_data)
         
         return {"price": price_data}
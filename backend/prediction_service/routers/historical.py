@@ -3,9 +3,10 @@ from typing import List, Optional
 import os
 import logging
 import json
+import asyncio
 from datetime import datetime, timedelta
 import numpy as np
-from models.arima_model import ArimaModel
+from models.registry import model_registry, ModelUnavailable
 from services.coingecko_service import CoinGeckoService
 from data.cache_utils import RedisCache
 import traceback
@@ -172,11 +173,11 @@ async def get_prediction(
                 prices = np.array([price[1] for price in historical_data])
                 timestamps = [price[0] for price in historical_data]
                 
-                model = ArimaModel()
+                model = model_registry.create("arima")
                 logger.info(f"Обучаем модель ARIMA: period={period}, days={days}, prices_len={len(prices)}")
-                model.train(prices)
-                
-                predictions = model.forecast(prices, steps=days)
+                # forecast сам обучает модель на prices; обучение и прогноз -
+                # в отдельном потоке, чтобы не блокировать цикл событий
+                predictions = await asyncio.to_thread(model.forecast, prices, steps=days)
                 logger.info(f"Сгенерирован прогноз: predictions_len={len(predictions)} (ожидалось {days})")
                 
                 last_timestamp = timestamps[-1]
@@ -184,7 +185,7 @@ async def get_prediction(
                     last_timestamp + (i + 1) * 24 * 60 * 60 * 1000
                     for i in range(len(predictions))
                 ]
-                prediction_data = list(zip(prediction_timestamps, predictions.tolist()))
+                prediction_data = list(zip(prediction_timestamps, [float(p) for p in predictions]))
                 
                 result = {
                     "predictions": prediction_data,
@@ -194,6 +195,10 @@ async def get_prediction(
                 }
                 cache.set(cache_key, result, ttl=3600)
                 return result
+            except HTTPException:
+                raise
+            except ModelUnavailable as e:
+                raise HTTPException(status_code=503, detail=str(e))
             except Exception as e:
                 error_msg = f"Ошибка при генерации прогноза: {str(e)}\n{traceback.format_exc()}"
                 logger.error(error_msg)
@@ -255,19 +260,15 @@ async def predict_by_dates(
         prices = np.array([price[1] for price in historical_data])
         timestamps = [price[0] for price in historical_data]
         # Выбираем модель
-        if model.lower() == "lstm":
-            from models.lstm_model import LSTMModel
-            m = LSTMModel()
-        else:
-            m = ArimaModel()
-        m.train(prices)
-        predictions = m.forecast(days_to_predict)
+        m = model_registry.create("lstm" if model.lower() == "lstm" else "arima")
+        # forecast сам обучает модель на prices
+        predictions = await asyncio.to_thread(m.forecast, prices, steps=days_to_predict)
         # Формируем даты для прогноза
         last_known = int(datetime.combine(training_end, datetime.min.time()).timestamp() * 1000)
         prediction_timestamps = [
             last_known + (i + 1) * 24 * 60 * 60 * 1000 for i in range(days_to_predict)
         ]
-        prediction_data = list(zip(prediction_timestamps, predictions.tolist()))
+        prediction_data = list(zip(prediction_timestamps, [float(p) for p in predictions]))
         return {
             "predictions": prediction_data,
             "coin_id": coin_id,
@@ -276,6 +277,10 @@ async def predict_by_dates(
             "model": model,
             "interval": interval
         }
+    except HTTPException:
+        raise
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Ошибка при прогнозе по диапазону дат: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
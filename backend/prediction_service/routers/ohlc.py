@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Path, Query
+from typing import Optional
+from data.candles import candle_aggregator, CANDLE_INTERVALS
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/{coin_id}/{interval}")
+async def get_ohlc(
+    coin_id: str = Path(..., description="ID криптовалюты"),
+    interval: str = Path(..., description="Интервал свечей (1m, 5m, 1h, 1d)"),
+    limit: Optional[int] = Query(None, ge=1, description="Количество последних свечей")
+):
+    """
+    Получение OHLC-свечей, собранных из наблюдаемых тиков цен.
+    """
+    if interval not in CANDLE_INTERVALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неподдерживаемый интервал: {interval}. Используйте {', '.join(CANDLE_INTERVALS.keys())}"
+        )
+
+    candles = candle_aggregator.get_candles(coin_id, interval, limit)
+    if not candles:
+        raise HTTPException(status_code=404, detail=f"Нет данных о свечах для {coin_id}")
+
+    return {
+        "coin_id": coin_id,
+        "interval": interval,
+        "candles": candles
+    }
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
-from models.lstm_model import LSTMModel
-from models.arima_model import ArimaModel
+from models.registry import model_registry, ModelUnavailable
 from services.coingecko_service import CoinGeckoService
 from data.cache_utils import RedisCache
 import os
@@ -22,13 +21,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Инициализация моделей и API
-lstm_model = LSTMModel()
-arima_model = ArimaModel()
+# Инициализация API; модели создаются через реестр при первом запросе
 coingecko = CoinGeckoService()
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 cache = RedisCache(redis_url)
 
+# Запросы к LSTM обслуживаются общей моделью (train_global_lstm.py), если она обучена;
+# иначе модель обучается по ряду монеты прямо в запросе
+LSTM_GLOBAL = os.getenv("LSTM_GLOBAL", "false").lower() in ("1", "true", "yes")
+
 class PredictionRequest(BaseModel):
     coin_id: str
     days: int = 7
@@ -47,11 +48,32 @@ async def predict_price(request: PredictionRequest):
             logger.info(f"Возвращаем результат из кэша для {request.coin_id}")
             return cached_result
 
+        # Выбираем модель
+        engine = "lstm" if request.model.lower() == "lstm" else "arima"  # arima по умолчанию
+        model = None
+        if engine == "lstm" and LSTM_GLOBAL:
+            try:
+                # Создание модели читает веса с диска (раз в GLOBAL_LSTM_RELOAD_INTERVAL)
+                model = await asyncio.to_thread(model_registry.create, "global_lstm")
+                engine = "global_lstm"
+            except ModelUnavailable as e:
+                logger.warning(f"{str(e)}; обучаем LSTM по ряду {request.coin_id}")
+        try:
+            if model is None:
+                model = model_registry.create(engine)
+        except ModelUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        logger.debug(f"Используем модель {engine.upper()}")
+
         # Получаем исторические данные
         training_days = request.days * 3 if request.interval == "daily" else request.days * 7
-        logger.debug(f"Запрашиваем исторические данные за {training_days} дней")
+        fetch_days = training_days
+        if engine == "global_lstm":
+            # Общей модели нужно полное входное окно; в ответ идет прежний период
+            fetch_days = max(training_days, model.meta["sequence_length"])
+        logger.debug(f"Запрашиваем исторические данные за {fetch_days} дней")
         
-        historical_data = await coingecko.get_historical_prices(request.coin_id, training_days)
+        historical_data = await coingecko.get_historical_prices(request.coin_id, fetch_days)
         
         if not historical_data:
             error_msg = f"Не удалось получить исторические данные для {request.coin_id}"
@@ -61,14 +83,22 @@ async def predict_price(request: PredictionRequest):
         # Извлекаем только цены
         prices = [price for _, price in historical_data]
         logger.debug(f"Получено {len(prices)} исторических цен")
+        if fetch_days > training_days:
+            historical_data = historical_data[-(training_days + 1):]
 
-        # Выбираем модель и делаем прогноз
-        if request.model.lower() == "lstm":
-            logger.debug("Используем модель LSTM")
-            predictions = lstm_model.forecast(prices)
-        else:  # arima по умолчанию
-            logger.debug("Используем модель ARIMA")
-            predictions = arima_model.forecast(prices)
+        # Делаем прогноз
+        # Обучение и прогноз выполняются в отдельном потоке: они занимают секунды,
+        # а обучение LSTM еще и ждет keras_lock, пока идет прогрев
+        if engine == "lstm":
+            # Веса LSTM сохраняются по ряду и дообучаются только на новых точках
+            predictions = await asyncio.to_thread(
+                model.forecast,
+                prices,
+                checkpoint_key=f"{request.coin_id}_{request.interval}",
+                timestamps=[ts for ts, _ in historical_data]
+            )
+        else:
+            predictions = await asyncio.to_thread(model.forecast, prices)
 
         # Получаем последнюю известную дату и создаем будущие даты
         last_date = historical_data[-1][0]
@@ -96,6 +126,8 @@ async def predict_price(request: PredictionRequest):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = f"Ошибка при создании прогноза: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
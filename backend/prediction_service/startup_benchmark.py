@@ -0,0 +1,100 @@
+"""
+Замер времени старта сервиса прогнозирования.
+
+Каждый замер выполняется в отдельном процессе, чтобы импорты были холодными:
+- время импорта приложения (main) - без моделей, они загружаются лениво;
+- время импорта библиотек каждой модели;
+- задержка первого прогноза без прогрева и после прогрева.
+
+Запуск:
+    python startup_benchmark.py
+    python startup_benchmark.py --models arima --series-length 90 --steps 7
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def probe_app_import() -> dict:
+    started = time.perf_counter()
+    import main  # noqa: F401
+    return {"import_seconds": time.perf_counter() - started}
+
+
+def probe_model(name: str, warm: bool, series_length: int, steps: int) -> dict:
+    from models.registry import model_registry, warmup_series
+
+    result = {}
+    if warm:
+        started = time.perf_counter()
+        model_registry.warmup_engine(name)
+        result["warmup_seconds"] = time.perf_counter() - started
+
+    series = warmup_series(series_length)
+    started = time.perf_counter()
+    model = model_registry.create(name)
+    model.forecast(series, steps=steps)
+    result["first_forecast_seconds"] = time.perf_counter() - started
+    result["import_seconds"] = model_registry.timings[name].get("import", 0.0)
+    return result
+
+
+def run_probe(args: list) -> dict:
+    """Запускает замер в новом процессе и возвращает его результат"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--probe"] + args,
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {"error": error[-1] if error else f"exit code {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(models: list, series_length: int, steps: int):
+    app = run_probe(["app"])
+    if "error" in app:
+        print(f"app import: ошибка - {app['error']}")
+    else:
+        print(f"app import: {app['import_seconds']:.2f} с")
+
+    for name in models:
+        for warm in (False, True):
+            label = "после прогрева" if warm else "без прогрева"
+            result = run_probe(["model", name, str(int(warm)), str(series_length), str(steps)])
+            if "error" in result:
+                print(f"{name} ({label}): ошибка - {result['error']}")
+                continue
+            line = (
+                f"{name} ({label}): импорт {result['import_seconds']:.2f} с, "
+                f"первый прогноз {result['first_forecast_seconds']:.3f} с"
+            )
+            if warm:
+                line += f", прогрев {result['warmup_seconds']:.2f} с"
+            print(line)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--probe":
+        # Внутренний режим: один замер в чистом процессе, результат - JSON в stdout
+        sys.path.insert(0, SERVICE_DIR)
+        if sys.argv[2] == "app":
+            print(json.dumps(probe_app_import()))
+        else:
+            name, warm, series_length, steps = sys.argv[3], sys.argv[4] == "1", int(sys.argv[5]), int(sys.argv[6])
+            print(json.dumps(probe_model(name, warm, series_length, steps)))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Время импорта и первого прогноза сервиса прогнозирования")
+    parser.add_argument("--models", default="arima,lstm", help="модели через запятую")
+    parser.add_argument("--series-length", type=int, default=90, help="длина ряда для прогноза")
+    parser.add_argument("--steps", type=int, default=7, help="горизонт прогноза")
+    args = parser.parse_args()
+    main([name.strip() for name in args.models.split(",") if name.strip()], args.series_length, args.steps)
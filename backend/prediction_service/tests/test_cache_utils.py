@@ -0,0 +1,48 @@
+import os
+import sys
+
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import cache_utils  # noqa: E402
+from data.cache_utils import RedisCache  # noqa: E402
+
+
+class DroppedClient:
+    """Клиент, который прошел ping и потерял связь на первой операции"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        self.calls += 1
+        raise redis.ConnectionError("Connection reset by peer")
+
+
+def test_dropped_connection_waits_retry_interval(monkeypatch):
+    """После обрыва связи операции не обращаются к Redis до REDIS_RETRY_INTERVAL"""
+    clients = []
+    now = [1000.0]
+
+    def from_url(url, **kwargs):
+        clients.append(DroppedClient())
+        return clients[-1]
+
+    monkeypatch.setattr(cache_utils.redis, "from_url", from_url)
+    monkeypatch.setattr(cache_utils.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(cache_utils, "REDIS_RETRY_INTERVAL", 30.0)
+    cache = RedisCache("redis://localhost:6379")
+
+    assert cache.get("key") is None
+    assert cache.get("key") is None
+    assert cache.set("key", 1) is False
+    assert len(clients) == 1
+    assert clients[0].calls == 1
+
+    now[0] += 30.0
+    assert cache.get("key") is None
+    assert len(clients) == 2
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import global_lstm  # noqa: E402
+from models.global_lstm import GlobalWeights  # noqa: E402
+from models.registry import ModelUnavailable  # noqa: E402
+
+
+def test_missing_weights_are_not_reread_before_reload_interval(monkeypatch):
+    """Пока общая модель не обучена, каталог читается не чаще раза в интервал"""
+    loads = []
+    now = [1000.0]
+    monkeypatch.setattr(global_lstm.global_store, "load", lambda key: loads.append(key))
+    monkeypatch.setattr(global_lstm.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(global_lstm, "GLOBAL_LSTM_RELOAD_INTERVAL", 300.0)
+    weights = GlobalWeights()
+
+    for _ in range(3):
+        with pytest.raises(ModelUnavailable):
+            weights.get()
+    assert len(loads) == 1
+
+    now[0] += 300.0
+    with pytest.raises(ModelUnavailable):
+        weights.get()
+    assert len(loads) == 2
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("tensorflow")
+
+from models import lstm_model  # noqa: E402
+from models.lstm_model import LSTMModel  # noqa: E402
+
+
+def trending_series(length=40):
+    x = np.arange(length, dtype=np.float64)
+    return 100 + 0.5 * x + 2 * np.sin(x / 3)
+
+
+def test_train_changes_weights_on_every_fit():
+    model = LSTMModel()
+    data = trending_series()
+    model._fit_scaler(float(data.min()), float(data.max()))
+
+    # Повторные обучения используют модель из кэша со сброшенным оптимизатором
+    for _ in range(2):
+        weights = model._train(data, 1, epochs=2)
+        keras_model, initial_weights = lstm_model.keras_models[(model.sequence_length, 1)]
+        assert any(not np.allclose(w, w0) for w, w0 in zip(weights, initial_weights))
+        assert float(keras_model.optimizer.learning_rate.numpy()) > 0
+
+
+def test_checkpoint_retrained_when_range_grows(tmp_path, monkeypatch):
+    from models.checkpoints import CheckpointStore
+
+    monkeypatch.setattr(lstm_model, "checkpoint_store", CheckpointStore(str(tmp_path), 10 ** 8))
+    epochs_used = []
+    train = LSTMModel._train
+
+    def spy(self, data, horizon, epochs, initial_weights=None):
+        epochs_used.append((epochs, initial_weights is not None))
+        return train(self, data, horizon, epochs, initial_weights)
+
+    monkeypatch.setattr(LSTMModel, "_train", spy)
+    data = list(trending_series())
+    timestamps = list(range(len(data)))
+    LSTMModel().forecast(data, 3, "coin_daily", timestamps)
+
+    # Новая точка внутри диапазона - дообучение чекпоинта
+    LSTMModel().forecast(data[1:] + [data[-1]], 3, "coin_daily", timestamps[1:] + [len(data)])
+    # Резкий рост - обучение заново
+    LSTMModel().forecast(data[2:] + [data[-1], 2 * data[-1]], 3, "coin_daily", timestamps[2:] + [len(data), len(data) + 1])
+
+    assert epochs_used == [
+        (lstm_model.LSTM_EPOCHS, False),
+        (lstm_model.LSTM_FINETUNE_EPOCHS, True),
+        (lstm_model.LSTM_EPOCHS, False),
+    ]
+
+
+@pytest.mark.parametrize("outputs", [1, 3])
+def test_numpy_forward_matches_keras_predict(outputs):
+    from models.lstm_inference import NumpyLSTM
+
+    keras_model = LSTMModel().create_model(10, outputs)
+    # Шум к весам: смещения Keras инициализируются нулями, а проверить нужно все слагаемые
+    rng = np.random.default_rng(0)
+    keras_model.set_weights([w + rng.normal(0, 0.1, w.shape) for w in keras_model.get_weights()])
+    windows = rng.uniform(0, 1, (4, 10, 1)).astype(np.float32)
+
+    expected = keras_model.predict(windows, verbose=0)
+    for inference in (NumpyLSTM.from_keras(keras_model),
+                      NumpyLSTM.from_weights(keras_model.get_weights(), activation=lstm_model.LSTM_ACTIVATION)):
+        actual = np.array([inference.forward(window[:, 0]) for window in windows])
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_warmup_builds_every_production_shape():
+    LSTMModel().warmup()
+    shapes = {(lstm_model.sequence_length_for(length), 1) for length in (30, 150, 1000)}
+    assert shapes == {(10, 1), (14, 1), (20, 1)}
+    assert shapes <= set(lstm_model.keras_models)
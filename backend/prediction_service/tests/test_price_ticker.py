@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import price_ticker as price_ticker_module  # noqa: E402
+from data.price_ticker import PriceTicker  # noqa: E402
+
+
+class FakeCoinGecko:
+    async def get_current_price(self, coin_id):
+        return {"bitcoin": 100.0, "ethereum": 10.0}[coin_id]
+
+
+class FakeRedisCache:
+    def __init__(self):
+        self.ticks = []
+
+    def publish_price_tick(self, currency, price, ts=None):
+        self.ticks.append((currency, price))
+
+
+def test_one_poll_publishes_each_tick_once_for_all_clients(monkeypatch):
+    monkeypatch.setattr(price_ticker_module.catalog_client, "_active_ids", ["bitcoin", "ethereum"])
+    redis_cache = FakeRedisCache()
+    ticker = PriceTicker(FakeCoinGecko(), redis_cache, interval=3600)
+
+    async def scenario():
+        ticker.start()
+        try:
+            # Два клиента получают один и тот же снимок первого опроса
+            return await asyncio.wait_for(
+                asyncio.gather(ticker.wait_for_update(), ticker.wait_for_update()), 5
+            )
+        finally:
+            await ticker.close()
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"bitcoin": 100.0, "ethereum": 10.0}
+    assert sorted(redis_cache.ticks) == [("bitcoin", 100.0), ("ethereum", 10.0)]
+
+
+def test_ticks_published_without_clients(monkeypatch):
+    monkeypatch.setattr(price_ticker_module.catalog_client, "_active_ids", ["bitcoin"])
+    redis_cache = FakeRedisCache()
+    ticker = PriceTicker(FakeCoinGecko(), redis_cache)
+
+    asyncio.run(ticker.poll())
+    assert redis_cache.ticks == [("bitcoin", 100.0)]
@@ -0,0 +1,160 @@
+"""
+Офлайн-обучение общей модели LSTM на всех активных монетах каталога.
+
+Скрипт загружает дневную историю цен каждой активной монеты, строит
+нормализованные окна (логарифм цены относительно последней цены окна) и
+обучает одну модель пакетно на всех монетах сразу. Веса сохраняются в
+GLOBAL_LSTM_DIR; сервис подхватывает новую модель без перезапуска и в
+запросах выполняет только прямой проход (LSTM_GLOBAL=true).
+
+Запускается по расписанию, например раз в сутки из cron:
+    python train_global_lstm.py
+    python train_global_lstm.py --days 730 --epochs 100 --coins bitcoin,ethereum
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SERVICE_DIR)
+
+from data.catalog_client import CatalogClient, DEFAULT_CURRENCIES  # noqa: E402
+from models.global_lstm import (  # noqa: E402
+    GLOBAL_LSTM_HORIZON,
+    GLOBAL_LSTM_KEY,
+    GLOBAL_LSTM_SEQUENCE_LENGTH,
+    global_store,
+    window_features,
+)
+from services.coingecko_service import CoinGeckoService  # noqa: E402
+
+logger = logging.getLogger("train_global_lstm")
+
+# Пауза между запросами истории: бесплатный API CoinGecko ограничивает частоту
+FETCH_DELAY = float(os.getenv("GLOBAL_LSTM_FETCH_DELAY", "2"))
+
+
+async def active_coins() -> list:
+    """ID активных монет из каталога user_service (или монеты по умолчанию)"""
+    client = CatalogClient()
+    try:
+        await client.refresh()
+    except Exception as e:
+        logger.warning(f"Каталог недоступен, используются монеты по умолчанию: {str(e)}")
+        return list(DEFAULT_CURRENCIES)
+    finally:
+        await client.close()
+    return client.active_ids()
+
+
+async def fetch_histories(coins: list, days: int) -> dict:
+    """Дневные цены каждой монеты; монеты без истории пропускаются"""
+    coingecko = CoinGeckoService()
+    histories = {}
+    try:
+        for coin in coins:
+            try:
+                prices = await coingecko.get_historical_prices(coin, days)
+                histories[coin] = np.array([price for _, price in prices], dtype=np.float64)
+            except Exception as e:
+                logger.warning(f"История {coin} не загружена: {str(e)}")
+            await asyncio.sleep(FETCH_DELAY)
+    finally:
+        await coingecko.close()
+    return histories
+
+
+def build_dataset(histories: dict, sequence_length: int, horizon: int, validation_split: float):
+    """
+    Окна всех монет. Последние validation_split окон каждой монеты идут в
+    валидацию, чтобы она была позже обучающих данных по времени.
+
+    Returns:
+        tuple: (X, y, X_val, y_val, монеты, попавшие в обучение)
+    """
+    train, validation, used = [], [], []
+    for coin, prices in histories.items():
+        prices = prices[prices > 0]
+        if len(prices) < sequence_length + horizon:
+            logger.warning(f"{coin}: недостаточно истории ({len(prices)} точек)")
+            continue
+        X, y = window_features(np.log(prices), sequence_length, horizon)
+        split = len(X) - int(len(X) * validation_split)
+        train.append((X[:split], y[:split]))
+        validation.append((X[split:], y[split:]))
+        used.append(coin)
+    if not train:
+        raise ValueError("Нет данных для обучения общей модели")
+
+    X = np.concatenate([pair[0] for pair in train])
+    y = np.concatenate([pair[1] for pair in train])
+    X_val = np.concatenate([pair[0] for pair in validation])
+    y_val = np.concatenate([pair[1] for pair in validation])
+    return X, y, X_val, y_val, used
+
+
+def train(histories: dict, sequence_length: int, horizon: int, epochs: int, batch_size: int,
+          validation_split: float, patience: int) -> None:
+    from tensorflow.keras.callbacks import EarlyStopping
+    from models.lstm_model import LSTMModel, LSTM_ACTIVATION
+
+    X, y, X_val, y_val, coins = build_dataset(histories, sequence_length, horizon, validation_split)
+    # Общий масштаб окон: логарифмы отношений цен малы для стабильного обучения
+    scale = float(np.std(X)) or 1.0
+    X, y, X_val, y_val = X / scale, y / scale, X_val / scale, y_val / scale
+
+    model = LSTMModel().create_model(sequence_length, horizon)
+    started = time.perf_counter()
+    monitor = "val_loss" if len(X_val) else "loss"
+    history = model.fit(
+        X[..., np.newaxis], y,
+        validation_data=(X_val[..., np.newaxis], y_val) if len(X_val) else None,
+        epochs=epochs,
+        batch_size=batch_size,
+        callbacks=[EarlyStopping(monitor=monitor, patience=patience, restore_best_weights=True)],
+        verbose=0
+    )
+    losses = history.history[monitor]
+    logger.info(
+        f"Общая модель обучена за {time.perf_counter() - started:.1f} с: {len(coins)} монет, "
+        f"{len(X)} окон, эпох {len(losses)}/{epochs}, {monitor} {min(losses):.5f}"
+    )
+
+    global_store.save(GLOBAL_LSTM_KEY, model.get_weights(), {
+        "sequence_length": sequence_length,
+        "horizon": horizon,
+        "scale": scale,
+        "activation": LSTM_ACTIVATION,
+        "coins": coins,
+        "windows": int(len(X)),
+        "trained_at": datetime.now(timezone.utc).isoformat()
+    })
+    logger.info(f"Веса сохранены в {global_store.path(GLOBAL_LSTM_KEY)}")
+
+
+async def main(args) -> None:
+    coins = [coin.strip() for coin in args.coins.split(",") if coin.strip()] if args.coins else await active_coins()
+    logger.info(f"Загрузка истории за {args.days} дней для {len(coins)} монет")
+    histories = await fetch_histories(coins, args.days)
+    train(histories, args.sequence_length, args.horizon, args.epochs, args.batch_size,
+          args.validation_split, args.patience)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Обучение общей модели LSTM по всем монетам каталога")
+    parser.add_argument("--coins", default="", help="монеты через запятую (по умолчанию - активные из каталога)")
+    parser.add_argument("--days", type=int, default=365, help="глубина дневной истории")
+    parser.add_argument("--sequence-length", type=int, default=GLOBAL_LSTM_SEQUENCE_LENGTH, help="длина входного окна")
+    parser.add_argument("--horizon", type=int, default=GLOBAL_LSTM_HORIZON, help="шагов прогноза за один проход")
+    parser.add_argument("--epochs", type=int, default=100, help="максимум эпох")
+    parser.add_argument("--batch-size", type=int, default=256, help="размер батча")
+    parser.add_argument("--validation-split", type=float, default=0.1, help="доля последних окон каждой монеты для валидации")
+    parser.add_argument("--patience", type=int, default=8, help="эпох без улучшения до остановки")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Версия формата записей: при изменении состава полей старые ключи в Redis
+# просто перестают читаться и истекают по TTL
+AUTH_CACHE_SCHEMA_VERSION = 2
+
+# Поля пользователя, нужные для аутентификации
+AUTH_USER_PROJECTION = {"_id": 0, "email": 1, "role": 1, "is_active": 1, "password_version": 1}
+
+
+def password_version(user_dict: Dict[str, Any]) -> str:
+    """
+    Версия пароля пользователя: счетчик увеличивается при каждой смене пароля.
+    Перехеширование того же пароля при входе версию не меняет.
+    """
+    return str(user_dict.get("password_version", 0))
+
+
+def auth_projection(user_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Выделяет из документа пользователя поля, нужные для аутентификации"""
+    return {
+        "email": user_dict["email"],
+        "role": user_dict.get("role", "user"),
+        "is_active": user_dict.get("is_active", True),
+        "password_version": password_version(user_dict),
+    }
+
+
+class AuthUserCache:
+    """
+    Кэш данных пользователя для аутентификации.
+
+    Первый уровень - ограниченный LRU в памяти процесса с коротким TTL,
+    второй - Redis, общий для всех воркеров. При изменении роли, статуса,
+    пароля или удалении аккаунта запись удаляется на обоих уровнях; в других
+    воркерах устаревшая запись первого уровня живет не дольше local_ttl.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        maxsize: int = 10000,
+        local_ttl: float = 5,
+        ttl: int = 300,
+        key_prefix: str = "user_auth",
+    ):
+        self.redis = redis_client
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.key_prefix = f"{key_prefix}:v{AUTH_CACHE_SCHEMA_VERSION}"
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def _key(self, email: str) -> str:
+        return f"{self.key_prefix}:{email}"
+
+    def _remember(self, email: str, user: Dict[str, Any]) -> None:
+        self._local[email] = (time.monotonic() + self.local_ttl, user)
+        self._local.move_to_end(email)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def get(self, email: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(email)
+        if entry is not None:
+            expires, user = entry
+            if time.monotonic() < expires:
+                self._local.move_to_end(email)
+                return user
+            del self._local[email]
+
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(self._key(email))
+        except Exception as e:
+            print(f"Auth cache read failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        user = json.loads(raw)
+        self._remember(email, user)
+        return user
+
+    async def set(self, email: str, user: Dict[str, Any]) -> None:
+        self._remember(email, user)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self._key(email), json.dumps(user), ex=self.ttl)
+        except Exception as e:
+            print(f"Auth cache write failed: {str(e)}")
+
+    async def invalidate(self, email: str) -> None:
+        self._local.pop(email, None)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self._key(email))
+        except Exception as e:
+            print(f"Auth cache invalidation failed: {str(e)}")
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.close()
+
+
+async def create_auth_cache(redis_url: Optional[str], **kwargs) -> AuthUserCache:
+    """Создает кэш с Redis, если он доступен, иначе только локальный"""
+    if redis_url:
+        try:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url)
+            await client.ping()
+            return AuthUserCache(client, **kwargs)
+        except Exception as e:
+            print(f"Redis unavailable for auth cache, using local cache only: {str(e)}")
+    return AuthUserCache(**kwargs)
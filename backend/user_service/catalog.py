@@ -0,0 +1,166 @@
+import asyncio
+import json
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+# Документ с версией каталога в коллекции метаданных
+CATALOG_META_ID = "cryptocurrencies"
+
+
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога криптовалют, отсортированный по id"""
+
+    def __init__(self, version: int, currencies: List[Dict[str, Any]]):
+        self.version = version
+        self.currencies = currencies
+        self.ids = [currency["id"] for currency in currencies]
+        self.by_id = {currency["id"]: currency for currency in currencies}
+        self.active = [currency for currency in currencies if currency.get("is_active", True)]
+        self.active_ids = [currency["id"] for currency in self.active]
+
+
+class CryptoCatalog:
+    """
+    Каталог криптовалют в памяти с монотонно растущей версией.
+
+    Версия хранится в MongoDB и увеличивается при каждом изменении каталога
+    администратором; после изменения снимок перечитывается и событие с новой
+    версией публикуется в Redis. Остальные воркеры перечитывают каталог по
+    событию, а без Redis - при периодической проверке версии. Чтение каталога
+    обращений к базе не делает.
+    """
+
+    def __init__(
+        self,
+        collection,
+        meta_collection,
+        redis_client=None,
+        channel: str = "catalog_changes",
+        refresh_interval: float = 30,
+    ):
+        self.collection = collection
+        self.meta_collection = meta_collection
+        self.redis = redis_client
+        self.channel = channel
+        self.refresh_interval = refresh_interval
+        self.snapshot = CatalogSnapshot(0, [])
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._pubsub = None
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    async def _stored_version(self) -> int:
+        meta = await self.meta_collection.find_one({"_id": CATALOG_META_ID}, {"version": 1})
+        return meta.get("version", 0) if meta else 0
+
+    async def load(self) -> None:
+        """Перечитывает каталог из базы"""
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            # Версия читается до документов: если каталог изменится во время
+            # чтения, следующая проверка увидит более новую версию и перечитает его
+            version = await self._stored_version()
+            currencies = await self.collection.find({}, {"_id": 0}).sort("id", 1).to_list(length=None)
+            if version >= self.snapshot.version:
+                self.snapshot = CatalogSnapshot(version, currencies)
+
+    async def refresh_if_stale(self, version: Optional[int] = None) -> None:
+        """Перечитывает каталог, если в базе (или в событии) версия новее"""
+        if version is None:
+            version = await self._stored_version()
+        if version > self.snapshot.version:
+            await self.load()
+
+    async def bump(self) -> int:
+        """
+        Увеличивает версию после изменения каталога, перечитывает снимок
+        и публикует событие об изменении.
+
+        Returns:
+            int: Новая версия каталога
+        """
+        meta = await self.meta_collection.find_one_and_update(
+            {"_id": CATALOG_META_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self.load()
+        if self.redis is not None:
+            try:
+                await self.redis.publish(self.channel, json.dumps({"version": meta["version"]}))
+            except Exception as e:
+                print(f"Failed to publish catalog change: {str(e)}")
+        return meta["version"]
+
+    def get(self, currency_id: str) -> Optional[Dict[str, Any]]:
+        return self.snapshot.by_id.get(currency_id)
+
+    def page(self, active_only: bool, after: Optional[str], limit: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Страница каталога по возрастанию id.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: (криптовалюты, id для следующей страницы или None)
+        """
+        snapshot = self.snapshot
+        currencies, ids = (snapshot.active, snapshot.active_ids) if active_only else (snapshot.currencies, snapshot.ids)
+        start = bisect_right(ids, after) if after is not None else 0
+        if limit is None:
+            return currencies[start:], None
+        items = currencies[start:start + limit]
+        next_cursor = items[-1]["id"] if start + limit < len(currencies) else None
+        return items, next_cursor
+
+    async def _wait_for_change(self) -> Optional[int]:
+        """Ждет событие изменения каталога не дольше refresh_interval"""
+        if self._pubsub is None:
+            await asyncio.sleep(self.refresh_interval)
+            return None
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=self.refresh_interval)
+        if message is None:
+            return None
+        try:
+            return json.loads(message["data"])["version"]
+        except (TypeError, ValueError, KeyError):
+            return None
+
+    async def run(self) -> None:
+        """Фоновая задача: обновляет снимок по событиям и периодической проверке версии"""
+        while True:
+            try:
+                if self.redis is not None and self._pubsub is None:
+                    self._pubsub = self.redis.pubsub()
+                    await self._pubsub.subscribe(self.channel)
+                await self.refresh_if_stale(await self._wait_for_change())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Catalog refresh failed: {str(e)}")
+                self._pubsub = None
+                await asyncio.sleep(5)
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.close()
+
+
+async def create_catalog(collection, meta_collection, redis_url: Optional[str], **kwargs) -> CryptoCatalog:
+    """Создает каталог с событиями через Redis, если он доступен, иначе с опросом версии"""
+    redis_client = None
+    if redis_url:
+        try:
+            import redis.asyncio as aioredis
+            redis_client = aioredis.from_url(redis_url)
+            await redis_client.ping()
+        except Exception as e:
+            print(f"Redis unavailable for catalog events, polling catalog version: {str(e)}")
+            redis_client = None
+    catalog = CryptoCatalog(collection, meta_collection, redis_client, **kwargs)
+    await catalog.load()
+    return catalog
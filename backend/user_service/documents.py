@@ -0,0 +1,27 @@
+from typing import Any, Dict, Optional
+
+# Поле с порогом для каждого типа уведомления
+ALERT_THRESHOLD_FIELDS = {"price": "price", "percentage": "percentage"}
+
+# Служебные поля документов, которые не отдаются клиенту
+ALERT_PUBLIC_PROJECTION = {"_id": 0, "user_email": 0, "threshold": 0}
+DASHBOARD_PUBLIC_PROJECTION = {"_id": 0, "user_email": 0}
+
+
+def alert_document(user_email: str, alert: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Документ коллекции alerts. _id совпадает с ID уведомления, чтобы
+    события удаления в change stream однозначно указывали на уведомление.
+    """
+    field = ALERT_THRESHOLD_FIELDS.get(alert.get("type"))
+    threshold: Optional[float] = alert.get(field) if field else None
+    document = dict(alert)
+    document.update({"_id": alert["id"], "user_email": user_email, "threshold": threshold})
+    return document
+
+
+def dashboard_document(user_email: str, dashboard: Dict[str, Any]) -> Dict[str, Any]:
+    """Документ коллекции dashboards"""
+    document = dict(dashboard)
+    document["user_email"] = user_email
+    return document
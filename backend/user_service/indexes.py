@@ -0,0 +1,153 @@
+"""
+Декларативное описание индексов user_service и диагностика планов запросов.
+
+Индексы создаются при старте в фоне, не задерживая готовность сервиса.
+Диагностика выполняет explain() для каждого частого запроса и отмечает
+планы с полным сканированием коллекции (COLLSCAN).
+
+Запуск вручную:
+    python indexes.py --ensure
+    python indexes.py --explain
+"""
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import motor.motor_asyncio
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import PyMongoError
+
+
+class IndexSpec:
+    """Описание индекса коллекции"""
+
+    def __init__(self, collection: str, keys: List[Tuple[str, int]], unique: bool = False, name: Optional[str] = None):
+        self.collection = collection
+        self.keys = keys
+        self.unique = unique
+        self.name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    @property
+    def key(self) -> str:
+        """Полное имя индекса: имена уникальны только внутри коллекции"""
+        return f"{self.collection}.{self.name}"
+
+
+class HotQuery:
+    """Частый запрос сервиса, план которого проверяет диагностика"""
+
+    def __init__(self, name: str, collection: str, filter: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None):
+        self.name = name
+        self.collection = collection
+        self.filter = filter
+        self.sort = sort
+
+
+INDEXES = [
+    IndexSpec("users", [("email", 1)], unique=True),
+    IndexSpec("alerts", [("user_email", 1), ("id", 1)], unique=True),
+    IndexSpec("alerts", [("coin_id", 1), ("condition", 1), ("threshold", 1)]),
+    IndexSpec("dashboards", [("user_email", 1), ("id", 1)], unique=True),
+    IndexSpec("dashboards", [("uuid", 1)]),
+    IndexSpec("cryptocurrencies", [("id", 1)], unique=True),
+]
+
+# Значения в фильтрах - примеры: для плана важна форма запроса, а не данные
+HOT_QUERIES = [
+    HotQuery("auth user", "users", {"email": "user@example.com"}),
+    HotQuery("watchlist check", "users", {"email": "user@example.com", "watchlist": "bitcoin"}),
+    HotQuery("user alerts", "alerts", {"user_email": "user@example.com"}, sort=[("created_at", 1)]),
+    HotQuery("delete alert", "alerts", {"_id": "alert-id", "user_email": "user@example.com"}),
+    HotQuery("alerts by coin", "alerts", {"coin_id": "bitcoin", "condition": "above", "threshold": {"$lte": 50000}}),
+    HotQuery("user dashboards", "dashboards", {"user_email": "user@example.com"}),
+    HotQuery("dashboard by id or uuid", "dashboards", {
+        "user_email": "user@example.com",
+        "$or": [{"id": "dashboard-id"}, {"uuid": "dashboard-id"}]
+    }),
+    HotQuery("cryptocurrency by id", "cryptocurrencies", {"id": "bitcoin"}),
+    HotQuery("users page", "users", {"_id": {"$gt": ObjectId("000000000000000000000000")}}, sort=[("_id", 1)]),
+]
+
+
+class IndexManager:
+    """Создает описанные индексы и проверяет планы частых запросов"""
+
+    def __init__(self, db, indexes: List[IndexSpec] = INDEXES, hot_queries: List[HotQuery] = HOT_QUERIES):
+        self.db = db
+        self.indexes = indexes
+        self.hot_queries = hot_queries
+        self.status: Dict[str, str] = {spec.key: "pending" for spec in indexes}
+
+    async def ensure_indexes(self) -> Dict[str, str]:
+        """
+        Создает недостающие индексы. Ошибка одного индекса (например, дубликаты
+        для уникального) не мешает созданию остальных.
+
+        Returns:
+            Dict[str, str]: коллекция.имя индекса -> "ready" или текст ошибки
+        """
+        for spec in self.indexes:
+            try:
+                await self.db[spec.collection].create_index(spec.keys, unique=spec.unique, name=spec.name)
+                self.status[spec.key] = "ready"
+            except PyMongoError as e:
+                print(f"Failed to create index {spec.key}: {str(e)}")
+                self.status[spec.key] = f"error: {str(e)}"
+        return self.status
+
+    async def explain_hot_queries(self) -> List[Dict[str, Any]]:
+        """
+        Выполняет explain() для каждого частого запроса.
+
+        Returns:
+            List[Dict[str, Any]]: запрос, коллекция, стадии выигравшего плана и флаг COLLSCAN
+        """
+        report = []
+        for query in self.hot_queries:
+            cursor = self.db[query.collection].find(query.filter)
+            if query.sort:
+                cursor = cursor.sort(query.sort)
+            plan = await cursor.explain()
+            stages = plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+            report.append({
+                "query": query.name,
+                "collection": query.collection,
+                "stages": stages,
+                "collscan": "COLLSCAN" in stages,
+            })
+        return report
+
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Перечисляет стадии плана запроса сверху вниз"""
+    stages = []
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    # В новых версиях MongoDB план может быть вложен в queryPlan
+    for child in [plan.get("queryPlan"), plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages.extend(plan_stages(child))
+    return stages
+
+
+async def main(ensure: bool, explain: bool):
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    manager = IndexManager(client.crypto_tracker)
+    if ensure:
+        for name, state in (await manager.ensure_indexes()).items():
+            print(f"{name}: {state}")
+    if explain:
+        for entry in await manager.explain_hot_queries():
+            flag = "COLLSCAN" if entry["collscan"] else "ok"
+            print(f"[{flag}] {entry['collection']}: {entry['query']} ({' <- '.join(entry['stages'])})")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Индексы user_service и проверка планов запросов")
+    parser.add_argument("--ensure", action="store_true", help="создать недостающие индексы")
+    parser.add_argument("--explain", action="store_true", help="проверить планы частых запросов")
+    args = parser.parse_args()
+    asyncio.run(main(args.ensure, args.explain or not args.ensure))
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from jose import JWTError, jwt
@@ -9,8 +11,20 @@ import os
 from dotenv import load_dotenv
 from pydantic import BaseModel, EmailStr, Field
 from passlib.context import CryptContext
+from fastapi.responses import JSONResponse, StreamingResponse
+from bson import ObjectId
+from bson.errors import InvalidId
 import motor.motor_asyncio
+import aiohttp
+import asyncio
+import json
 import uuid
+from auth_cache import AuthUserCache, AUTH_USER_PROJECTION, auth_projection, create_auth_cache, password_version
+from password_hashing import PasswordHasher, PasswordHashingBusy
+from documents import alert_document, dashboard_document, ALERT_PUBLIC_PROJECTION, DASHBOARD_PUBLIC_PROJECTION
+from migrate_embedded import migrate_embedded
+from indexes import IndexManager
+from catalog import CryptoCatalog, create_catalog
 
 load_dotenv()
 
@@ -21,9 +35,10 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Разрешаем только фронтенд
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # С allow_credentials браузер не раскрывает заголовки по "*": перечисляем явно
+    expose_headers=["X-Next-Cursor", "X-Catalog-Version", "X-Dashboard-Version", "Retry-After"]
 )
 
 # Настройки MongoDB
@@ -36,8 +51,43 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Настройка хэширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Настройка хэширования паролей: при изменении BCRYPT_ROUNDS хеши
+# пересчитываются при следующем входе пользователя
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+password_hasher = PasswordHasher(pwd_context, workers=PASSWORD_HASH_WORKERS, queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+
+# Размер пачки при переносе вложенных уведомлений и дашбордов в отдельные коллекции
+EMBEDDED_MIGRATION_BATCH_SIZE = int(os.getenv("EMBEDDED_MIGRATION_BATCH_SIZE", "500"))
+
+# Постраничная выдача списков: размер страницы по умолчанию и максимальный
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+EXPORT_BATCH_SIZE = 500
+
+# Каталог криптовалют в памяти; обновления версии приходят через Redis
+CATALOG_CHANNEL = os.getenv("CATALOG_CHANNEL", "catalog_changes")
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+catalog = CryptoCatalog(db.cryptocurrencies, db.meta)
+catalog_task: Optional[asyncio.Task] = None
+
+# Текущие цены для стартовой загрузки страницы (/bootstrap) из prediction_service
+PRICE_API_URL = os.getenv("PRICE_API_URL", "http://localhost:8001/api/price")
+PRICE_FETCH_CONCURRENCY = int(os.getenv("PRICE_FETCH_CONCURRENCY", "10"))
+PRICE_FETCH_TIMEOUT = float(os.getenv("PRICE_FETCH_TIMEOUT", "3"))
+http_session: Optional[aiohttp.ClientSession] = None
+
+# Индексы коллекций сервиса
+index_manager = IndexManager(db)
+
+# Кэш данных пользователя для аутентификации (общий для воркеров через Redis)
+REDIS_URL = os.getenv("REDIS_URL", "")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_LOCAL_TTL = float(os.getenv("AUTH_CACHE_LOCAL_TTL", "5"))
+auth_cache = AuthUserCache(maxsize=AUTH_CACHE_SIZE, local_ttl=AUTH_CACHE_LOCAL_TTL, ttl=AUTH_CACHE_TTL)
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -59,6 +109,21 @@ class User(BaseModel):
 class UserInDB(User):
     hashed_password: str
 
+class CurrentUser(BaseModel):
+    """Данные аутентифицированного пользователя из кэша аутентификации"""
+    email: str
+    role: str = "user"
+    is_active: bool = True
+    password_version: str
+
+# Поля пользователя, которые отдаются по умолчанию; дашборды и уведомления
+# хранятся в отдельных коллекциях и загружаются только по запросу (?include=dashboards,alerts)
+USER_BASE_FIELDS = ("email", "first_name", "last_name", "role", "is_active", "watchlist")
+USER_LAZY_FIELDS = ("dashboards", "alerts")
+
+# Поля, нужные для входа
+LOGIN_USER_PROJECTION = {"_id": 0, "email": 1, "hashed_password": 1, "role": 1, "is_active": 1, "password_version": 1}
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -91,17 +156,32 @@ class Dashboard(BaseModel):
     type: str
     widgets: List[dict]
     uuid: Optional[str] = None  # Добавляем поле UUID для совместимости
+    version: int = 0  # Увеличивается при каждом изменении дашборда
+
+# Операции над отдельным виджетом дашборда
+WIDGET_OPS = ["add", "move", "update", "remove"]
+
+class WidgetPatch(BaseModel):
+    op: str
+    version: int  # Версия дашборда, на основе которой сделано изменение
+    widget_id: Optional[str] = None  # Для move, update и remove
+    widget: Optional[dict] = None  # Новый виджет для add или изменяемые поля для update
+    layout: Optional[dict] = None  # Новое расположение для move
 
 class LoginRequest(BaseModel):
     email: str
     password: str
 
+# Окна, за которые считается изменение для процентных уведомлений
+ALERT_WINDOWS = ["5m", "1h", "24h"]
+
 class PriceAlert(BaseModel):
     coin_id: str
     condition: str
     type: str
     price: Optional[float] = None
     percentage: Optional[float] = None
+    window: Optional[str] = None  # Окно изменения для процентных уведомлений
 
 class PriceAlertResponse(BaseModel):
     id: str
@@ -110,6 +190,7 @@ class PriceAlertResponse(BaseModel):
     type: str
     price: Optional[float] = None
     percentage: Optional[float] = None
+    window: Optional[str] = None
     created_at: datetime
 
 class WatchlistAction(BaseModel):
@@ -139,6 +220,28 @@ class CryptoCurrency(BaseModel):
             }
         }
 
+class BootstrapCatalog(BaseModel):
+    version: int
+    currencies: List[CryptoCurrency]
+
+class BootstrapResponse(BaseModel):
+    """Все данные для первой отрисовки страницы одним ответом"""
+    user: User
+    is_admin: bool
+    watchlist: List[str]
+    dashboards: List[Dashboard]
+    alerts: List[PriceAlertResponse]
+    catalog: BootstrapCatalog
+    prices: Dict[str, Optional[float]]  # None, если цену получить не удалось
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Сервис перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"}
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -149,25 +252,138 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_user(email: str):
-    print(f"Looking for user in database: {email}")
-    user_dict = await db.users.find_one({"email": email})
-    if user_dict:
-        print(f"User found in database: {email}")
-        return UserInDB(**user_dict)
-    print(f"User not found in database: {email}")
+def user_projection(fields) -> dict:
+    """Проекция MongoDB только на указанные поля пользователя"""
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in fields})
+    return projection
+
+def parse_include(include: Optional[str]) -> tuple:
+    """Разбирает список дополнительно загружаемых коллекций пользователя"""
+    if not include:
+        return ()
+    fields = tuple(field.strip() for field in include.split(",") if field.strip())
+    for field in fields:
+        if field not in USER_LAZY_FIELDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Недопустимое значение include. Используйте {', '.join(USER_LAZY_FIELDS)}"
+            )
+    return fields
+
+async def get_user_fields(email: str, *fields: str) -> dict:
+    """Загружает только указанные поля документа пользователя"""
+    return await db.users.find_one({"email": email}, user_projection(fields)) or {}
+
+def ndjson_response(documents, transform=None) -> StreamingResponse:
+    """
+    Потоковая выдача документов в формате NDJSON: документы курсора
+    отдаются по мере чтения из базы, списки - по одному.
+    """
+    def encode(document) -> str:
+        if transform is not None:
+            document = transform(document)
+        return json.dumps(jsonable_encoder(document), ensure_ascii=False) + "\n"
+    
+    async def lines():
+        if hasattr(documents, "__aiter__"):
+            async for document in documents:
+                yield encode(document)
+        else:
+            for document in documents:
+                yield encode(document)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def check_page_size(limit: int):
+    if limit < 1 or limit > PAGE_SIZE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit должен быть от 1 до {PAGE_SIZE_MAX}")
+
+async def get_user_alerts(email: str) -> List[dict]:
+    cursor = db.alerts.find({"user_email": email}, ALERT_PUBLIC_PROJECTION).sort("created_at", 1)
+    return await cursor.to_list(length=None)
+
+async def get_user_dashboards(email: str) -> List[dict]:
+    cursor = db.dashboards.find({"user_email": email}, DASHBOARD_PUBLIC_PROJECTION).sort("_id", 1)
+    return await cursor.to_list(length=None)
+
+async def attach_collections(users: List[dict], fields: tuple) -> List[dict]:
+    """Подгружает дашборды и уведомления сразу для всех пользователей списка"""
+    if not fields or not users:
+        return users
+    emails = [user["email"] for user in users]
+    for field in fields:
+        collection = db.alerts if field == "alerts" else db.dashboards
+        projection = dict(ALERT_PUBLIC_PROJECTION if field == "alerts" else DASHBOARD_PUBLIC_PROJECTION)
+        projection.pop("user_email")
+        by_user: Dict[str, List[dict]] = {email: [] for email in emails}
+        async for document in collection.find({"user_email": {"$in": emails}}, projection).sort("_id", 1):
+            by_user[document.pop("user_email")].append(document)
+        for user in users:
+            user[field] = by_user[user["email"]]
+    return users
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию с пулом соединений к сервису цен"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=PRICE_FETCH_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(total=PRICE_FETCH_TIMEOUT)
+        )
+    return http_session
+
+async def fetch_price(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, coin: str) -> Optional[float]:
+    """Текущая цена монеты; None, если сервис цен не ответил вовремя"""
+    async with semaphore:
+        try:
+            async with session.get(f"{PRICE_API_URL}/{coin}") as response:
+                if response.status == 200:
+                    return (await response.json()).get("price")
+                print(f"Price API returned {response.status} for {coin}")
+        except Exception as e:
+            print(f"Error fetching price for {coin}: {str(e)}")
     return None
 
+async def fetch_prices(coins: List[str]) -> Dict[str, Optional[float]]:
+    """Параллельно (не больше PRICE_FETCH_CONCURRENCY запросов сразу) запрашивает текущие цены монет"""
+    if not coins:
+        return {}
+    session = await get_http_session()
+    semaphore = asyncio.Semaphore(PRICE_FETCH_CONCURRENCY)
+    prices = await asyncio.gather(*(fetch_price(session, semaphore, coin) for coin in coins))
+    return dict(zip(coins, prices))
+
+async def get_auth_user(email: str) -> Optional[dict]:
+    """Данные пользователя для аутентификации: из кэша или из базы"""
+    auth_user = await auth_cache.get(email)
+    if auth_user is None:
+        user_dict = await db.users.find_one({"email": email}, AUTH_USER_PROJECTION)
+        if user_dict is None:
+            return None
+        auth_user = auth_projection(user_dict)
+        await auth_cache.set(email, auth_user)
+    return auth_user
+
 async def authenticate_user(email: str, password: str):
     print(f"Attempting to authenticate user: {email}")
-    user = await get_user(email)
+    user = await db.users.find_one({"email": email}, LOGIN_USER_PROJECTION)
     if not user:
         print(f"User not found: {email}")
         return False
-    if not pwd_context.verify(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user["hashed_password"])
+    if not valid:
         print(f"Invalid password for user: {email}")
         return False
+    if new_hash is not None:
+        # Хеш создан с устаревшими настройками: сохраняем пересчитанный
+        await db.users.update_one(
+            {"email": email, "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        print(f"Password rehashed for user: {email}")
     print(f"User authenticated successfully: {email}")
+    # Данные для аутентификации уже прочитаны: первые запросы после входа обойдутся без базы
+    await auth_cache.set(email, auth_projection(user))
     return user
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -185,20 +401,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    user = await get_user(email=token_data.email)
-    if user is None:
+    auth_user = await get_auth_user(token_data.email)
+    if auth_user is None:
+        raise credentials_exception
+    
+    # Токены, выпущенные до смены пароля, больше не действуют
+    token_password_version = payload.get("pwv")
+    if token_password_version is not None and token_password_version != auth_user["password_version"]:
         raise credentials_exception
     
-    if hasattr(user, 'is_active') and not user.is_active:
+    if not auth_user["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Аккаунт деактивирован",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    return CurrentUser(**auth_user)
 
-async def check_admin_role(current_user: UserInDB = Depends(get_current_user)):
+async def check_admin_role(current_user: CurrentUser = Depends(get_current_user)):
     """Проверяет, имеет ли пользователь роль администратора"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -210,7 +431,7 @@ async def check_admin_role(current_user: UserInDB = Depends(get_current_user)):
 
 @app.get("/check-user/{email}")
 async def check_user(email: str):
-    user = await get_user(email)
+    user = await db.users.find_one({"email": email}, {"_id": 1})
     if user:
         return {"exists": True}
     return {"exists": False}
@@ -218,17 +439,15 @@ async def check_user(email: str):
 @app.post("/register", response_model=Token)
 async def register(user_data: UserCreate):
     print(f"Registration attempt for email: {user_data.email}")
-    if await db.users.find_one({"email": user_data.email}):
+    if await db.users.find_one({"email": user_data.email}, {"_id": 1}):
         print(f"Email already registered: {user_data.email}")
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     user_dict = {
         "email": user_data.email,
         "hashed_password": hashed_password,
         "watchlist": [],
-        "dashboards": [],
-        "alerts": [],
         "first_name": user_data.first_name,
         "last_name": user_data.last_name,
         "role": user_data.role,
@@ -239,7 +458,8 @@ async def register(user_data: UserCreate):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user_data.email}, expires_delta=access_token_expires
+        data={"sub": user_data.email, "pwv": password_version(user_dict)},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -253,7 +473,7 @@ async def login(login_data: LoginRequest):
             detail="Неверный email или пароль"
         )
     
-    if hasattr(user, 'is_active') and not user.is_active:
+    if not user.get("is_active", True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Аккаунт деактивирован. Обратитесь к администратору."
@@ -261,28 +481,29 @@ async def login(login_data: LoginRequest):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user["email"], "pwv": password_version(user)},
+        expires_delta=access_token_expires
     )
     print(f"Login successful for user: {login_data.email}")
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/watchlist", response_model=List[str])
-async def get_watchlist(current_user: User = Depends(get_current_user)):
-    return current_user.watchlist
+async def get_watchlist(current_user: CurrentUser = Depends(get_current_user)):
+    user_dict = await get_user_fields(current_user.email, "watchlist")
+    return user_dict.get("watchlist", [])
 
 @app.put("/watchlist")
-async def update_watchlist(action: WatchlistAction, current_user: User = Depends(get_current_user)):
+async def update_watchlist(action: WatchlistAction, current_user: CurrentUser = Depends(get_current_user)):
     coin_id = action.coin_id or action.currency
     
     if not coin_id:
         raise HTTPException(status_code=400, detail="coin_id или currency должны быть указаны")
     
     if action.action == "add":
-        if coin_id not in current_user.watchlist:
-            await db.users.update_one(
-                {"email": current_user.email},
-                {"$push": {"watchlist": coin_id}}
-            )
+        await db.users.update_one(
+            {"email": current_user.email},
+            {"$addToSet": {"watchlist": coin_id}}
+        )
         return {"message": "Монета добавлена в список избранного"}
     elif action.action == "remove":
         await db.users.update_one(
@@ -294,16 +515,15 @@ async def update_watchlist(action: WatchlistAction, current_user: User = Depends
         raise HTTPException(status_code=400, detail="Недопустимое действие. Используйте 'add' или 'remove'")
 
 @app.put("/watchlist/{coin}")
-async def add_to_watchlist(coin: str, current_user: User = Depends(get_current_user)):
-    if coin not in current_user.watchlist:
-        await db.users.update_one(
-            {"email": current_user.email},
-            {"$push": {"watchlist": coin}}
-        )
+async def add_to_watchlist(coin: str, current_user: CurrentUser = Depends(get_current_user)):
+    await db.users.update_one(
+        {"email": current_user.email},
+        {"$addToSet": {"watchlist": coin}}
+    )
     return {"message": "Coin added to watchlist"}
 
 @app.delete("/watchlist/{coin}")
-async def remove_from_watchlist(coin: str, current_user: User = Depends(get_current_user)):
+async def remove_from_watchlist(coin: str, current_user: CurrentUser = Depends(get_current_user)):
     await db.users.update_one(
         {"email": current_user.email},
         {"$pull": {"watchlist": coin}}
@@ -311,11 +531,11 @@ async def remove_from_watchlist(coin: str, current_user: User = Depends(get_curr
     return {"message": "Coin removed from watchlist"}
 
 @app.get("/dashboard", response_model=List[Dashboard])
-async def get_dashboards(current_user: User = Depends(get_current_user)):
-    return current_user.dashboards
+async def get_dashboards(current_user: CurrentUser = Depends(get_current_user)):
+    return await get_user_dashboards(current_user.email)
 
 @app.post("/dashboard", response_model=Dashboard)
-async def create_dashboard(dashboard: DashboardCreate, current_user: User = Depends(get_current_user)):
+async def create_dashboard(dashboard: DashboardCreate, current_user: CurrentUser = Depends(get_current_user)):
     # Используем UUID с фронтенда или генерируем новый на основе временной метки
     dashboard_id = dashboard.id or dashboard.uuid or str(datetime.now().timestamp())
     
@@ -324,13 +544,16 @@ async def create_dashboard(dashboard: DashboardCreate, current_user: User = Depe
         "name": dashboard.name,
         "type": dashboard.type,
         "widgets": dashboard.widgets,
-        "uuid": dashboard.uuid or dashboard_id  # Сохраняем UUID для надежности
+        "uuid": dashboard.uuid or dashboard_id,  # Сохраняем UUID для надежности
+        "version": 0
     }
     
-    await db.users.update_one(
-        {"email": current_user.email},
-        {"$push": {"dashboards": new_dashboard}}
-    )
+    try:
+        await db.dashboards.insert_one(dashboard_document(current_user.email, new_dashboard))
+    except DuplicateKeyError:
+        # Уникальный индекс (user_email, id): дашборд с таким ID уже есть у пользователя
+        print(f"Dashboard {dashboard_id} already exists for {current_user.email}")
+        raise HTTPException(status_code=409, detail="Дашборд с таким ID уже существует")
     
     return new_dashboard
 
@@ -338,93 +561,171 @@ async def create_dashboard(dashboard: DashboardCreate, current_user: User = Depe
 async def update_dashboard(
     dashboard_id: str,
     dashboard_update: DashboardUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         print(f"Updating dashboard with ID: {dashboard_id}")
         print(f"Update data: {dashboard_update.dict()}")
         
-        update_fields = {"dashboards.$.widgets": dashboard_update.widgets}
+        update_fields = {"widgets": dashboard_update.widgets}
         
         # Если передано имя, обновляем его
         if dashboard_update.name is not None:
-            update_fields["dashboards.$.name"] = dashboard_update.name
+            update_fields["name"] = dashboard_update.name
             print(f"Updating dashboard name to: {dashboard_update.name}")
         
-        # Сначала ищем по ID
-        print(f"Trying to find dashboard by ID: {dashboard_id}")
-        result = await db.users.update_one(
+        # Ищем дашборд сразу по ID или UUID
+        result = await db.dashboards.find_one_and_update(
             {
-                "email": current_user.email,
-                "dashboards.id": dashboard_id
+                "user_email": current_user.email,
+                "$or": [{"id": dashboard_id}, {"uuid": dashboard_id}]
             },
             {
-                "$set": update_fields
-            }
+                "$set": update_fields,
+                "$inc": {"version": 1}
+            },
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count == 0:
-            # Пробуем найти по UUID, если не найдено по ID
-            print(f"Dashboard not found by ID, trying to find by UUID: {dashboard_id}")
-            result = await db.users.update_one(
-                {
-                    "email": current_user.email,
-                    "dashboards.uuid": dashboard_id
-                },
-                {
-                    "$set": update_fields
-                }
+        if result is None:
+            print(f"Dashboard not found by ID or UUID")
+            # Получим список всех дашбордов пользователя для диагностики
+            cursor = db.dashboards.find(
+                {"user_email": current_user.email},
+                {"_id": 0, "id": 1, "uuid": 1, "name": 1}
             )
+            user_dashboards = await cursor.to_list(length=None)
+            print(f"User has {len(user_dashboards)} dashboards:")
+            for idx, d in enumerate(user_dashboards):
+                print(f"Dashboard {idx+1}: ID={d.get('id')}, UUID={d.get('uuid')}, Name={d.get('name')}")
             
-            if result.modified_count == 0:
-                print(f"Dashboard not found by UUID either")
-                # Получим список всех дашбордов пользователя для диагностики
-                user = await db.users.find_one({"email": current_user.email})
-                if user and 'dashboards' in user:
-                    print(f"User has {len(user['dashboards'])} dashboards:")
-                    for idx, d in enumerate(user['dashboards']):
-                        print(f"Dashboard {idx+1}: ID={d.get('id')}, UUID={d.get('uuid')}, Name={d.get('name')}")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Dashboard not found with ID or UUID: {dashboard_id}"
-                )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Dashboard not found with ID or UUID: {dashboard_id}"
+            )
         
         print(f"Dashboard updated successfully")
-        return {"message": "Dashboard updated"}
+        return {"message": "Dashboard updated", "version": result["version"]}
     except Exception as e:
         print(f"Error updating dashboard: {str(e)}")
         raise
 
-@app.delete("/dashboard/{dashboard_id}")
-async def delete_dashboard(dashboard_id: str, current_user: User = Depends(get_current_user)):
-    # Пробуем удалить по ID
-    result = await db.users.update_one(
-        {"email": current_user.email},
-        {"$pull": {"dashboards": {"id": dashboard_id}}}
+def dashboard_version_filter(version: int):
+    """Условие на версию дашборда; дашборды без поля version считаются версией 0"""
+    return {"$in": [0, None]} if version == 0 else version
+
+def check_widget_fields(widget: dict):
+    """Поля виджета становятся путями в обновлении MongoDB и не должны содержать операторов"""
+    for field in widget:
+        if not field or field.startswith("$") or "." in field:
+            raise HTTPException(status_code=400, detail=f"Недопустимое поле виджета: {field!r}")
+
+async def widget_patch_error(email: str, dashboard_id: str, patch: WidgetPatch) -> HTTPException:
+    """Определяет, почему изменение виджета не применилось"""
+    dashboard = await db.dashboards.find_one(
+        {"user_email": email, "$or": [{"id": dashboard_id}, {"uuid": dashboard_id}]},
+        {"_id": 0, "version": 1}
     )
+    if dashboard is None:
+        return HTTPException(status_code=404, detail="Dashboard not found")
+    current_version = dashboard.get("version", 0)
+    if current_version != patch.version:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Дашборд изменен: текущая версия {current_version}",
+            headers={"X-Dashboard-Version": str(current_version)}
+        )
+    if patch.op == "add":
+        return HTTPException(status_code=409, detail="Виджет с таким ID уже существует")
+    return HTTPException(status_code=404, detail="Виджет не найден")
+
+@app.patch("/dashboard/{dashboard_id}/widgets")
+async def patch_dashboard_widget(
+    dashboard_id: str,
+    patch: WidgetPatch,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Изменяет один виджет дашборда (add, move, update или remove) одним
+    атомарным обновлением, если версия дашборда совпадает с переданной.
+    Возвращает только измененный виджет и новую версию; при несовпадении
+    версии - 409 с текущей версией в заголовке X-Dashboard-Version.
+    """
+    if patch.op not in WIDGET_OPS:
+        raise HTTPException(status_code=400, detail=f"Недопустимая операция. Используйте {', '.join(WIDGET_OPS)}")
     
-    # Если дашборд не найден по ID, пробуем по UUID
-    if result.modified_count == 0:
-        result = await db.users.update_one(
-            {"email": current_user.email},
-            {"$pull": {"dashboards": {"uuid": dashboard_id}}}
+    query = {
+        "user_email": current_user.email,
+        "$or": [{"id": dashboard_id}, {"uuid": dashboard_id}],
+        "version": dashboard_version_filter(patch.version)
+    }
+    if patch.op == "add":
+        if not patch.widget:
+            raise HTTPException(status_code=400, detail="Для add необходимо указать widget")
+        check_widget_fields(patch.widget)
+        widget = dict(patch.widget)
+        widget["id"] = widget.get("id") or str(uuid.uuid4())
+        widget_id = widget["id"]
+        query["widgets.id"] = {"$ne": widget_id}
+        update = {"$push": {"widgets": widget}}
+    else:
+        if not patch.widget_id:
+            raise HTTPException(status_code=400, detail=f"Для {patch.op} необходимо указать widget_id")
+        widget_id = patch.widget_id
+        query["widgets.id"] = widget_id
+        if patch.op == "move":
+            if patch.layout is None:
+                raise HTTPException(status_code=400, detail="Для move необходимо указать layout")
+            update = {"$set": {"widgets.$.layout": patch.layout}}
+        elif patch.op == "update":
+            fields = {field: value for field, value in (patch.widget or {}).items() if field != "id"}
+            if not fields:
+                raise HTTPException(status_code=400, detail="Для update необходимо указать изменяемые поля widget")
+            check_widget_fields(fields)
+            update = {"$set": {f"widgets.$.{field}": value for field, value in fields.items()}}
+        else:
+            update = {"$pull": {"widgets": {"id": widget_id}}}
+    update["$inc"] = {"version": 1}
+    
+    # Возвращается только измененный виджет, а не весь список
+    result = await db.dashboards.find_one_and_update(
+        query,
+        update,
+        projection={"_id": 0, "version": 1, "widgets": {"$elemMatch": {"id": widget_id}}},
+        return_document=ReturnDocument.AFTER
+    )
+    if result is None:
+        raise await widget_patch_error(current_user.email, dashboard_id, patch)
+    
+    if patch.op == "remove":
+        return {"widget_id": widget_id, "version": result["version"]}
+    return {"widget": result["widgets"][0], "version": result["version"]}
+
+@app.delete("/dashboard/{dashboard_id}")
+async def delete_dashboard(dashboard_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    # Удаляем по ID или UUID
+    result = await db.dashboards.delete_one({
+        "user_email": current_user.email,
+        "$or": [{"id": dashboard_id}, {"uuid": dashboard_id}]
+    })
+    
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard not found"
         )
-        
-        if result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Dashboard not found"
-            )
     
     return {"message": "Dashboard deleted"}
 
-@app.get("/profile", response_model=User)
-async def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+# Ответы содержат только загруженные поля: незапрошенные коллекции не подставляются пустыми
+@app.get("/profile", response_model=User, response_model_exclude_unset=True)
+async def get_profile(include: Optional[str] = None, current_user: CurrentUser = Depends(get_current_user)):
+    user_dict = await get_user_fields(current_user.email, *USER_BASE_FIELDS)
+    return (await attach_collections([user_dict], parse_include(include)))[0]
 
-@app.put("/profile", response_model=User)
-async def update_profile(user_update: UserUpdate, current_user: User = Depends(get_current_user)):
+@app.put("/profile", response_model=User, response_model_exclude_unset=True)
+async def update_profile(user_update: UserUpdate, current_user: CurrentUser = Depends(get_current_user)):
     try:
         update_data = user_update.model_dump(exclude_unset=True)
     except AttributeError:
@@ -438,29 +739,41 @@ async def update_profile(user_update: UserUpdate, current_user: User = Depends(g
         {"$set": update_data}
     )
     
-    updated_user = await get_user(current_user.email)
+    updated_user = await get_user_fields(current_user.email, *USER_BASE_FIELDS)
     return updated_user
 
 @app.post("/change-password")
-async def change_password(password_data: PasswordChange, current_user: UserInDB = Depends(get_current_user)):
-    if not pwd_context.verify(password_data.current_password, current_user.hashed_password):
+async def change_password(password_data: PasswordChange, current_user: CurrentUser = Depends(get_current_user)):
+    user_dict = await get_user_fields(current_user.email, "hashed_password")
+    if not await password_hasher.verify(password_data.current_password, user_dict.get("hashed_password", "")):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль"
         )
     
-    hashed_password = pwd_context.hash(password_data.new_password)
+    hashed_password = await password_hasher.hash(password_data.new_password)
     
-    await db.users.update_one(
+    user_dict = await db.users.find_one_and_update(
         {"email": current_user.email},
-        {"$set": {"hashed_password": hashed_password}}
+        {"$set": {"hashed_password": hashed_password}, "$inc": {"password_version": 1}},
+        projection={"_id": 0, "password_version": 1},
+        return_document=ReturnDocument.AFTER
     )
+    await auth_cache.invalidate(current_user.email)
     
-    return {"message": "Пароль успешно изменен"}
+    # Старые токены отзываются сменой пароля, поэтому выдаем новый
+    access_token = create_access_token(
+        data={"sub": current_user.email, "pwv": password_version(user_dict or {})},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"message": "Пароль успешно изменен", "access_token": access_token, "token_type": "bearer"}
 
 @app.delete("/account")
-async def delete_account(current_user: UserInDB = Depends(get_current_user)):
+async def delete_account(current_user: CurrentUser = Depends(get_current_user)):
     result = await db.users.delete_one({"email": current_user.email})
+    await auth_cache.invalidate(current_user.email)
+    await db.alerts.delete_many({"user_email": current_user.email})
+    await db.dashboards.delete_many({"user_email": current_user.email})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -475,16 +788,18 @@ async def logout():
     return {"message": "Logged out successfully"}
 
 @app.get("/alerts", response_model=List[PriceAlertResponse])
-async def get_alerts(current_user: User = Depends(get_current_user)):
+async def get_alerts(current_user: CurrentUser = Depends(get_current_user)):
     """Получить все уведомления пользователя"""
-    if not hasattr(current_user, 'alerts'):
-        return []
-    return current_user.alerts
+    return await get_user_alerts(current_user.email)
 
 @app.post("/alerts", response_model=PriceAlertResponse)
-async def create_alert(alert: PriceAlert, current_user: User = Depends(get_current_user)):
+async def create_alert(alert: PriceAlert, current_user: CurrentUser = Depends(get_current_user)):
     """Создать новое уведомление о цене"""
-    if alert.coin_id not in current_user.watchlist:
+    in_watchlist = await db.users.find_one(
+        {"email": current_user.email, "watchlist": alert.coin_id},
+        {"_id": 1}
+    )
+    if not in_watchlist:
         raise HTTPException(status_code=400, detail="Монета должна быть в списке избранного")
     
     if alert.type == "price" and alert.price is None:
@@ -493,6 +808,12 @@ async def create_alert(alert: PriceAlert, current_user: User = Depends(get_curre
     if alert.type == "percentage" and alert.percentage is None:
         raise HTTPException(status_code=400, detail="Для уведомления по проценту необходимо указать процент")
     
+    window = None
+    if alert.type == "percentage":
+        window = alert.window or "24h"
+        if window not in ALERT_WINDOWS:
+            raise HTTPException(status_code=400, detail=f"Недопустимое окно. Используйте {', '.join(ALERT_WINDOWS)}")
+    
     new_alert = {
         "id": str(uuid.uuid4()),
         "coin_id": alert.coin_id,
@@ -500,48 +821,65 @@ async def create_alert(alert: PriceAlert, current_user: User = Depends(get_curre
         "type": alert.type,
         "price": alert.price,
         "percentage": alert.percentage,
+        "window": window,
         "created_at": datetime.now()
     }
     
-    await db.users.update_one(
-        {"email": current_user.email},
-        {"$push": {"alerts": new_alert}}
-    )
+    await db.alerts.insert_one(alert_document(current_user.email, new_alert))
     
     return new_alert
 
 @app.delete("/alerts/{alert_id}")
-async def delete_alert(alert_id: str, current_user: User = Depends(get_current_user)):
+async def delete_alert(alert_id: str, current_user: CurrentUser = Depends(get_current_user)):
     """Удалить уведомление о цене"""
-    result = await db.users.update_one(
-        {"email": current_user.email},
-        {"$pull": {"alerts": {"id": alert_id}}}
-    )
+    result = await db.alerts.delete_one({"_id": alert_id, "user_email": current_user.email})
     
-    if result.modified_count == 0:
+    if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     
     return {"message": "Уведомление удалено"}
 
 
 @app.get("/cryptocurrencies", response_model=List[CryptoCurrency])
-async def get_cryptocurrencies(active_only: bool = True):
-    """Получить список всех доступных криптовалют"""
-    query = {"is_active": True} if active_only else {}
-    cursor = db.cryptocurrencies.find(query)
-    currencies = await cursor.to_list(length=100)
+async def get_cryptocurrencies(
+    response: Response,
+    active_only: bool = True,
+    limit: int = PAGE_SIZE_DEFAULT,
+    after: Optional[str] = None,
+    output_format: str = Query("json", alias="format")
+):
+    """
+    Получить список доступных криптовалют постранично (по возрастанию id).
+    ID для следующей страницы возвращается в заголовке X-Next-Cursor;
+    format=ndjson выгружает весь список потоком. Список берется из
+    снимка каталога в памяти.
+    """
+    if output_format == "ndjson":
+        currencies, _ = catalog.page(active_only, after, None)
+        return ndjson_response(currencies)
+    
+    check_page_size(limit)
+    currencies, next_cursor = catalog.page(active_only, after, limit)
+    response.headers["X-Catalog-Version"] = str(catalog.version)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return currencies
 
+@app.get("/catalog/version")
+async def get_catalog_version():
+    """Текущая версия каталога: другие сервисы перечитывают каталог только при ее изменении"""
+    return {"version": catalog.version}
+
 @app.get("/cryptocurrencies/{currency_id}", response_model=CryptoCurrency)
 async def get_cryptocurrency(currency_id: str):
     """Получить информацию о конкретной криптовалюте"""
-    currency = await db.cryptocurrencies.find_one({"id": currency_id})
+    currency = catalog.get(currency_id)
     if not currency:
         raise HTTPException(status_code=404, detail="Криптовалюта не найдена")
     return currency
 
 @app.post("/cryptocurrencies", response_model=CryptoCurrency)
-async def create_cryptocurrency(currency: CryptoCurrency, current_user: UserInDB = Depends(check_admin_role)):
+async def create_cryptocurrency(currency: CryptoCurrency, current_user: CurrentUser = Depends(check_admin_role)):
     """Добавить новую криптовалюту (только для администраторов)"""
     # Проверка прав администратора выполняется через check_admin_role
     
@@ -555,17 +893,17 @@ async def create_cryptocurrency(currency: CryptoCurrency, current_user: UserInDB
     currency_dict["created_at"] = datetime.now()
     currency_dict["updated_at"] = datetime.now()
     
-    result = await db.cryptocurrencies.insert_one(currency_dict)
+    await db.cryptocurrencies.insert_one(currency_dict)
+    await catalog.bump()
     
-    # Получаем и возвращаем созданную валюту
-    created_currency = await db.cryptocurrencies.find_one({"_id": result.inserted_id})
-    return created_currency
+    # Возвращаем созданную валюту
+    return catalog.get(currency.id)
 
 @app.put("/cryptocurrencies/{currency_id}", response_model=CryptoCurrency)
 async def update_cryptocurrency(
     currency_id: str, 
     currency_update: dict, 
-    current_user: UserInDB = Depends(check_admin_role)
+    current_user: CurrentUser = Depends(check_admin_role)
 ):
     """Обновить информацию о криптовалюте (только для администраторов)"""
     # Проверка прав администратора выполняется через check_admin_role
@@ -578,17 +916,18 @@ async def update_cryptocurrency(
     # Обновляем данные
     currency_update["updated_at"] = datetime.now()
     
-    await db.cryptocurrencies.update_one(
+    updated_currency = await db.cryptocurrencies.find_one_and_update(
         {"id": currency_id},
-        {"$set": currency_update}
+        {"$set": currency_update},
+        return_document=ReturnDocument.AFTER
     )
+    await catalog.bump()
     
     # Возвращаем обновленную валюту
-    updated_currency = await db.cryptocurrencies.find_one({"id": currency_id})
     return updated_currency
 
 @app.delete("/cryptocurrencies/{currency_id}")
-async def delete_cryptocurrency(currency_id: str, current_user: UserInDB = Depends(check_admin_role)):
+async def delete_cryptocurrency(currency_id: str, current_user: CurrentUser = Depends(check_admin_role)):
     """Удалить криптовалюту (только для администраторов)"""
     # Проверка прав администратора выполняется через check_admin_role
     
@@ -599,34 +938,105 @@ async def delete_cryptocurrency(currency_id: str, current_user: UserInDB = Depen
     
     # Удаляем валюту
     await db.cryptocurrencies.delete_one({"id": currency_id})
+    await catalog.bump()
     
     return {"message": "Криптовалюта успешно удалена"}
 
+@app.get("/bootstrap", response_model=BootstrapResponse, response_model_exclude_unset=True)
+async def bootstrap(current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Данные для первой загрузки страницы одним запросом: профиль, роль,
+    избранное, дашборды, уведомления, каталог и текущие цены избранных монет.
+    Дашборды и уведомления читаются параллельно с документом пользователя,
+    цены запрашиваются сразу после чтения избранного; каталог берется из памяти.
+    """
+    async def user_with_prices():
+        user_dict = await get_user_fields(current_user.email, *USER_BASE_FIELDS)
+        return user_dict, await fetch_prices(user_dict.get("watchlist", []))
+
+    (user_dict, prices), dashboards, alerts = await asyncio.gather(
+        user_with_prices(),
+        get_user_dashboards(current_user.email),
+        get_user_alerts(current_user.email)
+    )
+    watchlist = user_dict.pop("watchlist", [])
+    
+    currencies, _ = catalog.page(True, None, None)
+    return {
+        "user": user_dict,
+        "is_admin": current_user.role == "admin",
+        "watchlist": watchlist,
+        "dashboards": dashboards,
+        "alerts": alerts,
+        "catalog": {"version": catalog.version, "currencies": currencies},
+        "prices": prices
+    }
+
 # Эндпоинт для проверки роли администратора
 @app.get("/check-admin")
-async def check_admin(current_user: UserInDB = Depends(get_current_user)):
+async def check_admin(current_user: CurrentUser = Depends(get_current_user)):
     """Проверяет, является ли текущий пользователь администратором"""
     if current_user.role == "admin":
         return {"is_admin": True}
     return {"is_admin": False}
 
+@app.get("/admin/query-plans")
+async def get_query_plans(current_user: CurrentUser = Depends(check_admin_role)):
+    """Планы частых запросов и состояние индексов (только для администраторов)"""
+    plans = await index_manager.explain_hot_queries()
+    return {
+        "indexes": index_manager.status,
+        "plans": plans,
+        "collscans": [plan["query"] for plan in plans if plan["collscan"]]
+    }
+
 # API эндпоинты для управления пользователями (только для админов)
-@app.get("/users", response_model=List[User])
-async def get_users(current_user: UserInDB = Depends(check_admin_role)):
-    """Получить список всех пользователей (только для администраторов)"""
-    cursor = db.users.find({})
-    users = await cursor.to_list(length=100)
-    # Удаляем поле hashed_password для безопасности
+@app.get("/users", response_model=List[User], response_model_exclude_unset=True)
+async def get_users(
+    response: Response,
+    include: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    after: Optional[str] = None,
+    output_format: str = Query("json", alias="format"),
+    current_user: CurrentUser = Depends(check_admin_role)
+):
+    """
+    Получить список пользователей постранично (только для администраторов).
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor;
+    format=ndjson выгружает всех пользователей потоком.
+    """
+    fields = parse_include(include)
+    query = {}
+    if after is not None:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
+    
+    # Проекция не включает hashed_password
+    projection = user_projection(USER_BASE_FIELDS)
+    projection["_id"] = 1
+    cursor = db.users.find(query, projection).sort("_id", 1)
+    
+    if output_format == "ndjson":
+        if fields:
+            raise HTTPException(status_code=400, detail="include не поддерживается для format=ndjson")
+        return ndjson_response(cursor.batch_size(EXPORT_BATCH_SIZE), lambda user: {**user, "_id": str(user["_id"])})
+    
+    check_page_size(limit)
+    users = await cursor.limit(limit + 1).to_list(length=limit + 1)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = str(users[-1]["_id"])
     for user in users:
-        if "hashed_password" in user:
-            del user["hashed_password"]
-    return users
+        del user["_id"]
+    return await attach_collections(users, fields)
 
 @app.put("/users/{email}/role")
-async def update_user_role(email: str, role: str, current_user: UserInDB = Depends(check_admin_role)):
+async def update_user_role(email: str, role: str, current_user: CurrentUser = Depends(check_admin_role)):
     """Обновить роль пользователя (только для администраторов)"""
     # Проверяем существование пользователя
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
@@ -643,14 +1053,15 @@ async def update_user_role(email: str, role: str, current_user: UserInDB = Depen
         {"email": email},
         {"$set": {"role": role}}
     )
+    await auth_cache.invalidate(email)
     
     return {"message": f"Роль пользователя {email} изменена на {role}"}
 
 @app.put("/users/{email}/status")
-async def update_user_status(email: str, is_active: bool, current_user: UserInDB = Depends(check_admin_role)):
+async def update_user_status(email: str, is_active: bool, current_user: CurrentUser = Depends(check_admin_role)):
     """Активировать/деактивировать пользователя (только для администраторов)"""
     # Проверяем существование пользователя
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
@@ -663,6 +1074,7 @@ async def update_user_status(email: str, is_active: bool, current_user: UserInDB
         {"email": email},
         {"$set": {"is_active": is_active}}
     )
+    await auth_cache.invalidate(email)
     
     status_message = "активирован" if is_active else "деактивирован"
     return {"message": f"Аккаунт пользователя {email} {status_message}"}
@@ -670,17 +1082,23 @@ async def update_user_status(email: str, is_active: bool, current_user: UserInDB
 # Инициализация базы данных при запуске
 @app.on_event("startup")
 async def startup_db_client():
+    global auth_cache, catalog, catalog_task
+    auth_cache = await create_auth_cache(
+        REDIS_URL,
+        maxsize=AUTH_CACHE_SIZE,
+        local_ttl=AUTH_CACHE_LOCAL_TTL,
+        ttl=AUTH_CACHE_TTL
+    )
+    
     # Создаем пользователя-администратора, если его еще нет
-    admin_user = await db.users.find_one({"email": "admin@admin.com"})
+    admin_user = await db.users.find_one({"email": "admin@admin.com"}, {"_id": 1})
     if not admin_user:
         print("Creating admin user")
-        hashed_password = pwd_context.hash("admin")
+        hashed_password = await password_hasher.hash("admin")
         admin_dict = {
             "email": "admin@admin.com",
             "hashed_password": hashed_password,
             "watchlist": [],
-            "dashboards": [],
-            "alerts": [],
             "first_name": "Admin",
             "last_name": "User",
             "role": "admin",  # Устанавливаем роль админа
@@ -690,6 +1108,7 @@ async def startup_db_client():
         print("Admin user created successfully")
     
     # Проверяем наличие коллекции криптовалют и создаем её, если она отсутствует
+    catalog_seeded = False
     if "cryptocurrencies" not in await db.list_collection_names():
         # Создаем коллекцию
         await db.create_collection("cryptocurrencies")
@@ -779,6 +1198,43 @@ async def startup_db_client():
         ]
         
         await db.cryptocurrencies.insert_many(default_currencies)
+        catalog_seeded = True
+    
+    catalog = await create_catalog(
+        db.cryptocurrencies,
+        db.meta,
+        REDIS_URL,
+        channel=CATALOG_CHANNEL,
+        refresh_interval=CATALOG_REFRESH_INTERVAL
+    )
+    if catalog_seeded:
+        await catalog.bump()
+    catalog_task = asyncio.create_task(catalog.run())
+    
+    # Индексы создаются в фоне, не задерживая готовность сервиса
+    asyncio.create_task(index_manager.ensure_indexes())
+    
+    # Переносим уведомления и дашборды, оставшиеся в документах пользователей
+    asyncio.create_task(run_embedded_migration())
+
+async def run_embedded_migration():
+    try:
+        counts = await migrate_embedded(db, EMBEDDED_MIGRATION_BATCH_SIZE)
+        if counts["alerts"] or counts["dashboards"]:
+            print(f"Migrated {counts['alerts']} alerts and {counts['dashboards']} dashboards from user documents")
+    except Exception as e:
+        print(f"Embedded data migration failed: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    await auth_cache.close()
+    if catalog_task is not None:
+        catalog_task.cancel()
+        await asyncio.gather(catalog_task, return_exceptions=True)
+    await catalog.close()
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    password_hasher.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,108 @@
+"""
+Перенос уведомлений и дашбордов из массивов документов users
+в отдельные коллекции alerts и dashboards.
+
+Миграция идемпотентна и выполняется без остановки сервиса: пользователи
+читаются пачками по возрастанию _id, элементы вставляются upsert'ом по ID
+и только после этого удаляются из массивов пользователя. Повторный запуск
+переносит то, что успели записать старые версии сервиса.
+
+Запуск вручную:
+    python migrate_embedded.py --batch-size 500
+"""
+import argparse
+import asyncio
+import os
+from typing import Dict
+
+import motor.motor_asyncio
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from documents import alert_document, dashboard_document
+
+EMBEDDED_QUERY = {"$or": [{"alerts.0": {"$exists": True}}, {"dashboards.0": {"$exists": True}}]}
+
+
+async def migrate_embedded(db, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Переносит вложенные уведомления и дашборды в отдельные коллекции.
+
+    Returns:
+        Dict[str, int]: Число обработанных пользователей, уведомлений и дашбордов
+    """
+    counts = {"users": 0, "alerts": 0, "dashboards": 0}
+    last_id = None
+    while True:
+        query = dict(EMBEDDED_QUERY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        users = await db.users.find(
+            query, {"email": 1, "alerts": 1, "dashboards": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not users:
+            break
+
+        alert_ops, dashboard_ops, user_ops = [], [], []
+        for user in users:
+            email = user.get("email")
+            if not email:
+                continue
+            alert_ids = []
+            for alert in user.get("alerts") or []:
+                if not alert.get("id"):
+                    continue
+                alert_ops.append(UpdateOne(
+                    {"_id": alert["id"]},
+                    {"$setOnInsert": alert_document(email, alert)},
+                    upsert=True
+                ))
+                alert_ids.append(alert["id"])
+            dashboard_ids = []
+            for dashboard in user.get("dashboards") or []:
+                if not dashboard.get("id"):
+                    continue
+                dashboard_ops.append(UpdateOne(
+                    {"user_email": email, "id": dashboard["id"]},
+                    {"$setOnInsert": dashboard_document(email, dashboard)},
+                    upsert=True
+                ))
+                dashboard_ids.append(dashboard["id"])
+            user_ops.append(UpdateOne(
+                {"_id": user["_id"]},
+                {"$pull": {
+                    "alerts": {"id": {"$in": alert_ids}},
+                    "dashboards": {"id": {"$in": dashboard_ids}}
+                }}
+            ))
+            counts["alerts"] += len(alert_ids)
+            counts["dashboards"] += len(dashboard_ids)
+
+        # Сначала копируем, потом удаляем из массивов: при сбое данные не теряются
+        if alert_ops:
+            await db.alerts.bulk_write(alert_ops, ordered=False)
+        if dashboard_ops:
+            await db.dashboards.bulk_write(dashboard_ops, ordered=False)
+        if user_ops:
+            await db.users.bulk_write(user_ops, ordered=False)
+
+        counts["users"] += len(users)
+        last_id = users[-1]["_id"]
+    return counts
+
+
+async def main(batch_size: int):
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    counts = await migrate_embedded(client.crypto_tracker, batch_size)
+    print(
+        f"Migrated {counts['alerts']} alerts and {counts['dashboards']} dashboards "
+        f"from {counts['users']} users"
+    )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Перенос уведомлений и дашбордов в отдельные коллекции")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,58 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class PasswordHashingBusy(Exception):
+    """Все потоки хеширования заняты дольше допустимого времени ожидания"""
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном пуле потоков.
+
+    bcrypt занимает десятки-сотни миллисекунд CPU и освобождает GIL, поэтому
+    выполняется вне event loop. Число одновременных операций ограничено
+    размером пула; запрос, ожидающий свободный поток дольше queue_timeout,
+    получает PasswordHashingBusy, чтобы всплеск входов не копил бесконечную очередь.
+    """
+
+    def __init__(self, context: CryptContext, workers: int = 2, queue_timeout: float = 5):
+        self.context = context
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _run(self, func, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHashingBusy()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Проверяет пароль и, если хеш создан с устаревшими настройками
+        (например, другим числом раундов bcrypt), возвращает новый хеш.
+
+        Returns:
+            Tuple[bool, Optional[str]]: (пароль верен, новый хеш или None)
+        """
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrate_embedded import migrate_embedded  # noqa: E402
+
+
+class SequentialBulkDatabase:
+    """
+    База mongomock, в которой bulk_write выполняет UpdateOne по одной:
+    BulkOperationBuilder mongomock несовместим с UpdateOne текущего pymongo.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        collection = getattr(self._db, name)
+
+        async def bulk_write(requests, ordered=True):
+            for request in requests:
+                await collection.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+
+        collection.bulk_write = bulk_write
+        return collection
+
+
+def embedded_user(email, alert_ids, dashboard_ids):
+    return {
+        "email": email,
+        "alerts": [{"id": alert_id, "coin_id": "bitcoin", "type": "price", "price": 100.0} for alert_id in alert_ids],
+        "dashboards": [{"id": dashboard_id, "name": dashboard_id, "widgets": []} for dashboard_id in dashboard_ids],
+    }
+
+
+async def collection_state(db):
+    alerts = await db.alerts.find({}, {"_id": 1}).to_list(length=None)
+    dashboards = await db.dashboards.find({}, {"_id": 0, "user_email": 1, "id": 1, "name": 1}).to_list(length=None)
+    users = await db.users.find({}, {"_id": 0, "email": 1, "alerts": 1, "dashboards": 1}).to_list(length=None)
+    return sorted(a["_id"] for a in alerts), sorted(dashboards, key=lambda d: d["id"]), users
+
+
+def test_rerun_does_not_duplicate_or_overwrite():
+    async def run():
+        db = SequentialBulkDatabase(AsyncMongoMockClient().crypto_tracker)
+        await db.users.insert_many([
+            embedded_user("a@example.com", ["a1", "a2"], ["d1"]),
+            embedded_user("b@example.com", ["b1"], []),
+        ])
+
+        first = await migrate_embedded(db, batch_size=1)
+        assert first == {"users": 2, "alerts": 3, "dashboards": 1}
+        after_first = await collection_state(db)
+
+        second = await migrate_embedded(db, batch_size=1)
+        assert second == {"users": 0, "alerts": 0, "dashboards": 0}
+        assert await collection_state(db) == after_first
+
+        # Старая версия сервиса успела дописать во вложенный массив уже перенесенный
+        # дашборд (сбой между копированием и удалением) и новое уведомление
+        await db.dashboards.update_one({"id": "d1"}, {"$set": {"name": "renamed"}})
+        await db.users.update_one(
+            {"email": "a@example.com"},
+            {"$push": {"alerts": {"id": "a3", "coin_id": "bitcoin", "type": "price", "price": 1.0},
+                       "dashboards": {"id": "d1", "name": "d1", "widgets": []}}}
+        )
+        third = await migrate_embedded(db)
+        assert third == {"users": 1, "alerts": 1, "dashboards": 1}
+
+        alerts, dashboards, users = await collection_state(db)
+        assert alerts == ["a1", "a2", "a3", "b1"]
+        # Уже перенесенный дашборд не перезаписывается копией из массива
+        assert dashboards == [{"user_email": "a@example.com", "id": "d1", "name": "renamed"}]
+        assert all(not user["alerts"] and not user["dashboards"] for user in users)
+
+    asyncio.run(run())
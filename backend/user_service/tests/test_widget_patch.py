@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from main import CurrentUser, WidgetPatch  # noqa: E402
+
+USER = CurrentUser(email="user@example.com", password_version="0")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient().crypto_tracker
+    monkeypatch.setattr(main, "db", db)
+    asyncio.run(db.dashboards.insert_one({
+        "user_email": USER.email,
+        "id": "d1",
+        "name": "Main",
+        "widgets": [{"id": "w1", "type": "chart", "layout": {"x": 0, "y": 0}}],
+        "version": 4
+    }))
+    return db
+
+
+def patch_widget(patch):
+    return asyncio.run(main.patch_dashboard_widget("d1", patch, current_user=USER))
+
+
+@pytest.mark.parametrize("patch", [
+    WidgetPatch(op="move", version=3, widget_id="w1", layout={"x": 1, "y": 0}),
+    WidgetPatch(op="update", version=3, widget_id="w1", widget={"type": "table"}),
+    WidgetPatch(op="add", version=3, widget={"id": "w2", "type": "news"}),
+    WidgetPatch(op="remove", version=3, widget_id="w1"),
+])
+def test_stale_version_is_rejected_with_current_version(db, patch):
+    # Клиент меняет дашборд на основе версии 3, а другой клиент уже сохранил версию 4
+    with pytest.raises(HTTPException) as error:
+        patch_widget(patch)
+    assert error.value.status_code == 409
+    assert error.value.headers == {"X-Dashboard-Version": "4"}
+
+    dashboard = asyncio.run(db.dashboards.find_one({"id": "d1"}))
+    assert dashboard["version"] == 4
+    assert dashboard["widgets"] == [{"id": "w1", "type": "chart", "layout": {"x": 0, "y": 0}}]
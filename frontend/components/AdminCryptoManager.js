@@ -32,30 +32,43 @@ export default function AdminCryptoManager() {
         return;
       }
 
-      const response = await fetch('http://localhost:8000/cryptocurrencies?active_only=false', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-
-      if (!response.ok) {
-        if (response.status === 401) {
-          localStorage.removeItem('token');
-          router.push('/auth/login');
-          return;
-        }
+      // Список отдается страницами: курсор следующей страницы приходит
+      // в заголовке X-Next-Cursor, пустой курсор - последняя страница
+      const allCurrencies = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: '500', active_only: 'false' });
+        if (cursor) {
+          params.set('after', cursor);
+        }
+        const response = await fetch(`http://localhost:8000/cryptocurrencies?${params}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+
+        if (!response.ok) {
+          if (response.status === 401) {
+            localStorage.removeItem('token');
+            router.push('/auth/login');
+            return;
+          }
         
-        if (response.status === 403) {
-          // Если нет прав администратора
-          router.push('/');
-          return;
-        }
+          if (response.status === 403) {
+            // Если нет прав администратора
+            router.push('/');
+            return;
+          }
         
-        throw new Error('Не удалось загрузить список криптовалют');
-      }
+          throw new Error('Не удалось загрузить список криптовалют');
+        }
 
-      const data = await response.json();
-      setCryptocurrencies(data || []);
+        const data = await response.json();
+        allCurrencies.push(...(data || []));
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
+
+      setCryptocurrencies(allCurrencies);
     } catch (err) {
       setError('Ошибка загрузки списка криптовалют');
       console.error('Error:', err);
@@ -22,30 +22,43 @@ export default function AdminUserManager() {
         return;
       }
 
-      const response = await fetch('http://localhost:8000/users', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-
-      if (!response.ok) {
-        if (response.status === 401) {
-          localStorage.removeItem('token');
-          router.push('/auth/login');
-          return;
-        }
+      // Список отдается страницами: курсор следующей страницы приходит
+      // в заголовке X-Next-Cursor, пустой курсор - последняя страница
+      const allUsers = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: '500' });
+        if (cursor) {
+          params.set('after', cursor);
+        }
+        const response = await fetch(`http://localhost:8000/users?${params}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+
+        if (!response.ok) {
+          if (response.status === 401) {
+            localStorage.removeItem('token');
+            router.push('/auth/login');
+            return;
+          }
         
-        if (response.status === 403) {
-          // Если нет прав администратора
-          router.push('/');
-          return;
-        }
+          if (response.status === 403) {
+            // Если нет прав администратора
+            router.push('/');
+            return;
+          }
         
-        throw new Error('Не удалось загрузить список пользователей');
-      }
+          throw new Error('Не удалось загрузить список пользователей');
+        }
+
+        const data = await response.json();
+        allUsers.push(...(data || []));
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
 
-      const data = await response.json();
-      setUsers(data || []);
+      setUsers(allUsers);
     } catch (err) {
       setError('Ошибка загрузки списка пользователей');
       console.error('Error:', err);
@@ -370,13 +370,18 @@ const DashboardManager = () => {
             // Используем UUID, если доступен, иначе используем ID
             const dashboardIdentifier = dashboardUuid || dashboardId;
 
-            const response = await fetch(`http://localhost:8000/dashboard/${dashboardIdentifier}`, {
-                method: 'PUT',
+            // Удаляем только один виджет, передавая версию дашборда
+            const response = await fetch(`http://localhost:8000/dashboard/${dashboardIdentifier}/widgets`, {
+                method: 'PATCH',
                 headers: {
                     'Authorization': `Bearer ${token}`,
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ widgets: updatedWidgets })
+                body: JSON.stringify({
+                    op: 'remove',
+                    widget_id: widgetId,
+                    version: dashboard.version || 0
+                })
             });
 
             if (response.status === 401) {
@@ -385,14 +390,22 @@ const DashboardManager = () => {
                 return;
             }
 
+            // Дашборд изменен в другой вкладке: загружаем актуальные данные
+            if (response.status === 409) {
+                await fetchDashboards();
+                return;
+            }
+
             if (!response.ok) {
                 throw new Error('Ошибка при обновлении дашборда');
             }
 
+            const data = await response.json();
+
             // Обновляем локальный стейт
             setDashboards(dashboards.map(d => {
                 if (d.id === dashboardId) {
-                    return updatedDashboard;
+                    return { ...updatedDashboard, version: data.version };
                 }
                 return d;
             }));
@@ -55,6 +55,11 @@ const PasswordChangeModal = ({ isOpen, onClose }) => {
                 throw new Error(data.detail || 'Ошибка при смене пароля');
             }
             
+            // Смена пароля отзывает старые токены
+            if (data.access_token) {
+                localStorage.setItem('token', data.access_token);
+            }
+            
             setSuccess('Пароль успешно изменен');
             // Очищаем поля формы
             setCurrentPassword('');
@@ -8,11 +8,13 @@ export default function PriceAlerts() {
     condition: 'above', // 'above' или 'below'
     price: '',
     percentage: '',
+    window: '24h', // окно процентного изменения: '5m', '1h' или '24h'
     type: 'price' // 'price' или 'percentage'
   });
   const [availableCoins, setAvailableCoins] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [triggeredAlerts, setTriggeredAlerts] = useState([]);
   const router = useRouter();
 
   useEffect(() => {
@@ -20,6 +22,23 @@ export default function PriceAlerts() {
     fetchWatchlist();
   }, []);
 
+  // Мгновенные уведомления о сработавших алертах от notification_service
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    const socket = new WebSocket(`ws://localhost:8003/ws/alerts?token=${encodeURIComponent(token)}`);
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type !== 'alert') return;
+      setTriggeredAlerts(prev => [data, ...prev].slice(0, 5));
+      // Сработавшее уведомление удалено на сервере
+      setAlerts(prev => prev.filter(alert => alert.id !== data.alert.id));
+    };
+
+    return () => socket.close();
+  }, []);
+
   const fetchAlerts = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -112,6 +131,7 @@ export default function PriceAlerts() {
         alertData.price = parseFloat(newAlert.price);
       } else {
         alertData.percentage = parseFloat(newAlert.percentage);
+        alertData.window = newAlert.window;
       }
 
       const response = await fetch('http://localhost:8000/alerts', {
@@ -133,6 +153,7 @@ export default function PriceAlerts() {
         condition: 'above',
         price: '',
         percentage: '',
+        window: '24h',
         type: 'price'
       });
       
@@ -186,6 +207,13 @@ export default function PriceAlerts() {
       
       {error && <div className="error">{error}</div>}
 
+      {triggeredAlerts.map(({ alert, price, triggered_at }) => (
+        <div key={alert.id} className="alert-triggered">
+          {alert.coin_id.toUpperCase()}: уведомление сработало, текущая цена ${price.toFixed(2)}
+          {' '}({new Date(triggered_at).toLocaleTimeString()})
+        </div>
+      ))}
+
       <div className="create-alert">
         <h3>Создать новое уведомление</h3>
         
@@ -270,6 +298,16 @@ export default function PriceAlerts() {
                 step="0.1"
               />
               <span className="percentage-symbol">%</span>
+              <select
+                name="window"
+                value={newAlert.window}
+                onChange={handleInputChange}
+                className="select-input"
+              >
+                <option value="5m">за 5 минут</option>
+                <option value="1h">за 1 час</option>
+                <option value="24h">за 24 часа</option>
+              </select>
             </div>
           )}
         </div>
@@ -298,7 +336,7 @@ export default function PriceAlerts() {
                     {alert.condition === 'above' ? 'выше' : 'ниже'} 
                     {alert.type === 'price' 
                       ? ` $${alert.price.toFixed(2)}` 
-                      : ` ${alert.percentage.toFixed(1)}%`
+                      : ` ${alert.percentage.toFixed(1)}% за ${alert.window || '24h'}`
                     }
                   </span>
                 </div>
@@ -62,29 +62,20 @@ export default function WatchlistDashboard() {
         return;
       }
 
-      const response = await fetch('http://localhost:8000/watchlist', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
+      // Избранное, каталог и текущие цены приходят одним запросом и попадают в кэш сервиса данных
+      const data = await cryptoDataService.getBootstrap(token);
+      setWatchlist(data.watchlist);
 
-      if (!response.ok) {
-        if (response.status === 401) {
-          localStorage.removeItem('token');
-          router.push('/auth/login');
-          return;
-        }
-        throw new Error('Не удалось загрузить список избранного');
-      }
-
-      const data = await response.json();
-      setWatchlist(data || []);
-      
       // Загружаем информацию о криптовалютах
-      if (data && data.length > 0) {
-        await loadCryptoData(data);
+      if (data.watchlist.length > 0) {
+        await loadCryptoData(data.watchlist);
       }
     } catch (err) {
+      if (err.status === 401) {
+        localStorage.removeItem('token');
+        router.push('/auth/login');
+        return;
+      }
       setError('Ошибка загрузки списка избранного');
       console.error('Error:', err);
     } finally {
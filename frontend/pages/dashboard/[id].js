@@ -51,6 +51,10 @@ const DashboardPage = () => {
     const [editingDashboardTitle, setEditingDashboardTitle] = useState(false);
     const [newDashboardTitle, setNewDashboardTitle] = useState('');
     const dashboardTitleInputRef = useRef(null);
+    // Версия дашборда, на основе которой отправляются изменения виджетов
+    const versionRef = useRef(0);
+    // Расположения виджетов, ожидающие отправки на сервер
+    const pendingMovesRef = useRef({});
 
     const availableCoins = [
         { value: 'bitcoin', label: 'Bitcoin (BTC)' },
@@ -133,6 +137,7 @@ const DashboardPage = () => {
                 });
             }
 
+            versionRef.current = currentDashboard.version || 0;
             setDashboard(currentDashboard);
             console.log('Dashboard loaded successfully');
         } catch (error) {
@@ -143,6 +148,44 @@ const DashboardPage = () => {
         }
     };
     
+    // Отправляет изменение одного виджета вместе с версией дашборда;
+    // при конфликте версий (дашборд изменен в другой вкладке) перечитывает дашборд
+    const patchWidget = async (dashboardId, change) => {
+        const token = localStorage.getItem('token');
+        if (!token) {
+            router.push('/auth/login');
+            return null;
+        }
+
+        const response = await fetch(`http://localhost:8000/dashboard/${dashboardId}/widgets`, {
+            method: 'PATCH',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ...change, version: versionRef.current })
+        });
+
+        if (response.status === 401) {
+            localStorage.removeItem('token');
+            router.push('/auth/login');
+            return null;
+        }
+
+        if (response.status === 409) {
+            await fetchDashboard();
+            return null;
+        }
+
+        if (!response.ok) {
+            throw new Error('Ошибка при сохранении виджета');
+        }
+
+        const data = await response.json();
+        versionRef.current = data.version;
+        return data;
+    };
+
     const handleLayoutChange = async (layout) => {
         if (!editMode || !dashboard) return;
         
@@ -179,34 +222,34 @@ const DashboardPage = () => {
             // Обновляем локальный стейт немедленно для отзывчивого UI
             setDashboard(updatedDashboard);
 
-            // Задержка перед отправкой на сервер
-            window.layoutChangeTimeout = setTimeout(async () => {
-                const token = localStorage.getItem('token');
-                if (!token) {
-                    router.push('/auth/login');
-                    return;
-                }
-
-                // Используем UUID для идентификации дашборда
-                const dashboardId = dashboard.uuid || dashboard.id;
-
-                const response = await fetch(`http://localhost:8000/dashboard/${dashboardId}`, {
-                    method: 'PUT',
-                    headers: {
-                        'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ widgets: updatedWidgets })
-                });
-
-                if (response.status === 401) {
-                    localStorage.removeItem('token');
-                    router.push('/auth/login');
-                    return;
+            // Отправляем только виджеты, расположение которых изменилось;
+            // изменения накапливаются, пока не истечет задержка
+            updatedWidgets.forEach(widget => {
+                const previous = dashboard.widgets.find(w => w.id === widget.id);
+                if (!previous || JSON.stringify(previous.layout) !== JSON.stringify(widget.layout)) {
+                    pendingMovesRef.current[widget.id] = widget.layout;
                 }
+            });
+            if (Object.keys(pendingMovesRef.current).length === 0) return;
 
-                if (!response.ok) {
-                    throw new Error('Ошибка при сохранении расположения виджетов');
+            // Задержка перед отправкой на сервер
+            window.layoutChangeTimeout = setTimeout(async () => {
+                const moves = pendingMovesRef.current;
+                pendingMovesRef.current = {};
+                try {
+                    // Используем UUID для идентификации дашборда
+                    const dashboardId = dashboard.uuid || dashboard.id;
+
+                    for (const [widgetId, widgetLayout] of Object.entries(moves)) {
+                        const result = await patchWidget(dashboardId, {
+                            op: 'move',
+                            widget_id: widgetId,
+                            layout: widgetLayout
+                        });
+                        if (!result) break;
+                    }
+                } catch (error) {
+                    setError('Ошибка при сохранении расположения виджетов');
                 }
             }, 500); // Ждем 500 мс перед отправкой на сервер
         } catch (error) {
@@ -231,34 +274,11 @@ const DashboardPage = () => {
             // Обновляем локальный стейт
             setDashboard(updatedDashboard);
             
-            // Отправляем изменения на сервер
-            const token = localStorage.getItem('token');
-            if (!token) {
-                router.push('/auth/login');
-                return;
-            }
-            
-            // Используем UUID для идентификации дашборда
-            const dashboardId = dashboard.uuid || dashboard.id;
-            
-            const response = await fetch(`http://localhost:8000/dashboard/${dashboardId}`, {
-                method: 'PUT',
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ widgets: updatedWidgets })
+            // Отправляем изменения на сервер, используя UUID для идентификации дашборда
+            await patchWidget(dashboard.uuid || dashboard.id, {
+                op: 'remove',
+                widget_id: widgetId
             });
-            
-            if (response.status === 401) {
-                localStorage.removeItem('token');
-                router.push('/auth/login');
-                return;
-            }
-            
-            if (!response.ok) {
-                throw new Error('Ошибка при удалении виджета');
-            }
         } catch (error) {
             setError(error.message);
         }
@@ -295,35 +315,12 @@ const DashboardPage = () => {
             // Обновляем локальный стейт
             setDashboard(updatedDashboard);
             
-            // Отправляем изменения на сервер
-            const token = localStorage.getItem('token');
-            if (!token) {
-                router.push('/auth/login');
-                return;
-            }
-            
-            // Используем UUID для идентификации дашборда
-            const dashboardId = dashboard.uuid || dashboard.id;
-            
-            const response = await fetch(`http://localhost:8000/dashboard/${dashboardId}`, {
-                method: 'PUT',
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ widgets: updatedDashboard.widgets })
+            // Отправляем изменения на сервер, используя UUID для идентификации дашборда
+            await patchWidget(dashboardIdentifier, {
+                op: 'add',
+                widget: widgetToAdd
             });
             
-            if (response.status === 401) {
-                localStorage.removeItem('token');
-                router.push('/auth/login');
-                return;
-            }
-            
-            if (!response.ok) {
-                throw new Error('Ошибка при добавлении виджета');
-            }
-            
             setIsWidgetModalOpen(false);
         } catch (error) {
             setError(error.message);
@@ -383,32 +380,14 @@ const DashboardPage = () => {
 
         window.resizeWidgetTimeout = setTimeout(async () => {
             try {
-                const token = localStorage.getItem('token');
-                if (!token) {
-                    router.push('/auth/login');
-                    return;
-                }
-
-                const response = await fetch(`http://localhost:8000/dashboard/${id}`, {
-                    method: 'PUT',
-                    headers: {
-                        'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(updatedDashboard)
+                const resizedWidget = updatedWidgets.find(widget => widget.id === widgetId);
+                await patchWidget(dashboard.uuid || dashboard.id, {
+                    op: 'move',
+                    widget_id: widgetId,
+                    layout: resizedWidget.layout
                 });
-
-                if (response.status === 401) {
-                    localStorage.removeItem('token');
-                    router.push('/auth/login');
-                    return;
-                }
-
-                if (!response.ok) {
-                    throw new Error('Ошибка при изменении размера виджета');
-                }
             } catch (error) {
-                setError(error.message);
+                setError('Ошибка при изменении размера виджета');
             }
         }, 300);
     };
@@ -454,34 +433,12 @@ const DashboardPage = () => {
             setDashboard(updatedDashboard);
             setEditingTitleId(null);
             
-            // Отправляем на сервер
-            const token = localStorage.getItem('token');
-            if (!token) {
-                router.push('/auth/login');
-                return;
-            }
-            
-            // Используем UUID для идентификации дашборда
-            const dashboardId = dashboard.uuid || dashboard.id;
-            
-            const response = await fetch(`http://localhost:8000/dashboard/${dashboardId}`, {
-                method: 'PUT',
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ widgets: updatedWidgets })
+            // Отправляем на сервер только новый заголовок, используя UUID для идентификации дашборда
+            await patchWidget(dashboard.uuid || dashboard.id, {
+                op: 'update',
+                widget_id: editingTitleId,
+                widget: { title: newTitle.trim() || 'Виджет' }
             });
-            
-            if (response.status === 401) {
-                localStorage.removeItem('token');
-                router.push('/auth/login');
-                return;
-            }
-            
-            if (!response.ok) {
-                throw new Error('Ошибка при обновлении заголовка виджета');
-            }
         } catch (error) {
             setError(error.message);
         }
@@ -641,6 +598,8 @@ const DashboardPage = () => {
                 throw new Error(`Ошибка при обновлении названия дашборда: ${response.status} ${errorData.detail || ''}`);
             }
             
+            const data = await response.json();
+            versionRef.current = data.version;
             console.log('Dashboard title updated successfully');
         } catch (error) {
             console.error('Error saving dashboard title:', error);
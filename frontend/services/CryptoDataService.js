@@ -309,6 +309,40 @@ class CryptoDataService {
     }
   }
 
+  // Получить все данные для первой отрисовки страницы одним запросом
+  // (избранное, дашборды, уведомления, каталог и текущие цены) и заполнить ими кэш
+  async getBootstrap(token) {
+    const response = await fetch('http://localhost:8000/bootstrap', {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+
+    if (!response.ok) {
+      const error = new Error(`Ошибка начальной загрузки данных: ${response.status}`);
+      error.status = response.status;
+      throw error;
+    }
+
+    const data = await response.json();
+    const now = Date.now();
+
+    data.catalog.currencies.forEach(currency => {
+      cache.info[currency.id] = currency;
+      cache.lastUpdated.info[currency.id] = now;
+    });
+
+    // Монеты без цены (сервис цен не ответил) будут запрошены отдельно
+    Object.entries(data.prices).forEach(([coinId, price]) => {
+      if (price !== null) {
+        cache.prices[coinId] = price;
+        cache.lastUpdated.prices[coinId] = now;
+      }
+    });
+
+    return data;
+  }
+
   // Получить исторические данные о цене криптовалюты
   async getHistoricalData(coinId, days = 7) {
     // Преобразуем days в строку с суффиксом 'd' если это число